@@ -0,0 +1,342 @@
+"""
+Benchmark suite of the jupyter-drives manager.
+
+The benchmarks run offline against a local S3 stand-in (moto's ``ThreadedMotoServer``),
+or against the ``memory`` and ``local`` providers for zero-latency baselines isolating the
+server overhead from network time. They measure listings, reads and saves, recursive
+operations and concurrent load.
+The results are written as JSON and can be compared against a previous run to catch
+regressions before a release.
+
+Usage:
+
+    python benchmarks/bench_drives.py --output results.json
+    python benchmarks/bench_drives.py --scale full --output results.json
+    python benchmarks/bench_drives.py --provider memory --output results.json
+    python benchmarks/bench_drives.py --compare baseline.json --threshold 1.25
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from traitlets.config import Config
+
+KB = 1024
+MB = 1024 * KB
+GB = 1024 * MB
+
+# parameters of the benchmarks for each scale
+SCALES = {
+    "quick": {
+        "listing_keys": [1000],
+        "file_sizes": [KB, MB, 4 * MB],
+        "tree_files": 100,
+        "clients": [1, 8],
+        "requests_per_client": 20,
+        "repeat": 3,
+    },
+    "full": {
+        "listing_keys": [1000, 100_000, 1_000_000],
+        "file_sizes": [KB, MB, 100 * MB, GB],
+        "tree_files": 1000,
+        "clients": [1, 8, 32, 64],
+        "requests_per_client": 50,
+        "repeat": 5,
+    },
+}
+
+# size of the chunks sent by JupyterLab when uploading large files
+UPLOAD_CHUNK_SIZE = MB
+
+# maximum number of concurrent writes when populating the drive
+POPULATE_CONCURRENCY = 64
+
+BUCKET = "jupyter-drives-benchmark"
+
+def _payload(size):
+    pattern = b"0123456789abcdef"
+    return (pattern * (size // len(pattern) + 1))[:size]
+
+def _summary(name, params, durations, processed_bytes=None):
+    result = {
+        "benchmark": name,
+        "params": params,
+        "repeat": len(durations),
+        "seconds": durations,
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "mean": statistics.fmean(durations),
+        "max": max(durations),
+    }
+    if processed_bytes is not None:
+        result["throughput_mb_s"] = processed_bytes / MB / statistics.median(durations)
+    return result
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))
+    return values[index]
+
+async def _measure(coroutine_factory, repeat, setup=None):
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            await setup()
+        start = time.perf_counter()
+        await coroutine_factory()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+class DrivesBenchmark():
+    """
+    Runs the benchmarks against a mounted drive of a ``JupyterDrivesManager``.
+
+    Args:
+        manager: drives manager the benchmarks are run against
+        drive_name: name of the mounted drive
+        scale: parameters of the benchmarks (see ``SCALES``)
+    """
+    def __init__(self, manager, drive_name, scale):
+        self._manager = manager
+        self._drive = drive_name
+        self._scale = scale
+        self.results = []
+
+    @property
+    def _store(self):
+        return self._manager._content_managers[self._drive]["store"]
+
+    async def _populate(self, prefix, count, size=0):
+        import obstore as obs
+
+        semaphore = asyncio.Semaphore(POPULATE_CONCURRENCY)
+        payload = _payload(size)
+
+        async def put(index):
+            async with semaphore:
+                await obs.put_async(self._store, f"{prefix}/file-{index:07d}.txt", payload)
+
+        await asyncio.gather(*(put(index) for index in range(count)))
+
+    async def _save(self, path, content, chunked):
+        chunks = [content[offset:offset + UPLOAD_CHUNK_SIZE] for offset in range(0, len(content), UPLOAD_CHUNK_SIZE)]
+        if not chunked or len(chunks) < 2:
+            # JupyterLab only chunks the files larger than a chunk
+            await self._manager.save_file(self._drive, path, content, "text", "text", "file")
+            return
+        for index, chunk in enumerate(chunks, start=1):
+            await self._manager.save_file(
+                self._drive, path, chunk, "text", "text", "file",
+                options_chunk=-1 if index == len(chunks) else index
+            )
+
+    async def bench_listing(self):
+        for keys in self._scale["listing_keys"]:
+            prefix = f"listing-{keys}"
+            await self._populate(prefix, keys)
+            self._manager.set_listing_limit(keys)
+            durations = await _measure(
+                lambda: self._manager.get_contents(self._drive, prefix), self._scale["repeat"]
+            )
+            self.results.append(_summary("list", {"keys": keys}, durations))
+
+    async def bench_read_save(self):
+        for size in self._scale["file_sizes"]:
+            content = _payload(size).decode("utf-8")
+            path = f"files/file-{size}.txt"
+            for chunked in (False, True) if size > UPLOAD_CHUNK_SIZE else (False,):
+                durations = await _measure(lambda: self._save(path, content, chunked), self._scale["repeat"])
+                self.results.append(_summary("save", {"size": size, "chunked": chunked}, durations, size))
+
+            durations = await _measure(lambda: self._manager.get_contents(self._drive, path), self._scale["repeat"])
+            self.results.append(_summary("read", {"size": size}, durations, size))
+            await self._manager.delete_file(self._drive, path)
+
+    async def bench_recursive(self):
+        files = self._scale["tree_files"]
+
+        async def setup_tree():
+            await self._manager.new_file(self._drive, "tree", "directory")
+            await self._populate("tree", files)
+
+        async def walk_usage():
+            # the usage of a drive is kept, until it is dropped it isn't listed again
+            self._manager._usages.pop(self._drive, None)
+            await self._manager.get_usage(self._drive, "tree")
+
+        async def walk_archive():
+            _, archive = await self._manager.download_archive(self._drive, "tree")
+            async for _ in archive:
+                pass
+
+        await setup_tree()
+        # copying or renaming a directory only moves its marker, these walk the whole tree
+        for name, walk in (("usage", walk_usage), ("archive", walk_archive)):
+            durations = await _measure(walk, self._scale["repeat"])
+            self.results.append(_summary(name, {"files": files}, durations))
+        await self._manager.delete_file(self._drive, "tree")
+
+        durations = await _measure(
+            lambda: self._manager.delete_file(self._drive, "tree"), self._scale["repeat"], setup=setup_tree
+        )
+        self.results.append(_summary("delete", {"files": files}, durations))
+
+    async def bench_concurrent(self):
+        await self._populate("concurrent", 100, KB)
+        self._manager.set_listing_limit(1025)
+
+        async def client(index, latencies):
+            for request in range(self._scale["requests_per_client"]):
+                start = time.perf_counter()
+                if request % 2 == 0:
+                    await self._manager.get_contents(self._drive, "concurrent")
+                else:
+                    await self._manager.get_contents(self._drive, f"concurrent/file-{(index + request) % 100:07d}.txt")
+                latencies.append(time.perf_counter() - start)
+
+        for clients in self._scale["clients"]:
+            latencies = []
+            start = time.perf_counter()
+            await asyncio.gather(*(client(index, latencies) for index in range(clients)))
+            elapsed = time.perf_counter() - start
+            result = _summary("concurrent", {"clients": clients}, latencies)
+            result.update({
+                "requests_per_second": len(latencies) / elapsed,
+                "p95": _percentile(latencies, 95),
+                "p99": _percentile(latencies, 99),
+            })
+            self.results.append(result)
+
+    async def run(self, benchmarks):
+        for benchmark in benchmarks:
+            print(f"Running {benchmark} benchmark...", file=sys.stderr)
+            await getattr(self, f"bench_{benchmark}")()
+        return self.results
+
+def _moto_manager():
+    from moto.moto_server.threaded_moto_server import ThreadedMotoServer
+    from jupyter_drives.manager import JupyterDrivesManager
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+
+    config = Config()
+    config.DrivesConfig.access_key_id = "access_key"
+    config.DrivesConfig.secret_access_key = "secret_key"
+    config.DrivesConfig.region_name = "us-east-1"
+    config.DrivesConfig.endpoint_url = f"http://{host}:{port}"
+    return JupyterDrivesManager(config), server
+
+def _local_manager(provider, root):
+    from jupyter_drives.manager import JupyterDrivesManager
+
+    config = Config()
+    config.DrivesConfig.provider = provider
+    config.DrivesConfig.local_root = root
+    return JupyterDrivesManager(config)
+
+async def _mounted_manager(provider, root):
+    """Create a manager with a mounted drive of the provider.
+
+    Returns:
+        The manager and the moto server, if any.
+    """
+    if provider == "s3":
+        manager, server = _moto_manager()
+        await manager.new_drive(BUCKET, "us-east-1")
+    else:
+        manager, server = _local_manager(provider, root), None
+        await manager.new_drive(BUCKET, "")
+    await manager.mount_drive(BUCKET, provider, "us-east-1" if provider == "s3" else "")
+    return manager, server
+
+def compare(results, baseline, threshold):
+    """Compare the medians of two runs.
+
+    Returns:
+        List of the benchmarks slower than ``threshold`` times their baseline.
+    """
+    reference = {
+        (result["benchmark"], json.dumps(result["params"], sort_keys=True)): result["median"]
+        for result in baseline["results"]
+    }
+    regressions = []
+    for result in results["results"]:
+        key = (result["benchmark"], json.dumps(result["params"], sort_keys=True))
+        if key in reference and result["median"] > threshold * reference[key]:
+            regressions.append({
+                "benchmark": result["benchmark"],
+                "params": result["params"],
+                "median": result["median"],
+                "baseline": reference[key],
+                "ratio": result["median"] / reference[key],
+            })
+    return regressions
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as root:
+        manager, server = await _mounted_manager(args.provider, root)
+        try:
+            benchmark = DrivesBenchmark(manager, BUCKET, SCALES[args.scale])
+            results = await benchmark.run(args.benchmarks)
+        finally:
+            if server is not None:
+                server.stop()
+
+    from jupyter_drives import __version__
+
+    return {
+        "version": __version__,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": "moto" if args.provider == "s3" else args.provider,
+        "scale": args.scale,
+        "results": results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--provider", choices=["s3", "memory", "local"], default="s3",
+        help="Provider of the benchmarked drive; s3 runs against a local moto server.",
+    )
+    parser.add_argument("--scale", choices=SCALES.keys(), default="quick", help="Size of the benchmarks.")
+    parser.add_argument(
+        "--benchmarks", nargs="+", default=["listing", "read_save", "recursive", "concurrent"],
+        choices=["listing", "read_save", "recursive", "concurrent"], help="Benchmarks to run.",
+    )
+    parser.add_argument("--output", help="File to write the JSON results to (default: stdout).")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against.")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "access_key")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "secret_key")
+
+    results = asyncio.run(main(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(
+                f"Regression in {regression['benchmark']} {regression['params']}: "
+                f"{regression['median']:.4f}s vs {regression['baseline']:.4f}s (x{regression['ratio']:.2f})",
+                file=sys.stderr,
+            )
+        sys.exit(1 if regressions else 0)
@@ -19,8 +19,11 @@ def _jupyter_labextension_paths():
 
 
 def _jupyter_server_extension_points():
+    from .app import DrivesApp
+
     return [{
-        "module": "jupyter_drives"
+        "module": "jupyter_drives",
+        "app": DrivesApp
     }]
 
 
@@ -32,11 +35,9 @@ def _load_jupyter_server_extension(server_app):
     server_app: jupyterlab.labapp.LabApp
         JupyterLab application instance
     """
-    from .handlers import setup_handlers
+    from .app import DrivesApp
 
-    setup_handlers(server_app.web_app, server_app.config)
-    name = "jupyter_drives"
-    server_app.log.info(f"Registered {name} server extension")
+    return DrivesApp._load_jupyter_server_extension(server_app)
 
 # Entry points
 def get_manager(config: "traitlets.config.Config") -> "jupyter_drives.managers.JupyterDrivesManager":
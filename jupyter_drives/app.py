@@ -0,0 +1,60 @@
+"""
+Server extension application of the drives.
+
+Being an ``ExtensionApp``, the extension is stopped by the shutdown of the server,
+on its event loop, where the saves buffered by the manager are uploaded.
+"""
+import os
+
+from jupyter_server.extension.application import ExtensionApp
+
+from .handlers import setup_handlers
+
+class DrivesApp(ExtensionApp):
+    """Registers the handlers of the drives API, and closes their manager when the server stops."""
+
+    name = "jupyter_drives"
+
+    manager = None
+
+    def initialize_handlers(self):
+        self.manager = setup_handlers(self.serverapp.web_app, self.serverapp.config)
+        if self.manager.config.kernel_file_system and not self.serverapp.gateway_config.gateway_enabled:
+            self._pass_server_url_to_kernels()
+        self.log.info(f"Registered {self.name} server extension")
+
+    def _pass_server_url_to_kernels(self):
+        """Pass the URL and token of the server to the kernels, for the ``drives://`` file system.
+
+        They are added to the environment of the kernel spec of each kernel manager,
+        rather than to the environment of the server, which the other processes it
+        starts (e.g. terminals) inherit.
+        """
+        env = {"JUPYTER_DRIVES_URL": self.serverapp.connection_url}
+        token = self.serverapp.identity_provider.token
+        if token:
+            env["JUPYTER_DRIVES_TOKEN"] = token
+        # the variables already set are inherited by the kernels
+        env = {name: value for name, value in env.items() if name not in os.environ}
+
+        kernel_manager = self.serverapp.kernel_manager
+        create_kernel_manager = kernel_manager.kernel_manager_factory
+
+        def create_drives_kernel_manager(*args, **kwargs):
+            manager = create_kernel_manager(*args, **kwargs)
+            try:
+                kernel_spec = manager.kernel_spec
+            except Exception:
+                # e.g. an unknown kernel, reported when it is started
+                return manager
+            if kernel_spec is not None:
+                # the variables of the kernel spec take precedence
+                kernel_spec.env = dict(env, **kernel_spec.env)
+            return manager
+
+        kernel_manager.kernel_manager_factory = create_drives_kernel_manager
+
+    async def stop_extension(self):
+        """Upload the buffered saves and close the clients of the providers."""
+        if self.manager is not None:
+            await self.manager.close()
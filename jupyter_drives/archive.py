@@ -0,0 +1,128 @@
+"""
+Streaming of ZIP archives of the objects under a prefix.
+
+The archive is written while the objects are listed and read: a few objects following
+the entry being compressed are read ahead concurrently, each into a bounded buffer, and
+the compressed bytes are handed to the caller as soon as they are produced. The memory
+used is therefore bounded by the read-ahead and the size of the chunks, whatever the
+number and the size of the archived objects.
+
+The ZIP entries are written with data descriptors, as the output is not seekable, and
+in the ZIP64 format when their size requires it.
+"""
+import asyncio
+import zipfile
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Callable, List
+
+# objects read ahead of the entry being compressed
+READ_AHEAD = 4
+
+# chunks buffered per object read ahead
+BUFFERED_CHUNKS = 2
+
+# earliest modification time of the ZIP format
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+class _Output():
+    """Unseekable file object collecting the bytes written to the archive."""
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        """Get the bytes written since the last call."""
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+def _date_time(last_modified: datetime):
+    return max(tuple(last_modified.timetuple()[:6]), _ZIP_EPOCH)
+
+async def stream_zip(
+    entries: AsyncIterable[List[dict]],
+    read: Callable[[str], AsyncIterable[bytes]],
+    read_ahead: int = READ_AHEAD,
+    compresslevel: int = 6,
+) -> AsyncIterator[bytes]:
+    """Stream a ZIP archive of objects.
+
+    Args:
+        entries: async iterable of lists of entries, with the ``name`` of the entry in
+            the archive and the ``path``, ``last_modified`` and ``size`` of the object
+        read: callable returning an async iterable of the chunks of the content of an object
+        read_ahead: number of objects read ahead of the entry being compressed
+        compresslevel: deflate compression level
+    Returns:
+        An async iterator of the bytes of the archive.
+    """
+    loop = asyncio.get_running_loop()
+    # entries whose object is being read, in order
+    pending = asyncio.Queue(maxsize=read_ahead)
+    readers = set()
+
+    async def read_object(entry, chunks):
+        try:
+            async for chunk in read(entry["path"]):
+                await chunks.put(chunk)
+        except Exception as e:
+            await chunks.put(e)
+            return
+        await chunks.put(None)
+
+    async def produce():
+        try:
+            async for page in entries:
+                for entry in page:
+                    chunks = asyncio.Queue(maxsize=BUFFERED_CHUNKS)
+                    # wait for room in the read-ahead before reading the object
+                    await pending.put((entry, chunks))
+                    reader = asyncio.ensure_future(read_object(entry, chunks))
+                    readers.add(reader)
+                    reader.add_done_callback(readers.discard)
+        except Exception as e:
+            await pending.put(e)
+            return
+        await pending.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    output = _Output()
+    try:
+        with zipfile.ZipFile(output, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as archive:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                entry, chunks = item
+
+                info = zipfile.ZipInfo(entry["name"], date_time=_date_time(entry["last_modified"]))
+                info.compress_type = zipfile.ZIP_DEFLATED
+                # the ZIP64 format is chosen from the expected size
+                info.file_size = entry["size"]
+                with archive.open(info, mode="w") as file:
+                    while True:
+                        chunk = await chunks.get()
+                        if chunk is None:
+                            break
+                        if isinstance(chunk, Exception):
+                            raise chunk
+                        # compress out of the event loop
+                        await loop.run_in_executor(None, file.write, chunk)
+                        data = output.drain()
+                        if data:
+                            yield data
+                yield output.drain()
+        # central directory
+        yield output.drain()
+    finally:
+        for task in [producer, *readers]:
+            task.cancel()
+        await asyncio.gather(producer, *readers, return_exceptions=True)
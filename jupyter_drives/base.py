@@ -1,20 +1,27 @@
 import os
 from sys import platform
-import entrypoints
-from traitlets import Enum, Unicode, default, Set
+from traitlets import Bool, Callable, Enum, Float, Int, Unicode, default, Set
 from traitlets.config import Configurable
-import boto3
 
-# Supported third-party services
+# Supported third-party services, filled from the entry points on first use
 MANAGERS = {}
 
-# Moved to the architecture of having one provider independent manager.
-# Keeping the loop in case of future developments that need this feature.
-for entry in entrypoints.get_group_all("jupyter_drives.manager_v1"):
-    MANAGERS[entry.name] = entry
+def get_managers():
+    """Get the drives managers registered through the ``jupyter_drives.manager_v1`` entry points."""
+    if len(MANAGERS) == 0:
+        import entrypoints
+
+        # Moved to the architecture of having one provider independent manager.
+        # Keeping the loop in case of future developments that need this feature.
+        for entry in entrypoints.get_group_all("jupyter_drives.manager_v1"):
+            MANAGERS[entry.name] = entry
+    return MANAGERS
 
 # Supported providers
-PROVIDERS = ['s3', 'gcs', 'http']
+PROVIDERS = ['s3', 'gcs', 'http', 'local', 'memory']
+
+# Providers served by obstore local and in-memory stores
+LOCAL_PROVIDERS = ['local', 'memory']
 
 class DrivesConfig(Configurable):
     """
@@ -49,6 +56,13 @@ class DrivesConfig(Configurable):
         help = "Region name.",
     )
     
+    endpoint_url = Unicode(
+        None,
+        config=True,
+        allow_none=True,
+        help="Custom endpoint of an S3 compatible service (e.g. MinIO or a local moto server).",
+    )
+
     api_base_url = Unicode(
         config=True,
         help="Base URL of the provider service REST API.",
@@ -64,6 +78,13 @@ class DrivesConfig(Configurable):
         elif self.provider == "gcs":
             return "https://www.googleapis.com/"   
 
+    local_root = Unicode(
+        None,
+        config=True,
+        allow_none=True,
+        help="Directory whose sub-directories are listed as drives of the local provider. Defaults to the current working directory when the provider is local.",
+    )
+
     provider = Enum(
         PROVIDERS,
         default_value="s3",
@@ -83,6 +104,186 @@ class DrivesConfig(Configurable):
         help="List of drives that should be included in drive browser listing. Drive names should be separated by spaces.",
     )
 
+    initial_concurrency = Int(
+        16,
+        config=True,
+        help="Initial number of concurrent provider calls per drive. The limit grows additively while calls succeed and is halved when the provider throttles requests.",
+    )
+
+    max_concurrency = Int(
+        64,
+        config=True,
+        help="Maximum number of concurrent provider calls per drive.",
+    )
+
+    max_retries = Int(
+        5,
+        config=True,
+        help="Number of retries of provider calls failing with a transient error (e.g. 503 SlowDown).",
+    )
+
+    retry_backoff = Float(
+        0.1,
+        config=True,
+        help="Base delay in seconds of the jittered exponential backoff between retries.",
+    )
+
+    hedge_percentile = Float(
+        0,
+        config=True,
+        help="Percentile of the recent latencies (e.g. 95) after which a HEAD or small GET call to the provider is hedged by a second identical call, keeping the first response. 0 disables hedging.",
+    )
+
+    hedge_budget = Float(
+        0.05,
+        config=True,
+        help="Highest fraction of the hedgeable provider calls which are hedged.",
+    )
+
+    listing_shards = Int(
+        8,
+        config=True,
+        help="Number of key ranges listed concurrently when listing all the objects under a prefix, e.g. for recursive deletes. 1 lists them sequentially.",
+    )
+
+    archive_read_ahead = Int(
+        4,
+        config=True,
+        help="Number of objects read concurrently ahead of the one being compressed when streaming a ZIP archive of a directory.",
+    )
+
+    extract_concurrency = Int(
+        16,
+        config=True,
+        help="Number of files written concurrently when extracting an uploaded archive.",
+    )
+
+    sync_root = Unicode(
+        None,
+        config=True,
+        allow_none=True,
+        help="Directory the local directories synced with drives must be under. Defaults to the current working directory.",
+    )
+
+    sync_concurrency = Int(
+        8,
+        config=True,
+        help="Number of files transferred, or compared, concurrently when syncing a local directory with a drive.",
+    )
+
+    sync_state_dir = Unicode(
+        None,
+        config=True,
+        allow_none=True,
+        help="Directory the states recorded by the syncs are saved in, so that the files unchanged since the previous sync aren't read after a restart. Defaults to the jupyter_drives/syncs directory of the Jupyter data directory.",
+    )
+
+    prefetch = Bool(
+        False,
+        config=True,
+        help="Whether to prefetch in the background the root listing of the mounted drives and the small notebooks and text files of the listed directories.",
+    )
+
+    prefetch_max_size = Int(
+        1024 * 1024,
+        config=True,
+        help="Size in bytes of the largest file prefetched after a listing.",
+    )
+
+    prefetch_budget = Int(
+        16 * 1024 * 1024,
+        config=True,
+        help="Bytes of the files prefetched after each listing.",
+    )
+
+    prefetch_concurrency = Int(
+        4,
+        config=True,
+        help="Number of files prefetched concurrently after a listing.",
+    )
+
+    http_cache_size = Int(
+        0,
+        config=True,
+        help="Size in bytes of the on-disk cache of the files of http drives, honoring their ETag, Last-Modified and Cache-Control headers. 0 disables the cache.",
+    )
+
+    http_cache_dir = Unicode(
+        None,
+        config=True,
+        allow_none=True,
+        help="Directory of the cache of the files of http drives. Defaults to jupyter_drives/http in the user cache directory.",
+    )
+
+    http_cache_stale_timeout = Float(
+        2.0,
+        config=True,
+        help="Seconds after which a stale cached file of an http drive is served while its origin is revalidating it.",
+    )
+
+    kernel_file_system = Bool(
+        True,
+        config=True,
+        help="Whether to pass the URL and token of the server to the kernels, through the JUPYTER_DRIVES_URL and JUPYTER_DRIVES_TOKEN environment variables, for the drives:// fsspec file system.",
+    )
+
+    thumbnail_cache_size = Int(
+        64 * 1024 * 1024,
+        config=True,
+        help="Size in bytes of the in-memory cache of the thumbnails of images, keyed by the entity tags of the images.",
+    )
+
+    preview_max_size = Int(
+        32 * 1024 * 1024,
+        config=True,
+        help="Bytes of the first row group of a Parquet file read for its preview, the columns beyond are left out.",
+    )
+
+    preview_head_size = Int(
+        256 * 1024,
+        config=True,
+        help="Bytes read from the head of a CSV or Arrow IPC file for its preview.",
+    )
+
+    codec_executor = Enum(
+        ["thread", "process"],
+        default_value="thread",
+        config=True,
+        help="Pool running the encoding and decoding of large file contents, the generation of thumbnails and the decoding of previews, out of the event loop.",
+    )
+
+    codec_workers = Int(
+        None,
+        allow_none=True,
+        config=True,
+        help="Number of workers of the encoding pool (defaults to the executor default).",
+    )
+
+    codec_offload_threshold = Int(
+        1024 * 1024,
+        config=True,
+        help="Size in bytes from which file contents are encoded and decoded in the encoding pool.",
+    )
+
+    write_back_delay = Float(
+        0,
+        config=True,
+        help="Seconds during which successive saves of a file are coalesced and uploaded in the background, the saves being acknowledged immediately. 0 uploads each save before acknowledging it.",
+    )
+
+    server_timing = Bool(
+        True,
+        config=True,
+        help="Whether to return the time spent in provider calls, directory repairs, encoding and serialization as Server-Timing response headers.",
+    )
+
+    span_hook = Callable(
+        None,
+        config=True,
+        allow_none=True,
+        help="Callable receiving the spans of each request as span_hook(name, start_time_ns, end_time_ns, attributes), e.g. jupyter_drives.timing.opentelemetry_span_hook.",
+    )
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # check if credentials were already set in jupyter_notebook_config.py
@@ -97,21 +298,28 @@ class DrivesConfig(Configurable):
     def load_credentials(self):
         if self.credentials_already_set:
             return
-        
-        # automatically extract credentials for S3 drives
-        try:
-            s = boto3.Session()
-            c = s.get_credentials()
-            if c is not None:
-                self.access_key_id = c.access_key
-                self.secret_access_key = c.secret_key
-                self.region_name = s.region_name
-                self.session_token = c.token
-                self.provider = 's3'
+
+        # local and memory drives don't need credentials
+        if self.provider in LOCAL_PROVIDERS:
             return
-        except:
-            # S3 credentials couldn't automatically be extracted through boto
-            pass
+        
+        # automatically extract credentials for S3 drives, boto3 is only imported for them
+        if self.provider == 's3':
+            try:
+                import boto3
+
+                s = boto3.Session()
+                c = s.get_credentials()
+                if c is not None:
+                    self.access_key_id = c.access_key
+                    self.secret_access_key = c.secret_key
+                    self.region_name = s.region_name
+                    self.session_token = c.token
+                    self.provider = 's3'
+                return
+            except:
+                # S3 credentials couldn't automatically be extracted through boto
+                pass
 
         # use environment variables
         if "JP_DRIVES_ACCESS_KEY_ID" in os.environ and "JP_DRIVES_SECRET_ACCESS_KEY" in os.environ:
@@ -0,0 +1,131 @@
+"""
+Encoding and decoding of file contents and API payloads.
+
+Transforms of large contents (JSON serialization of notebooks, base64 and UTF-8
+encoding) run in a thread or process pool, so that a large save doesn't stall the
+requests of the other users on the event loop.
+
+``orjson`` is used when installed to parse request bodies and serialize replies.
+The contents stored in the drives are always serialized with ``json``: ``orjson``
+formats floats and non-ASCII characters differently, and saving an unchanged
+notebook must store the same bytes.
+"""
+import asyncio
+import base64
+import functools
+import hashlib
+import json
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Union
+
+@functools.lru_cache(maxsize=None)
+def _orjson():
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+def encode_json(content: Any) -> bytes:
+    """Serialize the JSON content of a file (e.g. a notebook) to be stored."""
+    return json.dumps(content, indent=2).encode("utf-8")
+
+def encode_base64(content: bytes) -> str:
+    """Encode binary content as base64 text."""
+    return base64.b64encode(content).decode("utf-8")
+
+def decode_base64(content: Union[str, bytes]) -> bytes:
+    """Decode base64 content to bytes."""
+    return base64.b64decode(content)
+
+def encode_text(content: str) -> bytes:
+    """Encode text content to UTF-8 bytes."""
+    return content.encode("utf-8")
+
+def decode_text(content: bytes) -> str:
+    """Decode UTF-8 content to text."""
+    return content.decode("utf-8")
+
+def md5_digest(content: bytes) -> str:
+    """Get the MD5 digest of a content, as in the ETag of single-part S3 uploads."""
+    return hashlib.md5(content).hexdigest()
+
+def loads(body: Union[str, bytes]) -> Any:
+    """Parse a request body."""
+    orjson = _orjson()
+    if orjson is not None:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # e.g. NaN or lone surrogates, accepted by json
+            pass
+    return json.loads(body)
+
+def dumps(reply: Any) -> Union[str, bytes]:
+    """Serialize a reply."""
+    orjson = _orjson()
+    if orjson is not None:
+        try:
+            return orjson.dumps(reply)
+        except TypeError:
+            # e.g. integers larger than 64 bits
+            pass
+    return json.dumps(reply)
+
+class Codec():
+    """
+    Runs the transforms of contents larger than a threshold in an executor.
+
+    Args:
+        executor: ``thread`` or ``process`` pool
+        workers: number of workers of the pool
+        threshold: size in bytes from which transforms are offloaded
+    """
+    def __init__(self, executor: str = "thread", workers: Optional[int] = None, threshold: int = 1024 * 1024) -> None:
+        self._executor_type = executor
+        self._workers = workers
+        self._threshold = threshold
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self._executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="jupyter-drives-codec")
+        return self._executor
+
+    async def run(self, function: Callable, content: Any, size: Optional[int] = None) -> Any:
+        """Apply a transform to a content.
+
+        Args:
+            function: transform, a module-level function to be usable by process pools
+            content: content to transform
+            size: estimated size in bytes of a content of unknown size (e.g. the length
+                of the request body a notebook was parsed from), such contents are
+                always offloaded without it
+        Returns:
+            The transformed content.
+        """
+        if isinstance(content, (str, bytes, bytearray, memoryview)):
+            size = len(content)
+        if size is not None and size < self._threshold:
+            return function(content)
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), function, content)
+
+    async def offload(self, function: Callable, *args: Any) -> Any:
+        """Run a CPU bound function (e.g. decoding an image) in the executor, whatever the size of its arguments.
+
+        Args:
+            function: a module-level function to be usable by process pools
+            args: arguments of the function
+        Returns:
+            The result of the function.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), function, *args)
+
+    def shutdown(self):
+        """Stop the workers of the pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,329 @@
+"""
+Extraction of ZIP and tar archives while they are uploaded.
+
+The archive is read from the request body as it is received, in a worker thread, and
+each of its files is written as its own object as soon as it is extracted: small files
+with a single PUT, larger ones streamed. The PUTs run concurrently up to a bound and
+the extraction waits for them when they fall behind, so neither the archive nor its
+files are staged in memory or on disk.
+
+ZIP archives are read through the local headers of their entries, without their
+central directory at the end. Entries stored without compression must therefore
+have their size in their local header, which is the case unless the archive was
+itself written to a stream.
+"""
+import asyncio
+import concurrent.futures
+import io
+import posixpath
+import struct
+import tarfile
+import zlib
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, Tuple, Union
+
+# files up to this size are uploaded with a single PUT, which can be retried
+SMALL_FILE_SIZE = 8 * 1024 * 1024
+
+# size of the chunks read from the archive and of the streamed parts of large files
+CHUNK_SIZE = 1024 * 1024
+
+# chunks of a large file buffered ahead of its upload
+BUFFERED_CHUNKS = 4
+
+ARCHIVE_FORMATS = ("zip", "tar")
+
+_ZIP_LOCAL_HEADER = b"PK\x03\x04"
+_ZIP_DATA_DESCRIPTOR = b"PK\x07\x08"
+_ZIP_STORED = 0
+_ZIP_DEFLATED = 8
+
+class ArchiveError(ValueError):
+    """The archive is malformed or can't be extracted while streaming."""
+
+class _Bridge():
+    """Runs coroutines on the event loop from the extraction thread."""
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._future: Optional[concurrent.futures.Future] = None
+        self._cancelled = False
+
+    def call(self, coroutine):
+        """Run a coroutine on the event loop and wait for its result."""
+        if self._cancelled:
+            coroutine.close()
+            raise concurrent.futures.CancelledError()
+        self._future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return self._future.result()
+        finally:
+            self._future = None
+
+    def cancel(self):
+        """Stop the extraction thread, e.g. when the upload is cancelled."""
+        self._cancelled = True
+        future = self._future
+        if future is not None:
+            future.cancel()
+
+class _BodyReader(io.RawIOBase):
+    """Blocking file object reading the parts of a body received on the event loop."""
+    def __init__(self, bridge: _Bridge, parts: AsyncIterator[bytes]) -> None:
+        super().__init__()
+        self._bridge = bridge
+        self._parts = parts.__aiter__()
+        self._part = memoryview(b"")
+
+    async def _next_part(self) -> Optional[bytes]:
+        try:
+            return await self._parts.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._part:
+            part = self._bridge.call(self._next_part())
+            if part is None:
+                return 0
+            self._part = memoryview(part)
+        size = min(len(buffer), len(self._part))
+        buffer[:size] = self._part[:size]
+        self._part = self._part[size:]
+        return size
+
+class _PushbackReader():
+    """File object whose read bytes can be given back, e.g. after the end of a deflate stream."""
+    def __init__(self, file) -> None:
+        self._file = file
+        self._pushed = b""
+
+    def push(self, data: bytes):
+        self._pushed = data + self._pushed
+
+    def read(self, size: int) -> bytes:
+        if self._pushed:
+            data, self._pushed = self._pushed[:size], self._pushed[size:]
+            return data
+        return self._file.read(size)
+
+    def read_exactly(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            part = self.read(size - len(data))
+            if not part:
+                raise ArchiveError("The archive is truncated.")
+            data += part
+        return data
+
+def _stored_chunks(file: _PushbackReader, size: int) -> Iterator[bytes]:
+    while size > 0:
+        chunk = file.read_exactly(min(CHUNK_SIZE, size))
+        size -= len(chunk)
+        yield chunk
+
+def _deflated_chunks(file: _PushbackReader, compressed_size: Optional[int]) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    remaining = compressed_size
+    while not decompressor.eof:
+        size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+        data = file.read(size) if size > 0 else b""
+        if not data:
+            raise ArchiveError("The archive is truncated.")
+        if remaining is not None:
+            remaining -= len(data)
+        while data and not decompressor.eof:
+            # bounded output, whatever the compression ratio
+            chunk = decompressor.decompress(data, CHUNK_SIZE)
+            if chunk:
+                yield chunk
+            data = decompressor.unconsumed_tail
+    # the compressed size is unknown with data descriptors, give back what follows the entry
+    file.push(decompressor.unused_data)
+
+def _zip64_sizes(extra: bytes, size: int, compressed_size: int) -> Tuple[int, int, bool]:
+    """Get the sizes of an entry from its ZIP64 extra field, if any."""
+    while len(extra) >= 4:
+        tag, length = struct.unpack("<HH", extra[:4])
+        if tag == 0x0001:
+            values = list(struct.unpack(f"<{length // 8}Q", extra[4:4 + length // 8 * 8]))
+            if size == 0xFFFFFFFF and values:
+                size = values.pop(0)
+            if compressed_size == 0xFFFFFFFF and values:
+                compressed_size = values.pop(0)
+            return size, compressed_size, True
+        extra = extra[4 + length:]
+    return size, compressed_size, False
+
+def _zip_entries(file: _PushbackReader) -> Iterator[Tuple[str, Iterator[bytes]]]:
+    while True:
+        signature = file.read_exactly(4)
+        if signature != _ZIP_LOCAL_HEADER:
+            # central directory, after the last entry
+            return
+        (_, flags, method, _, _, _, compressed_size, size, name_length, extra_length) = struct.unpack(
+            "<HHHHHIIIHH", file.read_exactly(26)
+        )
+        name = file.read_exactly(name_length).decode("utf-8" if flags & 0x800 else "cp437")
+        extra = file.read_exactly(extra_length)
+        size, compressed_size, zip64 = _zip64_sizes(extra, size, compressed_size)
+        has_descriptor = flags & 0x08
+
+        if flags & 0x01:
+            raise ArchiveError(f"The entry {name} is encrypted.")
+        if method == _ZIP_STORED:
+            if has_descriptor:
+                raise ArchiveError(f"The size of the entry {name} is unknown, it can't be extracted while uploaded.")
+            chunks = _stored_chunks(file, compressed_size)
+        elif method == _ZIP_DEFLATED:
+            chunks = _deflated_chunks(file, None if has_descriptor else compressed_size)
+        else:
+            raise ArchiveError(f"The compression method of the entry {name} is not supported.")
+
+        yield name, chunks
+        # skip what the consumer didn't read
+        for _ in chunks:
+            pass
+
+        if has_descriptor:
+            descriptor = file.read_exactly(4)
+            if descriptor == _ZIP_DATA_DESCRIPTOR:
+                descriptor = file.read_exactly(4)
+            # CRC (already read), compressed and uncompressed sizes
+            file.read_exactly(16 if zip64 else 8)
+
+def _tar_entries(file) -> Iterator[Tuple[str, Iterator[bytes]]]:
+    # the tar archive may be compressed (gzip, bz2, xz)
+    with tarfile.open(fileobj=file, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            content = archive.extractfile(member)
+            yield member.name, iter(lambda: content.read(CHUNK_SIZE), b"")
+
+def _object_name(name: str) -> Optional[str]:
+    """Get the path of the object of an entry, relative to the directory of extraction."""
+    if name.endswith('/'):
+        # directories are implied by the paths of their files
+        return None
+    name = posixpath.normpath(name.replace('\\', '/'))
+    if name.startswith('/') or name == '..' or name.startswith('../'):
+        raise ArchiveError(f"The entry {name} is outside of the archive directory.")
+    return name
+
+async def extract_archive(
+    body: AsyncIterator[bytes],
+    archive_format: str,
+    put: Callable[[str, Union[bytes, AsyncIterator[bytes]]], Awaitable],
+    concurrency: int = 16,
+) -> int:
+    """Extract the files of an archive while it is received.
+
+    Args:
+        body: async iterator of the parts of the archive
+        archive_format: ``zip`` or ``tar`` (possibly compressed)
+        put: coroutine function writing a file, called as ``put(name, content)``
+            with the content of small files as bytes and the content of larger
+            ones as an async iterator of chunks, which can't be retried
+        concurrency: number of files written concurrently
+    Returns:
+        The number of extracted files.
+    """
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ArchiveError(f"The archive format {archive_format} is not supported, use one of {', '.join(ARCHIVE_FORMATS)}.")
+
+    loop = asyncio.get_running_loop()
+    bridge = _Bridge(loop)
+    slots = asyncio.Semaphore(concurrency)
+    uploads = set()
+    errors = []
+
+    def check_uploads():
+        if errors:
+            raise errors[0]
+
+    def on_upload_done(task):
+        uploads.discard(task)
+        slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            errors.append(task.exception())
+
+    async def start_upload(name, content):
+        await slots.acquire()
+        try:
+            check_uploads()
+        except Exception:
+            slots.release()
+            raise
+        task = asyncio.ensure_future(put(name, content))
+        uploads.add(task)
+        task.add_done_callback(on_upload_done)
+        return task
+
+    async def start_stream(name):
+        queue = asyncio.Queue(maxsize=BUFFERED_CHUNKS)
+        return queue, await start_upload(name, stream(queue))
+
+    async def feed(queue, task, chunk):
+        # wait for room in the buffer, unless the upload fails meanwhile
+        put_chunk = asyncio.ensure_future(queue.put(chunk))
+        await asyncio.wait([put_chunk, task], return_when=asyncio.FIRST_COMPLETED)
+        if not put_chunk.done():
+            put_chunk.cancel()
+            check_uploads()
+            raise ArchiveError("The upload of a file ended before its content.")
+
+    async def stream(queue):
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def extract():
+        file = io.BufferedReader(_BodyReader(bridge, body), CHUNK_SIZE)
+        entries = _zip_entries(_PushbackReader(file)) if archive_format == "zip" else _tar_entries(file)
+        count = 0
+        for name, chunks in entries:
+            object_name = _object_name(name)
+            if object_name is None:
+                continue
+            count += 1
+            content = b""
+            for chunk in chunks:
+                content += chunk
+                if len(content) > SMALL_FILE_SIZE:
+                    break
+            else:
+                bridge.call(start_upload(object_name, content))
+                continue
+
+            # large file, streamed
+            queue, task = bridge.call(start_stream(object_name))
+            bridge.call(feed(queue, task, content))
+            for chunk in chunks:
+                bridge.call(feed(queue, task, chunk))
+            bridge.call(feed(queue, task, None))
+        return count
+
+    extraction = loop.run_in_executor(None, extract)
+    try:
+        try:
+            count = await asyncio.shield(extraction)
+        except (tarfile.TarError, zlib.error, EOFError) as e:
+            raise ArchiveError(f"The archive is malformed: {e}") from e
+        await asyncio.gather(*uploads, return_exceptions=True)
+        check_uploads()
+        return count
+    finally:
+        bridge.cancel()
+        for task in list(uploads):
+            task.cancel()
+        if not extraction.done():
+            # the thread stops at its next call to the event loop
+            await asyncio.wait([extraction])
+        if not extraction.cancelled():
+            # already raised, unless cancelled
+            extraction.exception()
+        await asyncio.gather(*uploads, return_exceptions=True)
@@ -0,0 +1,150 @@
+"""
+fsspec file system over the obstore stores of the local and memory drives.
+"""
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+import obstore as obs
+from fsspec.asyn import AsyncFileSystem
+
+class ObstoreFileSystem(AsyncFileSystem):
+    """
+    fsspec file system over the obstore stores of mounted drives.
+
+    Paths are of the form ``<drive>/<key>``, as for the S3 file system.
+
+    Args:
+        get_store: callable returning the store of a drive
+        remove_drive: callable removing a drive, called when the root of a drive is deleted
+    """
+    protocol = "jupyter-drives-obstore"
+    root_marker = ""
+    cachable = False
+
+    def __init__(self, get_store: Callable, remove_drive: Optional[Callable] = None, **kwargs) -> None:
+        super().__init__(asynchronous=True, **kwargs)
+        self._get_store = get_store
+        self._remove_drive = remove_drive
+
+    def _split(self, path: str):
+        path = self._strip_protocol(path).strip('/')
+        drive_name, _, key = path.partition('/')
+        return drive_name, self._get_store(drive_name), key
+
+    def _details(self, drive_name: str, meta: Dict) -> Dict:
+        return {
+            "name": drive_name + '/' + meta["path"],
+            "size": meta["size"],
+            "type": "file",
+            "LastModified": meta["last_modified"],
+            "ETag": meta.get("e_tag"),
+        }
+
+    async def _info(self, path, **kwargs):
+        drive_name, store, key = self._split(path)
+        if key:
+            try:
+                meta = await obs.head_async(store, key)
+                return self._details(drive_name, meta)
+            except FileNotFoundError:
+                pass
+        if await self._isdir(path):
+            return {
+                "name": path.strip('/'),
+                "size": 0,
+                "type": "directory",
+                "LastModified": datetime.now(timezone.utc),
+            }
+        raise FileNotFoundError(path)
+
+    async def _isdir(self, path):
+        drive_name, store, key = self._split(path)
+        if not key:
+            return True
+        stream = obs.list(store, key, chunk_size=10)
+        async for batch in stream:
+            for meta in batch:
+                if meta["path"] != key:
+                    return True
+        return False
+
+    async def _exists(self, path, **kwargs):
+        try:
+            await self._info(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def _ls(self, path, detail=True, **kwargs):
+        drive_name, store, key = self._split(path)
+        result = await obs.list_with_delimiter_async(store, key or None)
+        entries = [
+            {"name": drive_name + '/' + prefix, "size": 0, "type": "directory"}
+            for prefix in result["common_prefixes"]
+        ] + [self._details(drive_name, meta) for meta in result["objects"]]
+        return entries if detail else [entry["name"] for entry in entries]
+
+    async def _cat_file(self, path, start=None, end=None, **kwargs):
+        drive_name, store, key = self._split(path)
+        if start is None and end is None:
+            result = await obs.get_async(store, key)
+            return bytes(await result.bytes_async())
+        size = (await obs.head_async(store, key))["size"]
+        start = 0 if start is None else (start if start >= 0 else size + start)
+        end = size if end is None else (end if end >= 0 else size + end)
+        if start >= end:
+            return b""
+        return bytes(await obs.get_range_async(store, key, start=start, end=end))
+
+    async def _pipe_file(self, path, value, **kwargs):
+        drive_name, store, key = self._split(path)
+        await obs.put_async(store, key, value)
+
+    async def _touch(self, path, truncate=True, **kwargs):
+        if truncate or not await self._exists(path):
+            await self._pipe_file(path, b"")
+
+    async def _rm_file(self, path, **kwargs):
+        drive_name, store, key = self._split(path)
+        await obs.delete_async(store, key)
+
+    async def _rm(self, path, recursive=False, **kwargs):
+        drive_name, store, key = self._split(path)
+        if recursive and await self._isdir(path):
+            keys = []
+            async for batch in obs.list(store, key or None, chunk_size=1000):
+                keys.extend(meta["path"] for meta in batch)
+            for offset in range(0, len(keys), 1000):
+                await obs.delete_async(store, keys[offset:offset + 1000])
+            if not key and self._remove_drive is not None:
+                self._remove_drive(drive_name)
+        if key:
+            await obs.delete_async(store, key)
+
+    async def _cp_file(self, path1, path2, **kwargs):
+        drive_name1, store1, key1 = self._split(path1)
+        drive_name2, store2, key2 = self._split(path2)
+        if store1 is store2:
+            await obs.copy_async(store1, key1, key2)
+        else:
+            result = await obs.get_async(store1, key1)
+            await obs.put_async(store2, key2, await result.bytes_async())
+
+    async def _copy(self, path1, path2, recursive=False, **kwargs):
+        if recursive and await self._isdir(path1):
+            drive_name, store, key = self._split(path1)
+            async for batch in obs.list(store, key or None, chunk_size=1000):
+                for meta in batch:
+                    relative = meta["path"][len(key):].lstrip('/') if key else meta["path"]
+                    await self._cp_file(drive_name + '/' + meta["path"], path2.rstrip('/') + '/' + relative)
+        else:
+            await self._cp_file(path1, path2)
+
+    async def _mv_file(self, path1, path2, **kwargs):
+        drive_name1, store1, key1 = self._split(path1)
+        drive_name2, store2, key2 = self._split(path2)
+        if store1 is store2:
+            await obs.rename_async(store1, key1, key2)
+        else:
+            await self._cp_file(path1, path2)
+            await obs.delete_async(store1, key1)
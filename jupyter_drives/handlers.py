@@ -1,21 +1,65 @@
 """
 Module with all of the individual handlers, which will return the results to the frontend.
 """
+import asyncio
 import json
 import logging 
+import re
 import traceback
+import urllib.parse
+from datetime import datetime
 from typing import Optional, Tuple, Union
 
 from jupyter_server.base.handlers import APIHandler, path_regex
 from jupyter_server.utils import url_path_join
 import tornado
+from tornado.iostream import StreamClosedError
 import traitlets
 
-from .base import MANAGERS, DrivesConfig
+from .base import DrivesConfig, get_managers
+from .codec import dumps, loads
 from .manager import JupyterDrivesManager
+from .previews import DEFAULT_PREVIEW_ROWS
+from .thumbnails import DEFAULT_THUMBNAIL_SIZE
+from .timing import RequestTimer, span
 
 NAMESPACE = "jupyter-drives"
 
+# content type of the streamed listings
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# content type of the saves sending the raw content of the file as body
+RAW_CONTENT_TYPE = "application/octet-stream"
+
+# parts of a raw body buffered ahead of the upload to the provider
+RAW_BODY_BUFFERED_PARTS = 16
+
+# content type of the archives of directories
+ZIP_CONTENT_TYPE = "application/zip"
+
+# content type of the previews of tabular files as Arrow IPC streams
+ARROW_STREAM_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+
+_BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _parse_range(header: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse a single byte range of a Range header into offsets, the end being
+    exclusive and a negative start reading the last bytes. Other ranges are ignored,
+    the whole file is then returned.
+    """
+    match = _BYTE_RANGE.match((header or "").strip())
+    if match is None or match.groups() == ("", ""):
+        return None, None
+    first, last = match.groups()
+    if first == "":
+        return -int(last), None
+    if last == "":
+        return int(first), None
+    if int(last) < int(first):
+        return None, None
+    return int(first), int(last) + 1
+
 class JupyterDrivesAPIHandler(APIHandler):
     """
     Base handler for jupyter-drives specific API handlers
@@ -23,6 +67,61 @@ class JupyterDrivesAPIHandler(APIHandler):
     def initialize(self, logger: logging.Logger, manager: JupyterDrivesManager):
         self._jp_log = logger
         self._manager = manager
+        self._timer = None
+
+    async def prepare(self):
+        await super().prepare()
+        config = self._manager.config
+        if config.server_timing or config.span_hook is not None:
+            self._timer = RequestTimer(
+                f"{self.request.method} {type(self).__name__}", config.span_hook
+            ).activate()
+
+    def finish(self, chunk: Optional[Union[str, bytes, dict]] = None, **kwargs):
+        """
+        Override Tornado's RequestHandler.finish to time the serialization
+        of the reply and return the timing breakdown of the request.
+        The content type of replies other than JSON is given as ``set_content_type``.
+        """
+        if self._finished:
+            return super().finish(chunk, **kwargs)
+
+        if isinstance(chunk, dict):
+            with span("serialize"):
+                chunk = dumps(chunk)
+            self.set_header("Content-Type", "application/json; charset=UTF-8")
+        if self._timer is not None and self._manager.config.server_timing:
+            self.set_header("Server-Timing", self._timer.server_timing())
+        return super().finish(chunk, **kwargs)
+
+    async def get_json_body_async(self):
+        """
+        Parse the JSON body of the request, out of the event loop for large bodies.
+        """
+        body = self._request_body()
+        if not body:
+            return None
+        try:
+            return await self._manager.codec.run(loads, body)
+        except ValueError as e:
+            self._jp_log.debug("Bad JSON: %r", body[:1024])
+            raise tornado.web.HTTPError(400, "Invalid JSON in body of request") from e
+
+    def _request_body(self) -> bytes:
+        return self.request.body
+
+    def on_finish(self):
+        if self._timer is not None:
+            try:
+                self._timer.emit({"http.status_code": self.get_status(), "http.target": self.request.path})
+            except Exception:
+                self._jp_log.warning("Failed to emit the request spans", exc_info=True)
+            try:
+                self._timer.deactivate()
+            except ValueError:
+                # the request finished in a different context than it started
+                pass
+            self._timer = None
 
     def write_error(self, status_code, **kwargs):
         """
@@ -30,6 +129,9 @@ class JupyterDrivesAPIHandler(APIHandler):
         This method will be called when an exception is raised from a handler
         """
         self.set_header("Content-Type", "application/json")
+        if status_code == 503:
+            # the provider is throttling requests
+            self.set_header("Retry-After", "1")
         reply = {"error": "Unhandled error"}
         exc_info = kwargs.get("exc_info")
         if exc_info:
@@ -52,11 +154,13 @@ class ConfigJupyterDrivesHandler(JupyterDrivesAPIHandler):
     @tornado.web.authenticated
     async def get(self):
         result = self._manager.get_excluded_drives()
-        self.finish(json.dumps(result["data"]))
+        with span("serialize"):
+            reply = json.dumps(result["data"])
+        self.finish(reply)
 
     @tornado.web.authenticated
     async def post(self):
-        body = self.get_json_body()
+        body = await self.get_json_body_async()
         if 'new_limit' in body:
             result = self._manager.set_listing_limit(**body)
         if 'exclude_drive_name' in body:
@@ -76,29 +180,132 @@ class ListJupyterDrivesHandler(JupyterDrivesAPIHandler):
     @tornado.web.authenticated
     async def get(self):
         result = await self._manager.list_drives()
-        self.finish(json.dumps(result["data"]))
+        with span("serialize"):
+            reply = json.dumps(result["data"])
+        self.finish(reply)
     
     @tornado.web.authenticated
     async def post(self):
-        body = self.get_json_body()
+        body = await self.get_json_body_async()
         result = await self._manager.mount_drive(**body)
         self.finish(result)
 
+@tornado.web.stream_request_body
 class ContentsJupyterDrivesHandler(JupyterDrivesAPIHandler):
     """
     Deals with contents of a drive.
+
+    The content of a file saved with a raw binary body (``PUT`` with the
+    ``application/octet-stream`` content type) is streamed to the provider
+    while it is received. So are the files of an archive sent this way with the
+    ``extract`` query argument (``zip`` or ``tar``), extracted into the directory.
     """
     def initialize(self, logger: logging.Logger, manager: JupyterDrivesManager):
-        return super().initialize(logger, manager)
+        super().initialize(logger, manager)
+        self._body_parts = []
+        self._raw_body = None
+        self._raw_save = None
+
+    async def prepare(self):
+        await super().prepare()
+        if self.request.method == "PUT" and self.request.headers.get("Content-Type", "").startswith(RAW_CONTENT_TYPE):
+            # the body is uploaded before the handler method runs, authenticate first
+            if not self.current_user:
+                raise tornado.web.HTTPError(403)
+            chunk = self.get_query_argument("chunk", None)
+            extract = self.get_query_argument("extract", None)
+            self._raw_body = asyncio.Queue(maxsize=RAW_BODY_BUFFERED_PARTS)
+            if extract is not None:
+                self._raw_save = asyncio.ensure_future(self._manager.extract_archive(
+                    self.path_kwargs["drive"],
+                    self.path_kwargs["path"],
+                    self._iter_raw_body(),
+                    extract,
+                ))
+            else:
+                self._raw_save = asyncio.ensure_future(self._manager.save_raw_file(
+                    self.path_kwargs["drive"],
+                    self.path_kwargs["path"],
+                    self._iter_raw_body(),
+                    int(chunk) if chunk is not None else None,
+                ))
+
+    async def data_received(self, chunk: bytes):
+        if self._raw_body is None:
+            self._body_parts.append(chunk)
+        else:
+            await self._feed_raw_body(chunk)
+
+    async def _feed_raw_body(self, part: Optional[bytes]):
+        if self._raw_save.done():
+            # the upload failed, the error is returned once the body is received
+            return
+        put = asyncio.ensure_future(self._raw_body.put(part))
+        # wait for room in the buffer, unless the upload fails meanwhile
+        await asyncio.wait([put, self._raw_save], return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+
+    async def _iter_raw_body(self):
+        while True:
+            part = await self._raw_body.get()
+            if part is None:
+                return
+            yield part
+
+    def _request_body(self) -> bytes:
+        return b"".join(self._body_parts)
+
+    def on_connection_close(self):
+        if self._raw_save is not None and not self._raw_save.done():
+            self._raw_save.cancel()
+        super().on_connection_close()
     
     @tornado.web.authenticated
     async def get(self, drive: str = "", path: str = ""):
-        result = await self._manager.get_contents(drive, path)
+        if NDJSON_CONTENT_TYPE in self.request.headers.get("Accept", ""):
+            listing = await self._manager.stream_contents(drive, path)
+            if listing is not None:
+                await self._stream_listing(listing)
+                return
+        result = await self._manager.get_contents(drive, path, self.request.headers.get("If-None-Match"))
+        if result.get("etag") is not None:
+            self.set_header("ETag", result["etag"])
+            # answer polling of unchanged contents without serializing them
+            if self.check_etag_header():
+                self.set_status(304)
+                self.finish()
+                return
         self.finish(result)
 
+    async def _stream_listing(self, listing):
+        """
+        Write a listing as newline-delimited JSON, one entry per line, flushing
+        each page of the provider listing as soon as it is retrieved.
+        """
+        self.set_header("Content-Type", NDJSON_CONTENT_TYPE)
+        self.set_header("Cache-Control", "no-cache")
+        try:
+            async for entries in listing:
+                with span("serialize"):
+                    chunk = "".join(json.dumps(entry) + "\n" for entry in entries)
+                self.write(chunk)
+                await self.flush()
+        except StreamClosedError:
+            # the client went away
+            return
+        except tornado.web.HTTPError as e:
+            if not self._headers_written:
+                raise
+            # the status was already sent, report the error in the last line
+            self.write(json.dumps({"error": e.reason}) + "\n")
+        finally:
+            await listing.aclose()
+        self.finish()
+
     @tornado.web.authenticated
     async def post(self, drive: str = "", path: str = ""):
-        body = self.get_json_body()
+        body = await self.get_json_body_async()
         if 'location' in body:
             result = await self._manager.new_drive(drive, **body)
         elif 'is_public' in body:
@@ -109,14 +316,22 @@ class ContentsJupyterDrivesHandler(JupyterDrivesAPIHandler):
 
     @tornado.web.authenticated
     async def patch(self, drive: str = "", path: str = ""):
-        body = self.get_json_body()
+        body = await self.get_json_body_async()
         result = await self._manager.rename_file(drive, path, **body)
         self.finish(result)
 
     @tornado.web.authenticated
     async def put(self, drive: str = "", path: str = ""):
-        body = self.get_json_body()
+        if self._raw_save is not None:
+            # end of the body
+            await self._feed_raw_body(None)
+            result = await self._raw_save
+            self.finish(result)
+            return
+        body = await self.get_json_body_async()
         if 'content' in body: 
+            # JSON contents are encoded out of the event loop depending on the size of the body
+            body["content_size"] = sum(len(part) for part in self._body_parts)
             result = await self._manager.save_file(drive, path, **body)
         elif 'to_path' in body: 
             result = await self._manager.copy_file(drive, path, **body)
@@ -134,13 +349,222 @@ class ContentsJupyterDrivesHandler(JupyterDrivesAPIHandler):
         result = await self._manager.check_file(drive, path)
         self.finish(result)
 
+class CheckpointsJupyterDrivesHandler(JupyterDrivesAPIHandler):
+    """
+    Deals with checkpoints of a file.
+    """
+    def initialize(self, logger: logging.Logger, manager: JupyterDrivesManager):
+        return super().initialize(logger, manager)
+
+    @tornado.web.authenticated
+    async def get(self, drive: str = "", path: str = ""):
+        checkpoint_id = self.get_query_argument("checkpoint_id", None)
+        if checkpoint_id is None:
+            result = await self._manager.list_checkpoints(drive, path)
+        else:
+            result = await self._manager.get_checkpoint(drive, path, checkpoint_id)
+        self.finish(result)
+
+    @tornado.web.authenticated
+    async def post(self, drive: str = "", path: str = ""):
+        result = await self._manager.create_checkpoint(drive, path)
+        self.set_status(201)
+        self.finish(result)
+
+    @tornado.web.authenticated
+    async def patch(self, drive: str = "", path: str = ""):
+        body = await self.get_json_body_async()
+        result = await self._manager.restore_checkpoint(drive, path, **body)
+        self.finish(result)
+
+    @tornado.web.authenticated
+    async def delete(self, drive: str = "", path: str = ""):
+        result = await self._manager.delete_checkpoint(drive, path, self.get_query_argument("checkpoint_id"))
+        self.finish(result)
+
+class ArchiveJupyterDrivesHandler(JupyterDrivesAPIHandler):
+    """
+    Streams ZIP archives of directories.
+    """
+    def initialize(self, logger: logging.Logger, manager: JupyterDrivesManager):
+        return super().initialize(logger, manager)
+
+    @tornado.web.authenticated
+    async def get(self, drive: str = "", path: str = ""):
+        name, archive = await self._manager.download_archive(drive, path)
+        self.set_header("Content-Type", ZIP_CONTENT_TYPE)
+        self.set_header("Content-Disposition", f"attachment; filename*=UTF-8''{urllib.parse.quote(name)}")
+        self.set_header("Cache-Control", "no-cache")
+        try:
+            async for data in archive:
+                self.write(data)
+                await self.flush()
+        except StreamClosedError:
+            # the client went away
+            return
+        except Exception:
+            if not self._headers_written:
+                raise
+            self._jp_log.error(f"Failed to archive {drive}/{path}", exc_info=True)
+            # the status was already sent, truncate the archive so that it is not mistaken for a complete one
+            self.request.connection.close()
+            return
+        finally:
+            await archive.aclose()
+        self.finish()
+
+class SyncJupyterDrivesHandler(JupyterDrivesAPIHandler):
+    """
+    Syncs local directories with directories of a drive.
+    """
+    def initialize(self, logger: logging.Logger, manager: JupyterDrivesManager):
+        return super().initialize(logger, manager)
+
+    @tornado.web.authenticated
+    async def get(self, drive: str = "", path: str = ""):
+        result = await self._manager.get_syncs(drive, path, self.get_query_argument("id", None))
+        self.finish(result)
+
+    @tornado.web.authenticated
+    async def post(self, drive: str = "", path: str = ""):
+        body = await self.get_json_body_async()
+        result = await self._manager.start_sync(drive, path, **body)
+        self.set_status(202)
+        self.finish(result)
+
+    @tornado.web.authenticated
+    async def delete(self, drive: str = "", path: str = ""):
+        result = await self._manager.cancel_sync(drive, path, self.get_query_argument("id"))
+        self.finish(result)
+
+class UsageJupyterDrivesHandler(JupyterDrivesAPIHandler):
+    """
+    Returns the disk usage of directories.
+    """
+    def initialize(self, logger: logging.Logger, manager: JupyterDrivesManager):
+        return super().initialize(logger, manager)
+
+    @tornado.web.authenticated
+    async def get(self, drive: str = "", path: str = ""):
+        result = await self._manager.get_usage(drive, path)
+        self.finish(result)
+
+class FilesJupyterDrivesHandler(JupyterDrivesAPIHandler):
+    """
+    Serves the raw content of files, honoring byte ranges, and the plain listings of
+    directories (``list`` query argument); used by the ``drives://`` file system of
+    the kernels.
+    """
+    def initialize(self, logger: logging.Logger, manager: JupyterDrivesManager):
+        return super().initialize(logger, manager)
+
+    def _set_file_headers(self, info: dict):
+        self.set_header("Content-Type", RAW_CONTENT_TYPE)
+        self.set_header("Accept-Ranges", "bytes")
+        self.set_header("ETag", info["etag"])
+        self.set_header("Last-Modified", datetime.fromisoformat(info["last_modified"]))
+        self.set_header("Cache-Control", "no-cache")
+
+    @tornado.web.authenticated
+    async def head(self, drive: str = "", path: str = ""):
+        result = await self._manager.get_file_info(drive, path)
+        self._set_file_headers(result["data"])
+        self.set_header("Content-Length", result["data"]["size"])
+        self.finish(set_content_type=RAW_CONTENT_TYPE)
+
+    @tornado.web.authenticated
+    async def get(self, drive: str = "", path: str = ""):
+        if self.get_query_argument("list", None) is not None:
+            result = await self._manager.list_directory(drive, path)
+            self.finish(result)
+            return
+
+        start, end = _parse_range(self.request.headers.get("Range"))
+        info, (start, end), chunks = await self._manager.read_file(drive, path, start, end)
+        self._set_file_headers(info)
+        self.set_header("Content-Length", end - start)
+        if end - start < info["size"]:
+            self.set_status(206)
+            self.set_header("Content-Range", f"bytes {start}-{end - 1}/{info['size']}")
+        try:
+            async for data in chunks:
+                self.write(data)
+                await self.flush()
+        except StreamClosedError:
+            # the client went away
+            return
+        except Exception:
+            if not self._headers_written:
+                raise
+            self._jp_log.error(f"Failed to read {drive}/{path}", exc_info=True)
+            # the status was already sent, truncate the content so that it is not mistaken for a complete one
+            self.request.connection.close()
+            return
+        finally:
+            await chunks.aclose()
+        self.finish(set_content_type=RAW_CONTENT_TYPE)
+
+class ThumbnailsJupyterDrivesHandler(JupyterDrivesAPIHandler):
+    """
+    Returns downscaled renderings of images, of the size given by the ``size`` query argument.
+    """
+    def initialize(self, logger: logging.Logger, manager: JupyterDrivesManager):
+        return super().initialize(logger, manager)
+
+    @tornado.web.authenticated
+    async def get(self, drive: str = "", path: str = ""):
+        size = self.get_query_argument("size", None)
+        try:
+            size = int(size) if size is not None else DEFAULT_THUMBNAIL_SIZE
+        except ValueError:
+            raise tornado.web.HTTPError(400, "The size of a thumbnail must be a number of pixels.")
+        content_type, etag, content = await self._manager.get_thumbnail(
+            drive, path, size, self.request.headers.get("If-None-Match")
+        )
+        self.set_header("ETag", etag)
+        self.set_header("Cache-Control", "no-cache")
+        if content is None or self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return
+        self.finish(content, set_content_type=content_type)
+
+class PreviewsJupyterDrivesHandler(JupyterDrivesAPIHandler):
+    """
+    Previews Parquet, Arrow IPC and CSV files: the number of rows is given by the
+    ``rows`` query argument, and the ``format`` is ``json`` or ``arrow``.
+    """
+    def initialize(self, logger: logging.Logger, manager: JupyterDrivesManager):
+        return super().initialize(logger, manager)
+
+    @tornado.web.authenticated
+    async def get(self, drive: str = "", path: str = ""):
+        rows = self.get_query_argument("rows", None)
+        try:
+            rows = int(rows) if rows is not None else DEFAULT_PREVIEW_ROWS
+        except ValueError:
+            raise tornado.web.HTTPError(400, "The number of rows of a preview must be a number.")
+        output_format = self.get_query_argument("format", "json")
+        result = await self._manager.get_preview(drive, path, rows, output_format)
+        if output_format == "arrow":
+            self.finish(result["data"], set_content_type=ARROW_STREAM_CONTENT_TYPE)
+        else:
+            self.finish(result)
+
 handlers = [
     ("drives", ListJupyterDrivesHandler),
     ("drives/config", ConfigJupyterDrivesHandler),
 ]
 
 handlers_with_path = [
-    ("drives", ContentsJupyterDrivesHandler)
+    ("drives", ContentsJupyterDrivesHandler),
+    ("checkpoints", CheckpointsJupyterDrivesHandler),
+    ("archives", ArchiveJupyterDrivesHandler),
+    ("syncs", SyncJupyterDrivesHandler),
+    ("usage", UsageJupyterDrivesHandler),
+    ("files", FilesJupyterDrivesHandler),
+    ("thumbnails", ThumbnailsJupyterDrivesHandler),
+    ("previews", PreviewsJupyterDrivesHandler),
 ]
 
 def setup_handlers(web_app: tornado.web.Application, config: traitlets.config.Config, log: Optional[logging.Logger] = None):
@@ -150,7 +574,7 @@ def setup_handlers(web_app: tornado.web.Application, config: traitlets.config.Co
     log = log or logging.getLogger(__name__)
 
     provider = DrivesConfig(config=config).provider
-    entry_point = MANAGERS.get('drives_manager')
+    entry_point = get_managers().get('drives_manager')
     if entry_point is None:
         log.error(f"JupyterDrives Manager: No manager defined for provider '{provider}'.")
         raise NotImplementedError()
@@ -187,3 +611,4 @@ def setup_handlers(web_app: tornado.web.Application, config: traitlets.config.Co
     log.debug(f"Jupyter-Drives Handlers: {drives_handlers}")
 
     web_app.add_handlers(host_pattern, drives_handlers)
+    return manager
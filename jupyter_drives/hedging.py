@@ -0,0 +1,128 @@
+"""
+Hedging of the idempotent provider calls of a drive.
+
+When a call hasn't returned within a percentile of the recent latencies of its
+operation, a second identical call is issued; the first response is kept and the
+other call is cancelled. This cuts the tail latency of small reads (e.g. S3 HEAD
+and GET requests occasionally taking seconds) at the cost of a few extra calls,
+bounded by a budget: each call earns a fraction of a hedge, and a hedge is only
+issued when a whole one was earned.
+"""
+import asyncio
+import collections
+import time
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from .metrics import PROVIDER_HEDGE_WINS, PROVIDER_HEDGEABLE_CALLS, PROVIDER_HEDGES
+
+# latencies kept per operation
+WINDOW_SIZE = 1000
+
+# latencies recorded before hedging an operation
+MIN_SAMPLES = 20
+
+# shortest delay before hedging, in seconds
+MIN_DELAY = 0.005
+
+# hedges which can be earned ahead, allowing short bursts of slow calls
+MAX_TOKENS = 10.0
+
+class _Latencies():
+    """Recent latencies of an operation."""
+    def __init__(self) -> None:
+        self._latencies: Deque[float] = collections.deque(maxlen=WINDOW_SIZE)
+        self._percentiles: Dict[float, float] = {}
+        self._recorded = 0
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, latency: float):
+        self._latencies.append(latency)
+        self._recorded += 1
+        # sorting the window for each call is wasteful, the percentiles move slowly
+        if self._recorded % MIN_SAMPLES == 0:
+            self._percentiles.clear()
+
+    def percentile(self, percentile: float) -> float:
+        if percentile not in self._percentiles:
+            latencies = sorted(self._latencies)
+            self._percentiles[percentile] = latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+        return self._percentiles[percentile]
+
+class Hedger():
+    """
+    Issues a second identical call when a call is slower than usual.
+
+    Args:
+        name: name of the drive, used as metrics label
+        percentile: percentile of the latencies after which a call is hedged
+        budget: highest fraction of the calls which are hedged
+    """
+    def __init__(self, name: str, percentile: float = 95, budget: float = 0.05) -> None:
+        self.name = name
+        self._percentile = percentile
+        self._budget = budget
+        self._tokens = 0.0
+        self._latencies: Dict[str, _Latencies] = collections.defaultdict(_Latencies)
+
+    def delay(self, operation: str) -> Optional[float]:
+        """Get the delay after which a call of an operation is hedged, if known."""
+        latencies = self._latencies[operation]
+        if len(latencies) < MIN_SAMPLES:
+            return None
+        return max(MIN_DELAY, latencies.percentile(self._percentile))
+
+    def _start(self, operation: str, function: Callable[[], Awaitable]) -> asyncio.Future:
+        started = time.monotonic()
+        task = asyncio.ensure_future(function())
+
+        def record(task):
+            if not task.cancelled() and task.exception() is None:
+                self._latencies[operation].record(time.monotonic() - started)
+
+        task.add_done_callback(record)
+        return task
+
+    async def call(self, operation: str, function: Callable[[], Awaitable]):
+        """Call the provider, hedging the call if it is slow and the budget allows it.
+
+        Args:
+            operation: name of the operation, whose latencies are tracked
+            function: callable returning a new awaitable for each call, which must
+                be idempotent
+        Returns:
+            The result of the first successful call.
+        Raises:
+            The error of the first call if all the calls failed.
+        """
+        PROVIDER_HEDGEABLE_CALLS.labels(self.name, operation).inc()
+        self._tokens = min(MAX_TOKENS, self._tokens + self._budget)
+        delay = self.delay(operation)
+        primary = self._start(operation, function)
+        tasks = [primary]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait([primary], timeout=delay)
+                if not done and self._tokens >= 1:
+                    self._tokens -= 1
+                    PROVIDER_HEDGES.labels(self.name, operation).inc()
+                    tasks.append(self._start(operation, function))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            PROVIDER_HEDGE_WINS.labels(self.name, operation).inc()
+                        return task.result()
+            raise primary.exception()
+        finally:
+            for task in tasks:
+                if task.done():
+                    if not task.cancelled():
+                        # retrieved, the first successful result wins
+                        task.exception()
+                else:
+                    task.cancel()
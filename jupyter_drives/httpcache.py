@@ -0,0 +1,270 @@
+"""
+On-disk cache of the files of HTTP drives.
+
+The origins mounted as HTTP drives (e.g. public dataset mirrors) are often slow and
+rate-limited, while the same files are read over and over. The files are kept on
+disk with their validators and served without calling the origin while they are
+fresh according to their ``Cache-Control`` header. Stale files are revalidated with
+conditional requests (``If-None-Match``, ``If-Modified-Since``), which don't transfer
+the content when it didn't change. When the origin is slow to revalidate or fails,
+the stale file is served unless its response forbids it (``must-revalidate``); the
+revalidation then completes in the background.
+
+The cache is bounded in size, the least recently used files are evicted first.
+"""
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# shortest time between the writes of the access time of a cached file, in seconds
+TOUCH_INTERVAL = 60
+
+_DIRECTIVE = re.compile(r'\s*([a-zA-Z-]+)\s*(?:=\s*"?([^",]*)"?)?\s*(?:,|$)')
+
+def parse_cache_control(header: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse the directives of a ``Cache-Control`` header."""
+    if not header:
+        return {}
+    return {name.lower(): value for name, value in _DIRECTIVE.findall(header)}
+
+def freshness_lifetime(cache_control: Dict[str, Optional[str]]) -> float:
+    """Get the number of seconds during which a response is fresh, 0 if it must always be revalidated."""
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return 0
+    # the cache is shared by the users of the server
+    for directive in ("s-maxage", "max-age"):
+        try:
+            return max(0, int(cache_control[directive]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return 0
+
+class HTTPCache():
+    """
+    Bounded on-disk cache of the files of HTTP drives.
+
+    Args:
+        directory: directory of the cached files
+        max_size: size in bytes of the cached files above which the least recently used ones are evicted
+        stale_timeout: seconds after which a stale file is served while the origin is revalidating it
+        log: logger of the failed revalidations
+    """
+    def __init__(
+        self,
+        directory: str,
+        max_size: int,
+        stale_timeout: float = 2.0,
+        log: Optional[logging.Logger] = None,
+    ) -> None:
+        self._directory = directory
+        self._max_size = max_size
+        self._stale_timeout = stale_timeout
+        self._log = log or logging.getLogger(__name__)
+        # size of the cached files, from the least to the most recently used
+        self._sizes: Optional[collections.OrderedDict[str, int]] = None
+        self._touched: Dict[str, float] = {}
+        self._revalidations: Dict[str, asyncio.Future] = {}
+
+    @property
+    def size(self) -> int:
+        """Size in bytes of the cached files."""
+        return sum(self._sizes.values()) if self._sizes is not None else 0
+
+    def _name(self, key: Hashable) -> str:
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+    def _path(self, name: str, extension: str) -> str:
+        return os.path.join(self._directory, name + extension)
+
+    def _load_index(self):
+        """Find the cached files, e.g. kept from a previous run of the server."""
+        os.makedirs(self._directory, exist_ok=True)
+        entries = []
+        for file_name in os.listdir(self._directory):
+            if not file_name.endswith(".json"):
+                continue
+            name = file_name[:-len(".json")]
+            try:
+                stat = os.stat(self._path(name, ".body"))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        self._sizes = collections.OrderedDict((name, size) for _, name, size in sorted(entries))
+
+    def _read(self, name: str) -> Optional[Tuple[dict, bytes]]:
+        try:
+            with open(self._path(name, ".json")) as file:
+                entry = json.load(file)
+            with open(self._path(name, ".body"), "rb") as file:
+                content = file.read()
+        except (OSError, ValueError):
+            return None
+        if len(content) != entry["size"]:
+            # partially written
+            return None
+        now = time.time()
+        if now - self._touched.get(name, 0) > TOUCH_INTERVAL:
+            # the modification time orders the files by use across restarts
+            self._touched[name] = now
+            try:
+                os.utime(self._path(name, ".body"))
+            except OSError:
+                pass
+        return entry, content
+
+    def _write(self, name: str, entry: dict, content: Optional[bytes]):
+        if content is not None:
+            temporary = self._path(name, ".body.tmp")
+            with open(temporary, "wb") as file:
+                file.write(content)
+            os.replace(temporary, self._path(name, ".body"))
+        temporary = self._path(name, ".json.tmp")
+        with open(temporary, "w") as file:
+            json.dump(entry, file)
+        os.replace(temporary, self._path(name, ".json"))
+
+    def _delete(self, names):
+        for name in names:
+            for extension in (".json", ".body"):
+                try:
+                    os.remove(self._path(name, extension))
+                except OSError:
+                    pass
+
+    async def _remove(self, *names: str):
+        for name in names:
+            self._sizes.pop(name, None)
+            self._touched.pop(name, None)
+        await self._run(self._delete, names)
+
+    async def _evict(self):
+        """Remove the least recently used files until the cache fits in its size."""
+        size = sum(self._sizes.values())
+        evicted = []
+        for name, file_size in self._sizes.items():
+            if size <= self._max_size:
+                break
+            evicted.append(name)
+            size -= file_size
+        await self._remove(*evicted)
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._sizes is not None and self._name(key) in self._sizes
+
+    async def get(
+        self,
+        key: Hashable,
+        fetch: Callable[[dict], Awaitable[Optional[Tuple[dict, dict, bytes]]]],
+    ) -> Tuple[dict, bytes]:
+        """Get a file from the cache, or from the origin when it isn't fresh.
+
+        Args:
+            key: JSON serializable key of the file (e.g. ``[drive_name, path]``)
+            fetch: coroutine function retrieving the file from the origin, called with the
+                validators of the cached file (``if_none_match``, ``if_modified_since``);
+                it returns None when the file is unchanged, otherwise its metadata
+                (``e_tag``, ``last_modified``, ``size``), its attributes (``Cache-Control``)
+                and its content
+        Returns:
+            The metadata of the file and its content.
+        """
+        if self._sizes is None:
+            await self._run(self._load_index)
+        name = self._name(key)
+        cached = await self._run(self._read, name) if name in self._sizes else None
+        if cached is not None:
+            self._sizes.move_to_end(name)
+            entry, content = cached
+            if time.time() - entry["stored"] < entry["lifetime"]:
+                return self._metadata(entry), content
+        elif name in self._sizes:
+            await self._remove(name)
+
+        revalidation = self._revalidations.get(name)
+        if revalidation is None:
+            revalidation = asyncio.ensure_future(self._revalidate(name, cached, fetch))
+            self._revalidations[name] = revalidation
+            revalidation.add_done_callback(lambda _: self._forget_revalidation(name, revalidation))
+
+        can_be_stale = cached is not None and "must-revalidate" not in cached[0]["cache_control"]
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(revalidation),
+                self._stale_timeout if can_be_stale else None,
+            )
+        except asyncio.TimeoutError:
+            self._log.warning(f"Serving the stale cached {key}, its origin is slow.")
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            if not can_be_stale:
+                raise
+            self._log.warning(f"Serving the stale cached {key}, its origin failed: {e}")
+        entry, content = cached
+        return self._metadata(entry), content
+
+    def _forget_revalidation(self, name: str, revalidation: asyncio.Future):
+        if self._revalidations.get(name) is revalidation:
+            del self._revalidations[name]
+        if not revalidation.cancelled():
+            # raised to the waiting requests, or ignored when a stale file was served
+            revalidation.exception()
+
+    async def _revalidate(self, name: str, cached: Optional[Tuple[dict, bytes]], fetch) -> Tuple[dict, bytes]:
+        validators = {}
+        if cached is not None:
+            entry = cached[0]
+            if entry["e_tag"]:
+                validators["if_none_match"] = entry["e_tag"]
+            elif entry["last_modified"]:
+                validators["if_modified_since"] = datetime.fromisoformat(entry["last_modified"])
+        try:
+            response = await fetch(validators)
+        except FileNotFoundError:
+            if name in self._sizes:
+                await self._remove(name)
+            raise
+
+        if response is None:
+            # unchanged, fresh again
+            entry, content = cached
+            entry["stored"] = time.time()
+            await self._run(self._write, name, entry, None)
+            return self._metadata(entry), content
+
+        metadata, attributes, content = response
+        header = attributes.get("Cache-Control") or attributes.get("cache_control")
+        cache_control = parse_cache_control(header)
+        entry = {
+            "e_tag": metadata.get("e_tag"),
+            "last_modified": metadata["last_modified"].isoformat() if metadata.get("last_modified") else None,
+            "size": len(content),
+            "cache_control": cache_control,
+            "lifetime": freshness_lifetime(cache_control),
+            "stored": time.time(),
+        }
+        if "no-store" not in cache_control and len(content) <= self._max_size:
+            await self._run(self._write, name, entry, content)
+            self._sizes[name] = len(content)
+            self._sizes.move_to_end(name)
+            await self._evict()
+        elif name in self._sizes:
+            await self._remove(name)
+        return self._metadata(entry), content
+
+    def _metadata(self, entry: dict) -> dict:
+        return {
+            "e_tag": entry["e_tag"],
+            "last_modified": datetime.fromisoformat(entry["last_modified"]) if entry["last_modified"] else datetime.now(),
+            "size": entry["size"],
+        }
@@ -0,0 +1,280 @@
+"""
+fsspec file system of the drives, for the kernels.
+
+The ``drives://<drive>/<path>`` URLs can be opened in the kernels (e.g. by pandas,
+xarray or pyarrow) while the server extension runs: the file system calls the server
+extension, over HTTP or its Unix socket, instead of the providers. The reads and
+writes thus share the pooled connections, concurrency limits and caches of the
+server, and the credentials of the drives aren't needed in the kernels.
+
+Files are read by byte ranges (e.g. only the footer and the needed row groups of a
+Parquet file), and written while they are streamed to the provider.
+
+The URL and token of the server are taken from the ``JUPYTER_DRIVES_URL`` and
+``JUPYTER_DRIVES_TOKEN`` environment variables, which the server extension passes to
+the kernels, unless given as the ``url`` and ``token`` options.
+"""
+import asyncio
+import email.utils
+import os
+import urllib.parse
+from datetime import datetime
+from typing import Optional
+
+import httpx
+from fsspec.asyn import AsyncFileSystem, sync
+from fsspec.spec import AbstractBufferedFile
+
+# namespace of the server extension API
+NAMESPACE = "jupyter-drives"
+
+# content type of the raw writes
+RAW_CONTENT_TYPE = "application/octet-stream"
+
+# size of the blocks read and of the parts written, in bytes
+BLOCK_SIZE = 5 * 1024 * 1024
+
+# parts of a written file buffered ahead of the upload
+WRITE_BUFFERED_PARTS = 4
+
+# seconds without progress after which a call to the server fails
+TIMEOUT = 300
+
+class DrivesFileSystem(AsyncFileSystem):
+    """
+    fsspec file system of the drives mounted by the server extension.
+
+    Paths are of the form ``<drive>/<path>``. Directories are implicit, as in the
+    object stores; deleting one deletes its contents.
+
+    Args:
+        url: URL of the server (e.g. ``http://localhost:8888/``), or ``http+unix://``
+            followed by the encoded path of its socket and its base URL
+        token: token authenticating to the server
+    """
+    protocol = "drives"
+    root_marker = ""
+
+    def __init__(self, url: Optional[str] = None, token: Optional[str] = None, **kwargs) -> None:
+        super().__init__(**kwargs)
+        url = url or os.environ.get("JUPYTER_DRIVES_URL")
+        if not url:
+            raise ValueError("The URL of the Jupyter server is unknown, set JUPYTER_DRIVES_URL or pass the url option.")
+        self._token = token if token is not None else os.environ.get("JUPYTER_DRIVES_TOKEN")
+        self._socket = None
+        if url.startswith("http+unix://"):
+            socket, _, base_url = url[len("http+unix://"):].partition('/')
+            self._socket = urllib.parse.unquote(socket)
+            url = "http://localhost/" + base_url
+        self._api_url = url.rstrip('/') + '/' + NAMESPACE + '/'
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # created on the loop of the file system, and kept for its connections
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(uds=self._socket) if self._socket else None,
+                headers={"Authorization": f"token {self._token}"} if self._token else None,
+                timeout=TIMEOUT,
+            )
+        return self._client
+
+    def _split(self, path: str):
+        path = self._strip_protocol(path).strip('/')
+        drive_name, _, key = path.partition('/')
+        if not drive_name:
+            raise ValueError("The path must start with the name of a drive.")
+        return drive_name, key
+
+    def _url(self, endpoint: str, path: str) -> str:
+        drive_name, key = self._split(path)
+        return self._api_url + endpoint + '/' + urllib.parse.quote(drive_name) + '/' + urllib.parse.quote(key)
+
+    async def _check(self, response: httpx.Response, path: str):
+        """Raise the error of a failed call as the matching built-in exception."""
+        if response.is_success:
+            return
+        if response.status_code == 404:
+            raise FileNotFoundError(path)
+        if response.status_code == 403:
+            raise PermissionError(path)
+        await response.aread()
+        try:
+            reason = response.json()["error"]
+        except (ValueError, KeyError, TypeError):
+            reason = response.reason_phrase
+        raise OSError(f"{response.status_code} {reason}: {path}")
+
+    async def _request(self, method: str, endpoint: str, path: str, **kwargs) -> httpx.Response:
+        response = await self._get_client().request(method, self._url(endpoint, path), **kwargs)
+        await self._check(response, path)
+        return response
+
+    def _details(self, drive_name: str, entry: dict) -> dict:
+        return {
+            "name": drive_name + '/' + entry["path"],
+            "size": entry["size"],
+            "type": entry["type"],
+            "LastModified": datetime.fromisoformat(entry["last_modified"]) if entry.get("last_modified") else None,
+            "ETag": entry.get("etag"),
+        }
+
+    async def _info(self, path, **kwargs):
+        drive_name, key = self._split(path)
+        if key:
+            response = await self._get_client().head(self._url("files", path))
+            if response.status_code != 404:
+                await self._check(response, path)
+                return {
+                    "name": drive_name + '/' + key,
+                    "size": int(response.headers["Content-Length"]),
+                    "type": "file",
+                    "LastModified": email.utils.parsedate_to_datetime(response.headers["Last-Modified"]),
+                    "ETag": response.headers.get("ETag"),
+                }
+        # raises when it isn't a directory either
+        await self._request("GET", "files", path, params={"list": "1"})
+        return {"name": (drive_name + '/' + key).rstrip('/'), "size": 0, "type": "directory"}
+
+    async def _ls(self, path, detail=True, **kwargs):
+        drive_name, key = self._split(path)
+        response = await self._request("GET", "files", path, params={"list": "1"})
+        entries = [self._details(drive_name, entry) for entry in response.json()["data"]]
+        return entries if detail else [entry["name"] for entry in entries]
+
+    async def _cat_file(self, path, start=None, end=None, **kwargs):
+        if (end is not None and end < 0) or (start is not None and start < 0 and end is not None):
+            # not expressible as a byte range
+            size = (await self._info(path))["size"]
+            start = 0 if start is None else (start if start >= 0 else max(0, size + start))
+            end = end if end >= 0 else size + end
+        headers = {}
+        if start is not None and start < 0:
+            headers["Range"] = f"bytes={start}"
+        elif start or end is not None:
+            start = start or 0
+            if end is not None and end <= start:
+                return b""
+            headers["Range"] = f"bytes={start}-{end - 1 if end is not None else ''}"
+        response = await self._get_client().get(self._url("files", path), headers=headers)
+        if response.status_code == 416:
+            # past the end of the file
+            return b""
+        await self._check(response, path)
+        return response.content
+
+    async def _get_file(self, rpath, lpath, **kwargs):
+        if os.path.isdir(lpath):
+            return
+        async with self._get_client().stream("GET", self._url("files", rpath)) as response:
+            await self._check(response, rpath)
+            with open(lpath, "wb") as file:
+                async for chunk in response.aiter_bytes(BLOCK_SIZE):
+                    file.write(chunk)
+
+    async def _put_stream(self, path, content):
+        """Write a file with a content, or an async iterable of its parts streamed to the provider."""
+        await self._request("PUT", "drives", path, content=content, headers={"Content-Type": RAW_CONTENT_TYPE})
+
+    async def _pipe_file(self, path, value, **kwargs):
+        await self._put_stream(path, value)
+
+    async def _put_file(self, lpath, rpath, **kwargs):
+        if os.path.isdir(lpath):
+            return
+
+        async def parts():
+            with open(lpath, "rb") as file:
+                while True:
+                    part = file.read(BLOCK_SIZE)
+                    if not part:
+                        return
+                    yield part
+
+        await self._put_stream(rpath, parts())
+
+    async def _cp_file(self, path1, path2, **kwargs):
+        # copied by the provider
+        drive_name, key = self._split(path2)
+        await self._request("PUT", "drives", path1, json={"to_path": key, "to_drive": drive_name})
+
+    async def _rm_file(self, path, **kwargs):
+        await self._request("DELETE", "drives", path)
+
+    async def _rm(self, path, recursive=False, **kwargs):
+        for path in path if isinstance(path, list) else [path]:
+            await self._rm_file(path)
+
+    async def _mkdir(self, path, create_parents=True, **kwargs):
+        # an empty directory object, as created by the file browser
+        await self._request("POST", "drives", path, json={"type": "directory"})
+
+    async def _makedirs(self, path, exist_ok=False):
+        if await self._exists(path):
+            if not exist_ok:
+                raise FileExistsError(path)
+            return
+        await self._mkdir(path)
+
+    def _open(self, path, mode="rb", block_size=None, autocommit=True, cache_options=None, **kwargs):
+        if "a" in mode:
+            raise NotImplementedError("Files of drives can't be appended to.")
+        return DrivesFile(
+            self,
+            path,
+            mode,
+            block_size=block_size or BLOCK_SIZE,
+            autocommit=autocommit,
+            cache_options=cache_options,
+            **kwargs,
+        )
+
+class DrivesFile(AbstractBufferedFile):
+    """
+    File of a drive, read by byte ranges and written while it is streamed to the server.
+    """
+    _parts = None
+    _upload = None
+
+    def _fetch_range(self, start, end):
+        return sync(self.fs.loop, self.fs._cat_file, self.path, start=start, end=end)
+
+    def _initiate_upload(self):
+        sync(self.fs.loop, self._start_upload)
+
+    async def _start_upload(self):
+        self._parts = asyncio.Queue(maxsize=WRITE_BUFFERED_PARTS)
+
+        async def parts():
+            while True:
+                part = await self._parts.get()
+                if part is None:
+                    return
+                yield part
+
+        self._upload = asyncio.ensure_future(self.fs._put_stream(self.path, parts()))
+
+    async def _send(self, part: Optional[bytes]):
+        put = asyncio.ensure_future(self._parts.put(part))
+        # wait for room in the buffer, unless the upload fails meanwhile
+        await asyncio.wait([put, self._upload], return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            # raises the error of the upload
+            self._upload.result()
+
+    async def _finish_upload(self):
+        await self._send(None)
+        await self._upload
+
+    def _upload_chunk(self, final=False):
+        part = self.buffer.getvalue()
+        if part:
+            sync(self.fs.loop, self._send, part)
+        if final:
+            sync(self.fs.loop, self._finish_upload)
+        return True
+
+    def discard(self):
+        if self._upload is not None:
+            self.fs.loop.call_soon_threadsafe(self._upload.cancel)
@@ -0,0 +1,267 @@
+"""
+Adaptive concurrency limiter of the provider calls of a drive.
+
+The number of calls in flight follows an AIMD (additive increase, multiplicative
+decrease) policy: each successful call raises the limit by ``1 / limit`` (about one
+slot per round of calls) and a throttling response (e.g. S3 ``503 SlowDown``) halves
+it. Transient errors are retried with full-jitter exponential backoff.
+"""
+import asyncio
+import collections
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+from .metrics import (
+    PROVIDER_CONCURRENCY_LIMIT,
+    PROVIDER_IN_FLIGHT,
+    PROVIDER_QUEUE_DEPTH,
+    PROVIDER_RETRIES,
+    PROVIDER_THROTTLES,
+)
+from .timing import span
+
+# error codes returned by the providers when throttling requests
+THROTTLING_CODES = {
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "TooManyRequests",
+    "TooManyRequestsException",
+    "rateLimitExceeded",
+    "userRateLimitExceeded",
+}
+
+# error codes of transient failures of the providers
+TRANSIENT_CODES = {
+    "InternalError",
+    "ServiceUnavailable",
+    "RequestTimeout",
+    "backendError",
+    "internalError",
+}
+
+# HTTP statuses of throttled and transient failures
+THROTTLING_STATUSES = {429, 503}
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+class ProviderThrottledError(Exception):
+    """The provider kept throttling a call after all retries."""
+
+def _error_chain(error: BaseException):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+def _status_and_code(error: BaseException):
+    response = getattr(error, "response", None)
+    # botocore ClientError
+    if isinstance(response, dict):
+        return (
+            response.get("ResponseMetadata", {}).get("HTTPStatusCode"),
+            response.get("Error", {}).get("Code"),
+        )
+    # httpx and requests errors carry the response, aiohttp, tornado and gcsfs ones the status
+    status = getattr(response, "status_code", None)
+    if status is None:
+        status = getattr(error, "status_code", None) or getattr(error, "status", None) or getattr(error, "code", None)
+    return (status if isinstance(status, int) and not isinstance(status, bool) else None), None
+
+def _transient_types():
+    types = (asyncio.TimeoutError, TimeoutError, ConnectionError)
+    # httpx is imported lazily, its errors can't be raised before
+    httpx = sys.modules.get("httpx")
+    if httpx is not None:
+        types += (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+    return types
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Whether an error is a throttling response of the provider.
+
+    Errors are classified by their status and error codes only, their messages may
+    hold object paths (e.g. ``data/503.json``).
+    """
+    for e in _error_chain(error):
+        status, code = _status_and_code(e)
+        if code in THROTTLING_CODES or status in THROTTLING_STATUSES:
+            return True
+    return False
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether an error is worth retrying."""
+    if is_throttling_error(error):
+        return True
+    transient_types = _transient_types()
+    for e in _error_chain(error):
+        if isinstance(e, transient_types):
+            return True
+        status, code = _status_and_code(e)
+        if status in TRANSIENT_STATUSES or code in TRANSIENT_CODES:
+            return True
+    return False
+
+class AdaptiveLimiter():
+    """
+    AIMD concurrency limiter of the provider calls of a drive.
+
+    Args:
+        name: name of the drive, used as metrics label
+        initial: initial limit of concurrent calls
+        minimum: lowest limit the throttling can bring the limit to
+        maximum: highest limit
+        decrease_factor: factor applied to the limit on throttling
+        max_retries: number of retries of transient errors
+        backoff: base delay of the retries, in seconds
+        max_backoff: highest delay of the retries, in seconds
+    """
+    def __init__(
+        self,
+        name: str,
+        initial: int = 16,
+        minimum: int = 1,
+        maximum: int = 64,
+        decrease_factor: float = 0.5,
+        max_retries: int = 5,
+        backoff: float = 0.1,
+        max_backoff: float = 5.0,
+    ) -> None:
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._decrease_factor = decrease_factor
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._waiters = collections.deque()
+        self._last_decrease = 0.0
+        self._update_metrics()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a slot."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def _update_metrics(self):
+        PROVIDER_QUEUE_DEPTH.labels(self.name).set(self.queue_depth)
+        PROVIDER_IN_FLIGHT.labels(self.name).set(self.in_flight)
+        PROVIDER_CONCURRENCY_LIMIT.labels(self.name).set(int(self.limit))
+
+    def _wake_up(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+        self._update_metrics()
+
+    async def acquire(self):
+        """Wait for a slot."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self._update_metrics()
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_metrics()
+        try:
+            with span("queue"):
+                await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over while being cancelled
+                self.release()
+            else:
+                self._update_metrics()
+            raise
+
+    def release(self):
+        """Give back a slot."""
+        self.in_flight -= 1
+        self._wake_up()
+
+    def on_success(self):
+        """Additive increase of the limit."""
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._wake_up()
+
+    def on_throttle(self, started: Optional[float] = None):
+        """Multiplicative decrease of the limit.
+
+        Args:
+            started: time at which the throttled call started (``time.monotonic``);
+                throttling responses of calls started before the previous decrease
+                are ignored, so that a burst of them only decreases the limit once.
+        """
+        PROVIDER_THROTTLES.labels(self.name).inc()
+        if started is not None and started < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        self.limit = max(self.minimum, self.limit * self._decrease_factor)
+        self._update_metrics()
+
+    def _feedback(self, error: Optional[BaseException], started: float):
+        if error is None:
+            self.on_success()
+        elif is_throttling_error(error):
+            self.on_throttle(started)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the enclosed block, without retries (e.g. for streams)."""
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self._feedback(e, started)
+            raise
+        else:
+            self._feedback(None, started)
+        finally:
+            # also when cancelled, or when a generator holding the slot is closed (GeneratorExit)
+            self.release()
+
+    async def call(self, function: Callable[[], Awaitable]):
+        """Call the provider, retrying transient errors with jittered backoff.
+
+        Args:
+            function: callable returning a new awaitable for each attempt
+        Returns:
+            The result of the call.
+        """
+        attempt = 0
+        while True:
+            await self.acquire()
+            started = time.monotonic()
+            try:
+                result = await function()
+            except asyncio.CancelledError:
+                self.release()
+                raise
+            except Exception as e:
+                self.release()
+                self._feedback(e, started)
+                if attempt >= self._max_retries or not is_transient_error(e):
+                    if is_throttling_error(e):
+                        raise ProviderThrottledError(
+                            f"The provider is throttling requests to {self.name}, please retry later: {e}"
+                        ) from e
+                    raise
+                attempt += 1
+                PROVIDER_RETRIES.labels(self.name).inc()
+                # full jitter
+                await asyncio.sleep(random.uniform(0, min(self._max_backoff, self._backoff * 2 ** attempt)))
+                continue
+            self.release()
+            self._feedback(None, started)
+            return result
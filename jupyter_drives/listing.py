@@ -0,0 +1,309 @@
+"""
+Parallel listing of all the objects under a prefix.
+
+Listing a prefix with millions of keys through a single ``obs.list`` stream is bound by
+the latency of each page. Here the first page is listed alone, then the rest of the key
+space is probed for existing keys, listing a single key after offsets derived from the
+keys of that page (e.g. incrementing the characters following a common prefix). It is
+split at the keys found into contiguous ranges of about the same estimated number of
+keys, which are listed concurrently, each buffering its pages up to a budget shared by
+all the ranges, and their objects are yielded in key order, as a sequential listing would.
+
+The ranges are contiguous, so no object is missed whatever the distribution of the keys;
+the distribution only affects how well the work is balanced across the ranges, e.g. keys
+made of characters absent from the first page may be left in a single range.
+"""
+import asyncio
+import bisect
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional
+
+from .timing import timed_iter
+
+# ranges listed per concurrent shard, more ranges balance skewed key spaces better
+RANGES_PER_SHARD = 4
+
+# pages buffered ahead of the merge per shard, across all the ranges
+BUFFERED_PAGES_PER_SHARD = 4
+
+# keys probed per range in each round of the sampling of the key space, and rounds
+PROBES_PER_RANGE = 2
+PROBE_ROUNDS = 3
+
+# characters of the keys read to estimate their position in the key space
+POSITION_DIGITS = 12
+
+@asynccontextmanager
+async def _no_slot():
+    yield
+
+async def iter_pages(stream, slot: Callable, name: str = "list") -> AsyncIterator:
+    """Iterate over the pages of a provider stream, holding a slot only while each page is requested.
+
+    The slot is released before a page is handed over, so that a consumer making its
+    own calls under the same limiter (e.g. deleting the listed objects) can't wait for
+    a slot held by the stream it reads, and so that a consumer going away (e.g. an
+    aborted download) doesn't hold a slot.
+
+    Args:
+        stream: async iterable of pages, e.g. an ``obs.list`` stream or the chunks of an ``obs.get`` body
+        slot: async context manager factory held by each page request
+        name: name of the span of the page requests
+    """
+    iterator = timed_iter(name, stream).__aiter__()
+    try:
+        while True:
+            async with slot():
+                try:
+                    page = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield page
+    finally:
+        await iterator.aclose()
+
+
+def _alphabet(keys: List[str]) -> List[str]:
+    """Sorted characters of the keys, after the prefix common to all of them."""
+    depth = len(os.path.commonprefix([keys[0], keys[-1]]))
+    return sorted({c for key in keys for c in key[depth:]})
+
+def _offsets_between(previous: str, low: str, high: Optional[str], alphabet: List[str], end: int) -> List[str]:
+    """Offsets to probe for keys between ``low`` and ``high``, or following ``low`` if ``high`` is None.
+
+    The offsets replace a character of ``low`` by a greater character of the alphabet:
+    at the position where ``low`` and ``high`` diverge and the one after it, or from the
+    position after the one where ``previous`` and ``low`` diverge up to the separator at
+    ``end``.
+    """
+    if high is None:
+        depth = len(os.path.commonprefix([previous, low]))
+        positions = range(min(depth + 1, len(low) - 1), end, -1)
+    else:
+        depth = len(os.path.commonprefix([low, high]))
+        positions = [position for position in (depth + 1, depth) if position < len(low)]
+    offsets = []
+    for position in positions:
+        offsets += [low[:position] + c for c in alphabet if c > low[position]]
+    return [offset for offset in offsets if high is None or offset < high]
+
+def _estimate_positions(keys: List[str], alphabet: List[str]) -> List[int]:
+    """Estimate the positions of sorted keys in their key space, as numbers in base of the alphabet."""
+    start = len(os.path.commonprefix([keys[0], keys[-1]]))
+    base = len(alphabet) + 1
+    positions = []
+    for key in keys:
+        position = 0
+        for i in range(start, start + POSITION_DIGITS):
+            # characters out of the alphabet rank as the next character of the alphabet
+            position = position * base + (bisect.bisect_left(alphabet, key[i]) + 1 if i < len(key) else 0)
+        positions.append(position)
+    return positions
+
+def split_key_space(keys: List[str], count: int, alphabet: Optional[List[str]] = None) -> List[str]:
+    """Pick boundaries among sampled keys, splitting the key space following the first one into ranges.
+
+    The number of keys between two sampled keys is estimated from their positions in the
+    key space, reading the keys as numbers in base of the alphabet, so that the ranges
+    get about the same number of keys.
+
+    Args:
+        keys: sorted sample of existing keys, the first one starting the key space
+        count: number of ranges
+        alphabet: sorted characters of the keys, by default the characters of ``keys``
+    Returns:
+        Up to ``count - 1`` sorted boundaries, all sampled keys greater than the first one.
+    """
+    if len(keys) < 2:
+        return []
+    positions = _estimate_positions(keys, alphabet or _alphabet(keys))
+    span = positions[-1] - positions[0]
+    boundaries = []
+    i = 1
+    for range_index in range(1, count):
+        target = positions[0] + span * range_index // count
+        while i < len(keys) and positions[i] < target:
+            i += 1
+        if i == len(keys):
+            break
+        if keys[i] not in boundaries[-1:]:
+            boundaries.append(keys[i])
+    return boundaries
+
+async def _sample_key_space(store, prefix: str, keys: List[str], count: int, slot: Callable) -> List[str]:
+    """Probe the key space following the first page of a listing for keys to split it at.
+
+    Each round lists one key after offsets derived from the keys known so far, first
+    following the last key, then within the gaps between the keys found that are
+    estimated to hold more than a range.
+
+    Args:
+        store: obstore store to list
+        prefix: prefix of the objects to list
+        keys: sorted keys of the first page
+        count: number of ranges
+        slot: async context manager factory held by each probe
+    Returns:
+        The sorted keys found, after the last key of the first page, which starts the list.
+    """
+    import obstore as obs
+    import pyarrow
+
+    alphabet = _alphabet(keys)
+    # offsets after the separator following the prefix are not under the prefix
+    end = len(prefix) if prefix else -1
+
+    async def probe(offset):
+        pages = iter_pages(obs.list(store, prefix, offset=offset, chunk_size=1, return_arrow=True), slot, "probe")
+        try:
+            async for batch in pages:
+                paths = pyarrow.record_batch(batch).column("path")
+                if len(paths):
+                    return paths[0].as_py()
+        finally:
+            await pages.aclose()
+        return None
+
+    sampled = [keys[-1]]
+    previous = keys[len(keys) // 2]
+    gaps = [(previous, keys[-1], None)]
+    probed = set()
+    for _ in range(PROBE_ROUNDS):
+        offsets = sorted(
+            {offset for gap in gaps for offset in _offsets_between(*gap, alphabet, end)} - probed
+        )
+        budget = count * PROBES_PER_RANGE
+        if len(offsets) > budget:
+            offsets = [offsets[i * len(offsets) // budget] for i in range(budget)]
+        if not offsets:
+            break
+        probed.update(offsets)
+        found = await asyncio.gather(*(probe(offset) for offset in offsets))
+        sampled = sorted(set(sampled).union(key for key in found if key is not None))
+
+        # refine the gaps holding more than a range, and the unbounded one after the last key
+        positions = _estimate_positions(sampled, alphabet)
+        width = (positions[-1] - positions[0]) // count
+        gaps = [
+            (sampled[i], sampled[i], sampled[i + 1])
+            for i in range(len(sampled) - 1)
+            if positions[i + 1] - positions[i] > width
+        ]
+        gaps.append((sampled[-2] if len(sampled) > 1 else previous, sampled[-1], None))
+    return sampled
+
+async def list_sharded(
+    store,
+    prefix: str,
+    shards: int = 8,
+    chunk_size: int = 1000,
+    slot: Optional[Callable] = None,
+) -> AsyncIterator[List[dict]]:
+    """List all the objects under a prefix, with concurrent range listings.
+
+    The store must list keys in lexicographic order (e.g. S3, GCS or memory stores).
+
+    Args:
+        store: obstore store to list
+        prefix: prefix of the objects to list
+        shards: number of ranges listed concurrently
+        chunk_size: number of objects per page
+        slot: async context manager factory held by each page request, e.g. a concurrency limiter slot
+    Returns:
+        An async iterator of lists of objects metadata, in key order.
+    """
+    import obstore as obs
+    import pyarrow
+
+    slot = slot or _no_slot
+
+    # list the first page alone to sample the keys
+    first_page = []
+    pages = iter_pages(obs.list(store, prefix, chunk_size=chunk_size, return_arrow=True), slot)
+    async for batch in pages:
+        first_page = pyarrow.record_batch(batch).to_pylist()
+        break
+    await pages.aclose()
+    if first_page:
+        yield first_page
+    if len(first_page) < chunk_size:
+        return
+
+    keys = [object["path"] for object in first_page]
+    if shards > 1:
+        count = shards * RANGES_PER_SHARD
+        sampled = await _sample_key_space(store, prefix, keys, count, slot)
+        boundaries = split_key_space(sampled, count, _alphabet(keys))
+    else:
+        sampled, boundaries = keys[-1:], []
+    # ranges of keys, after their start and up to their end (included)
+    ranges = list(zip(sampled[:1] + boundaries, boundaries + [None]))
+    queues = [asyncio.Queue() for _ in ranges]
+    next_range = 0
+
+    # pages buffered ahead of the merge, shared by the ranges so that they progress independently
+    budget = shards * BUFFERED_PAGES_PER_SHARD
+    buffered = 0
+    merging = 0
+    room = asyncio.Condition()
+
+    async def put(index, objects):
+        nonlocal buffered
+        async with room:
+            # the range being merged is never held back
+            await room.wait_for(lambda: index == merging or buffered < budget)
+            buffered += 1
+        queues[index].put_nowait(objects)
+
+    async def list_range(index):
+        start_after, end = ranges[index]
+        queue = queues[index]
+        try:
+            # the pages are queued without holding a slot, the consumer may need one to process them
+            stream = obs.list(store, prefix, offset=start_after, chunk_size=chunk_size, return_arrow=True)
+            pages = iter_pages(stream, slot)
+            async for batch in pages:
+                objects = pyarrow.record_batch(batch).to_pylist()
+                if end is not None:
+                    within = [object for object in objects if object["path"] <= end]
+                    if within:
+                        await put(index, within)
+                    if len(within) < len(objects):
+                        break
+                else:
+                    await put(index, objects)
+            await pages.aclose()
+        except Exception as e:
+            queue.put_nowait(e)
+            return
+        queue.put_nowait(None)
+
+    async def worker():
+        nonlocal next_range
+        # ranges are taken in order, so the range being merged is always listed
+        while next_range < len(ranges):
+            index = next_range
+            next_range += 1
+            await list_range(index)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(shards, len(ranges)))]
+    try:
+        for index, queue in enumerate(queues):
+            async with room:
+                merging = index
+                room.notify_all()
+            while True:
+                objects = await queue.get()
+                if objects is None:
+                    break
+                if isinstance(objects, Exception):
+                    raise objects
+                async with room:
+                    buffered -= 1
+                    room.notify_all()
+                yield objects
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
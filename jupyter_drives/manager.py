@@ -1,27 +1,40 @@
 import http 
+import asyncio
+import collections
 import json
 import logging
 from typing import Dict, List, Optional, Tuple, Union, Any
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, timezone
 
 import os
+import posixpath
+import urllib.parse
 import tornado
-import httpx
 import traitlets
-import base64
+import hashlib
 from io import BytesIO
+from jupyter_core.paths import jupyter_data_dir
 from jupyter_server.utils import url_path_join
 
-import obstore as obs
-from libcloud.storage.types import Provider
-from libcloud.storage.providers import get_driver
-import pyarrow
-from aiobotocore.session import get_session
-import fsspec
-import s3fs
+# The provider SDKs (obstore, libcloud, pyarrow, aiobotocore, fsspec, s3fs, httpx)
+# are imported when the matching provider or code path is first used.
 
+from .hedging import Hedger
+from .httpcache import HTTPCache
+from .limiter import AdaptiveLimiter, ProviderThrottledError
+from .listing import iter_pages
 from .log import get_logger
-from .base import DrivesConfig
+from .base import DrivesConfig, LOCAL_PROVIDERS
+from .codec import Codec, decode_base64, decode_text, encode_base64, encode_json, encode_text, md5_digest
+from .prefetch import Prefetcher
+from . import previews
+from .providers import LocalDrives, MemoryDrives
+from .singleflight import SingleFlight
+from .sync import DIRECTIONS, SyncJob, SyncJobs, Synchronizer
+from . import thumbnails
+from .timing import span, timed_iter
+from .usage import DiskUsage
+from .writeback import WriteBackBuffer
 
 import re
 
@@ -33,6 +46,76 @@ EMPTY_DIR_SUFFIX = '/.jupyter_drives_fix_dir'
 # 15 minutes
 CREDENTIALS_REFRESH = 15 * 60 * 1000
 
+# number of objects whose content digest is kept to skip unchanged saves
+CONTENT_DIGESTS_SIZE = 4096
+
+# directory and suffix of the checkpoints copied next to the files, as Jupyter does
+CHECKPOINTS_DIR = '.ipynb_checkpoints'
+CHECKPOINT_ID = 'checkpoint'
+
+# number of previous versions of a file listed as checkpoints
+CHECKPOINTS_LISTED = 100
+
+# size of the chunks read from the provider when archiving objects
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+# files up to this size are read with hedged calls
+HEDGED_READ_SIZE = 1024 * 1024
+
+# extensions of the files whose content is returned as base64
+BASE64_EXTENSIONS = {'.pdf', '.svg', '.tif', '.tiff', '.jpg', '.jpeg', '.gif', '.png', '.bmp', '.webp'}
+
+def _error_status(error: Exception) -> int:
+    """Get the status of the reply to a failed provider call."""
+    if isinstance(error, ProviderThrottledError):
+        return http.HTTPStatus.SERVICE_UNAVAILABLE
+    if isinstance(error, tornado.web.HTTPError):
+        return error.status_code
+    return http.HTTPStatus.BAD_REQUEST
+
+def _quote_etag(etag: str) -> str:
+    """Get a strong entity tag, quoted as in the ETag header."""
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    return '"' + etag.strip('"') + '"'
+
+def _object_etag(metadata: dict) -> str:
+    """Get the entity tag of an object from its provider metadata."""
+    if metadata.get("e_tag"):
+        return _quote_etag(metadata["e_tag"])
+    return _quote_etag(hashlib.sha1(f"{metadata['last_modified'].isoformat()}:{metadata['size']}".encode()).hexdigest())
+
+def _etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Check an entity tag against an If-None-Match header, as tornado does."""
+    if not if_none_match:
+        return False
+    etags = re.findall(r'\*|(?:W/)?"[^"]*"', if_none_match)
+    if etags and etags[0] == '*':
+        return True
+    return _quote_etag(etag) in (_quote_etag(tag) for tag in etags)
+
+def _checkpoint_path(path: str) -> str:
+    """Get the path of the checkpoint copied next to a file."""
+    directory, name = posixpath.split(path)
+    root, ext = posixpath.splitext(name)
+    return posixpath.join(directory, CHECKPOINTS_DIR, f"{root}-{CHECKPOINT_ID}{ext}")
+
+def _check_checkpoint_id(checkpoint_id: str):
+    """Check the ID of a checkpoint copied next to a file, the only one of the file."""
+    if checkpoint_id != CHECKPOINT_ID:
+        raise tornado.web.HTTPError(
+            status_code=http.HTTPStatus.NOT_FOUND,
+            reason=f"Checkpoint {checkpoint_id} does not exist.",
+        )
+
+def _listing_entry(object: dict) -> dict:
+    """Get the entry of an object in a listing from its provider metadata."""
+    return {
+        "path": object["path"],
+        "last_modified": object["last_modified"].isoformat(),
+        "size": object["size"],
+    }
+
 class JupyterDrivesManager():
     """
     Jupyter-drives manager class.
@@ -48,8 +131,53 @@ class JupyterDrivesManager():
     """
     def __init__(self, config: traitlets.config.Config) -> None:
         self._config = DrivesConfig(config=config)
-        self._client = httpx.AsyncClient()
+        self._http_client = None
         self._content_managers = {}
+        self._limiters = {}
+        self._hedgers = {}
+        self._single_flight = SingleFlight()
+        self._content_digests = collections.OrderedDict()
+        self._codec = Codec(
+            self._config.codec_executor,
+            self._config.codec_workers,
+            self._config.codec_offload_threshold,
+        )
+        self._write_back = None
+        if self._config.write_back_delay > 0:
+            self._write_back = WriteBackBuffer(
+                self._config.write_back_delay,
+                lambda key, content: self._upload_content(*key, content),
+                self.log,
+            )
+        self._syncs = SyncJobs(
+            state_directory=self._config.sync_state_dir or os.path.join(jupyter_data_dir(), "jupyter_drives", "syncs"),
+        )
+        self._usages = {}
+        self._prefetcher = None
+        if self._config.prefetch:
+            self._prefetcher = Prefetcher(
+                lambda drive_name, path: self._single_flight.do(
+                    ("contents", drive_name, path, self._max_files_listed, None),
+                    lambda: self._get_contents(drive_name, path),
+                ),
+                self._config.prefetch_max_size,
+                self._config.prefetch_budget,
+                self._config.prefetch_concurrency,
+                self.log,
+            )
+        self._http_cache = None
+        if self._config.http_cache_size > 0:
+            self._http_cache = HTTPCache(
+                self._config.http_cache_dir or os.path.join(
+                    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                    "jupyter_drives",
+                    "http",
+                ),
+                self._config.http_cache_size,
+                self._config.http_cache_stale_timeout,
+                self.log,
+            )
+        self._thumbnails = thumbnails.ThumbnailCache(self._config.thumbnail_cache_size)
         self._multipartUploads = {};
         self._max_files_listed = 1025
         self._drives = None
@@ -57,20 +185,89 @@ class JupyterDrivesManager():
         self._excluded_drives = self._config.excluded_drives if len(self._config.excluded_drives) != 0 else set()
         self._included_drives =  self._config.included_drives if len(self._config.included_drives) != 0 else set()
 
-        # instate fsspec file system
-        self._file_system = fsspec.filesystem(self._config.provider, asynchronous=True)
+        # drives of the local and memory providers
+        self._local_drives = {
+            "local": LocalDrives(self._config.local_root or os.getcwd()),
+            "memory": MemoryDrives(),
+        }
+
+        # file systems and sessions are created on first use
+        self._default_file_system = None
+        self._local_file_system = None
+        self._aiobotocore_session = None
 
         self._initialize_credentials_refresh()
 
+    @property
+    def config(self) -> DrivesConfig:
+        """The drives configuration"""
+        return self._config
+
     @property
     def base_api_url(self) -> str:
         """The provider base REST API URL"""
         return self._config.api_base_url
     
+    @property
+    def codec(self) -> Codec:
+        """Encoder of the file contents and API payloads."""
+        return self._codec
+
+    @property
+    def pending_saves(self) -> int:
+        """Number of saves waiting for their upload."""
+        return len(self._write_back) if self._write_back is not None else 0
+
     @property
     def log(self) -> logging.Logger:
         return get_logger()
 
+    @property
+    def _client(self):
+        """The HTTP client used to call the provider REST API, its connections are kept alive and reused"""
+        if self._http_client is None:
+            import httpx
+
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self._config.max_concurrency,
+                    max_keepalive_connections=self._config.max_concurrency,
+                ),
+            )
+        return self._http_client
+
+    @property
+    def _file_system(self):
+        """The fsspec file system of the configured provider"""
+        if self._default_file_system is None:
+            if self._config.provider == 's3':
+                self._initialize_s3_file_system()
+            elif self._config.provider in LOCAL_PROVIDERS:
+                self._default_file_system = self._obstore_file_system
+            else:
+                import fsspec
+
+                self._default_file_system = fsspec.filesystem(self._config.provider, asynchronous=True)
+        return self._default_file_system
+
+    @property
+    def _obstore_file_system(self):
+        """The fsspec file system of the local and memory drives"""
+        if self._local_file_system is None:
+            from .filesystems import ObstoreFileSystem
+
+            self._local_file_system = ObstoreFileSystem(self._get_local_store, self._remove_local_drive)
+        return self._local_file_system
+
+    @property
+    def _s3_session(self):
+        """The aiobotocore session used for S3 specific calls"""
+        if self._aiobotocore_session is None:
+            from aiobotocore.session import get_session
+
+            self._aiobotocore_session = get_session()
+        return self._aiobotocore_session
+
     @property
     def per_page_argument(self) -> Optional[Tuple[str, int]]:
         """Returns query argument to set number of items per page.
@@ -83,7 +280,7 @@ class JupyterDrivesManager():
     
     def _initialize_credentials_refresh(self):
         self._drives_refresh_callback()
-        if not self._config.credentials_already_set:
+        if not self._config.credentials_already_set and self._config.provider not in LOCAL_PROVIDERS:
             self._drives_refresh_timer = PeriodicCallback(
                 self._drives_refresh_callback, CREDENTIALS_REFRESH
             )
@@ -91,41 +288,270 @@ class JupyterDrivesManager():
 
     def _drives_refresh_callback(self):
         self._config.load_credentials()
-        self._initialize_s3_file_system()
-        self._initialize_drives()
+        # file system and drives are created again with the new credentials on next use
+        self._default_file_system = None
+        self._aiobotocore_session = None
+        self._drives = None
         self._initialize_content_managers()
 
     def _initialize_s3_file_system(self):
-        # initiate aiobotocore session if we are dealing with S3 drives
+        # initiate S3 file system if we are dealing with S3 drives
         if self._config.provider == 's3':
             if self._config.access_key_id and self._config.secret_access_key: 
-                self._s3_session = get_session()
-                self._file_system = s3fs.S3FileSystem(
+                import s3fs
+
+                self._default_file_system = s3fs.S3FileSystem(
                     anon=False,
                     asynchronous=True,
                     key=self._config.access_key_id,
                     secret=self._config.secret_access_key,
                     token=self._config.session_token,
+                    endpoint_url=self._config.endpoint_url,
                 )
             else:
                 raise tornado.web.HTTPError(
-                    status_code=httpx.codes.BAD_REQUEST,
+                    status_code=http.HTTPStatus.BAD_REQUEST,
                     reason="No credentials specified. Please set them in your user jupyter_server_config file.",
                 )
 
     def _initialize_drives(self):
+        if self._config.provider in ["s3", "gcs"]:
+            from libcloud.storage.types import Provider
+            from libcloud.storage.providers import get_driver
+
         if self._config.provider == "s3":
             S3Drive = get_driver(Provider.S3)
             self._drives = [S3Drive(self._config.access_key_id, self._config.secret_access_key, True, None, None, None, self._config.session_token)]
         elif self._config.provider == 'gcs':
             GCSDrive = get_driver(Provider.GOOGLE_STORAGE)
             self._drives = [GCSDrive(self._config.access_key_id, self._config.secret_access_key)] # verfiy credentials needed
+        elif self._config.provider in LOCAL_PROVIDERS:
+            self._drives = [self._local_drives[self._config.provider]]
+
+    def _get_local_store(self, drive_name):
+        """Get the store of a mounted drive of the local or memory provider."""
+        if drive_name not in self._content_managers:
+            raise FileNotFoundError(f"Drive {drive_name} is not mounted.")
+        return self._content_managers[drive_name]["store"]
+
+    def _remove_local_drive(self, drive_name):
+        """Remove a drive of the local or memory provider."""
+        provider = self._content_managers[drive_name]["provider"]
+        self._local_drives[provider].remove(drive_name)
+        self._content_managers.pop(drive_name, None)
+
+    def _get_file_system(self, drive_name):
+        """Get the fsspec file system serving a drive."""
+        if drive_name in self._content_managers and self._content_managers[drive_name]["provider"] in LOCAL_PROVIDERS:
+            return self._obstore_file_system
+        return self._file_system
+
+    def _get_provider(self, drive_name):
+        """Get the provider of a drive."""
+        if drive_name in self._content_managers:
+            return self._content_managers[drive_name]["provider"]
+        return self._config.provider
+
+    def _get_limiter(self, drive_name):
+        """Get the concurrency limiter of the provider calls of a drive."""
+        if drive_name not in self._limiters:
+            self._limiters[drive_name] = AdaptiveLimiter(
+                drive_name,
+                initial=self._config.initial_concurrency,
+                maximum=self._config.max_concurrency,
+                max_retries=self._config.max_retries,
+                backoff=self._config.retry_backoff,
+            )
+        return self._limiters[drive_name]
+
+    def _get_hedger(self, drive_name):
+        """Get the hedging policy of the provider calls of a drive."""
+        if drive_name not in self._hedgers:
+            self._hedgers[drive_name] = Hedger(
+                drive_name,
+                percentile=self._config.hedge_percentile,
+                budget=self._config.hedge_budget,
+            )
+        return self._hedgers[drive_name]
+
+    async def _provider_call(self, drive_name, operation, function, hedge=None):
+        """Helping function to call the provider through the concurrency limiter of the drive.
+
+        Args:
+            drive_name: name of drive the call is made to
+            operation: name of the span recording the call (e.g. head, get, put)
+            function: callable returning a new awaitable for each attempt
+            hedge: whether a slow call can be hedged by a second identical one, the
+                calls must be idempotent; by default only HEAD calls are hedged
+        """
+        if hedge is None:
+            hedge = operation == "head"
+        if hedge and self._config.hedge_percentile > 0:
+            hedger = self._get_hedger(drive_name)
+            call = lambda: hedger.call(operation, function)
+        else:
+            call = function
+        with span(operation):
+            return await self._get_limiter(drive_name).call(call)
+
+    def _on_change(self, drive_name, path):
+        """Helping function called after an object was written, renamed or deleted.
+
+        Args:
+            drive_name: name of drive where the object changed
+            path: path of the object
+        """
+        path = path.strip('/')
+        # requests started from now on must not share the results of calls in flight
+        self._single_flight.forget(lambda key: key[1] == drive_name)
+        if self._prefetcher is not None:
+            self._prefetcher.forget(drive_name)
+        if drive_name in self._usages:
+            self._usages[drive_name].changed(path)
+        for key in [
+            key for key in self._content_digests
+            if key[0] == drive_name and (key[1] == path or key[1].startswith(path + '/') or path == '')
+        ]:
+            del self._content_digests[key]
+
+    def _remember_digest(self, drive_name, path, digest, etag):
+        """Helping function to keep the digest of the content of an object.
+
+        Args:
+            drive_name: name of drive where the object exists
+            path: path of the object
+            digest: MD5 digest of the content
+            etag: entity tag of the object with this content
+        """
+        if not etag:
+            return
+        self._content_digests[(drive_name, path)] = (digest, etag)
+        self._content_digests.move_to_end((drive_name, path))
+        while len(self._content_digests) > CONTENT_DIGESTS_SIZE:
+            self._content_digests.popitem(last=False)
+
+    async def _get_unchanged_metadata(self, drive_name, path, digest):
+        """Helping function to check whether an object already has a content.
+
+        Args:
+            drive_name: name of drive where the object exists
+            path: path of the object
+            digest: MD5 digest of the content
+        Returns:
+            The metadata of the object if it has the content, None otherwise.
+        """
+        import obstore as obs
+
+        known = self._content_digests.get((drive_name, path))
+        if known is not None and known[0] != digest:
+            return None
+        # the entity tag of single-part S3 uploads is the MD5 digest of their content
+        if known is None and self._get_provider(drive_name) != 's3':
+            return None
+
+        store = self._content_managers[drive_name]["store"]
+        try:
+            metadata = await self._provider_call(drive_name, "head", lambda: obs.head_async(store, path))
+        except Exception:
+            return None
+        etag = _quote_etag(metadata.get("e_tag") or "")
+        if etag != _quote_etag(known[1] if known is not None else digest):
+            # changed by someone else meanwhile
+            return None
+        return metadata
+
+    async def _upload_content(self, drive_name, path, content):
+        """Helping function to upload the content of a file, unless it is unchanged.
+
+        Args:
+            drive_name: name of drive where file exists
+            path: path of the file
+            content: content of the file
+        Returns:
+            The metadata of the object.
+        """
+        import obstore as obs
+
+        digest = await self._codec.run(md5_digest, content)
+        metadata = await self._get_unchanged_metadata(drive_name, path, digest)
+        if metadata is None:
+            store = self._content_managers[drive_name]["store"]
+            try:
+                await self._provider_call(drive_name, "put", lambda: obs.put_async(store, path, content))
+                # the file system caches listings
+                self._get_file_system(drive_name).invalidate_cache(drive_name + '/' + path)
+                metadata = await self._provider_call(drive_name, "head", lambda: obs.head_async(store, path))
+            finally:
+                self._on_change(drive_name, path)
+        self._remember_digest(drive_name, path, digest, metadata.get("e_tag"))
+        return metadata
+
+    def _get_http_cache(self, drive_name):
+        """Get the cache of the files of a drive, if it is an HTTP drive and the cache is enabled."""
+        if self._http_cache is not None and self._get_provider(drive_name) == 'http':
+            return self._http_cache
+        return None
+
+    async def _fetch_http_file(self, drive_name, path, validators):
+        """Helping function to retrieve a file of an HTTP drive, unless it is unchanged.
+
+        Args:
+            drive_name: name of the HTTP drive
+            path: path of the file
+            validators: options of the conditional request (``if_none_match``, ``if_modified_since``)
+        Returns:
+            None if the file is unchanged, otherwise its metadata, attributes and content.
+        """
+        import obstore as obs
+        from obstore.exceptions import NotModifiedError
+
+        store = self._content_managers[drive_name]["store"]
+
+        async def get():
+            try:
+                result = await obs.get_async(store, path, options=validators)
+            except NotModifiedError:
+                return None
+            return result.meta, result.attributes, bytes(await result.bytes_async())
+
+        return await self._provider_call(drive_name, "get", get, hedge=False)
+
+    async def _flush_writes(self, drive_name, path=''):
+        """Helping function to upload the saves buffered for a path and the paths under it.
+
+        Args:
+            drive_name: name of drive where the objects exist
+            path: path of the object or directory (empty string for the whole drive)
+        """
+        if self._write_back is None:
+            return
+        path = path.strip('/')
+        await self._write_back.flush(
+            lambda key: key[0] == drive_name and (key[1] == path or key[1].startswith(path + '/') or path == '')
+        )
+
+    async def close(self):
+        """Upload the buffered saves and stop the workers, e.g. when the server shuts down."""
+        if self._prefetcher is not None:
+            self._prefetcher.cancel()
+        tasks = [job.task for job in self._syncs if job.running]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._write_back is not None:
+            await self._write_back.close()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self._codec.shutdown()
 
     def _initialize_content_managers(self):
         for drive_name, content_manager in self._content_managers.items():
             self._initialize_content_manager(drive_name, content_manager["provider"], content_manager["location"])
 
     def _initialize_content_manager(self, drive_name, provider, region=None):
+        import obstore as obs
+
         try:
             if provider == 's3':
                 if self._config.session_token is None:
@@ -141,11 +567,17 @@ class JupyterDrivesManager():
                         "aws_session_token": self._config.session_token,
                         "aws_region": region,
                     }
-                store = obs.store.S3Store.from_url("s3://" + drive_name + "/", config = configuration)
+                client_options = {}
+                if self._config.endpoint_url:
+                    configuration["aws_endpoint"] = self._config.endpoint_url
+                    client_options["allow_http"] = self._config.endpoint_url.startswith("http://")
+                store = obs.store.S3Store.from_url("s3://" + drive_name + "/", config = configuration, client_options = client_options)
             elif provider == 'gcs':
                 store = obs.store.GCSStore.from_url("gs://" + drive_name + "/", config = {}) # add gcs config
             elif provider == 'http':
                 store = obs.store.HTTPStore.from_url(drive_name, client_options = {}) # add http client config
+            elif provider in LOCAL_PROVIDERS:
+                store = self._local_drives[provider].get_store(drive_name)
 
             self._content_managers[drive_name] = {
                 "store": store,
@@ -154,7 +586,7 @@ class JupyterDrivesManager():
             }
         except Exception as e:
             raise tornado.web.HTTPError(
-                status_code=httpx.codes.BAD_REQUEST,
+                status_code=http.HTTPStatus.BAD_REQUEST,
                 reason=f"The following error occured when initializing the content manager: {e}",
             )
 
@@ -168,7 +600,7 @@ class JupyterDrivesManager():
             self._max_files_listed = new_limit
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= http.HTTPStatus.BAD_REQUEST,
             reason= f"The following error occured when setting the new listing limit: {e}"
             )
 
@@ -184,7 +616,7 @@ class JupyterDrivesManager():
             self._excluded_drives.add(exclude_drive_name);
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= http.HTTPStatus.BAD_REQUEST,
             reason= f"The following error occured when excluding the drive: {e}"
             )
 
@@ -208,7 +640,7 @@ class JupyterDrivesManager():
                 })
             except Exception as e:
                 raise tornado.web.HTTPError(
-                    status_code=httpx.codes.BAD_REQUEST,
+                    status_code=http.HTTPStatus.BAD_REQUEST,
                     reason=f"The following error occurred when listing excluded drives: {e}",
                 )
         
@@ -227,7 +659,7 @@ class JupyterDrivesManager():
             self._excluded_drives.remove(include_drive_name);
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= http.HTTPStatus.BAD_REQUEST,
             reason= f"The following error occurred when including the drive: {e}"
             )
 
@@ -240,20 +672,22 @@ class JupyterDrivesManager():
             List of available drives and their properties.
         """
         data = []
-        if self._config.access_key_id and self._config.secret_access_key:
+        if (self._config.access_key_id and self._config.secret_access_key) or self._config.provider in LOCAL_PROVIDERS:
+            if self._drives is None:
+                self._initialize_drives()
             if self._drives is None and len(self._external_drives) == 0:
                raise tornado.web.HTTPError(
-                status_code= httpx.codes.NOT_IMPLEMENTED,
+                status_code= http.HTTPStatus.NOT_IMPLEMENTED,
                 reason="Listing drives not supported for given provider.",
                 )
 
             results = []
-            for drive in self._drives:
+            for drive in self._drives or []:
                 try:
                     results += drive.list_containers()                    
                 except Exception as e:
                     raise tornado.web.HTTPError(
-                        status_code=httpx.codes.BAD_REQUEST,
+                        status_code=http.HTTPStatus.BAD_REQUEST,
                         reason=f"The following error occured when listing drives: {e}",
                     )
             
@@ -275,6 +709,18 @@ class JupyterDrivesManager():
                             "provider": self._config.provider
                         }
                     )
+
+            # local drives mounted next to the drives of the provider
+            if self._config.local_root and self._config.provider != 'local':
+                for result in self._local_drives["local"].list_containers():
+                    if result.name not in self._excluded_drives:
+                        data.append({
+                            "name": result.name,
+                            "region": "",
+                            "creationDate": result.extra["creation_date"],
+                            "mounted": result.name in self._content_managers,
+                            "provider": "local"
+                        })
             
             if len(self._external_drives) != 0:
                 for drive in self._external_drives.values():
@@ -289,13 +735,13 @@ class JupyterDrivesManager():
                             })
                     except Exception as e:
                         raise tornado.web.HTTPError(
-                            status_code=httpx.codes.BAD_REQUEST,
+                            status_code=http.HTTPStatus.BAD_REQUEST,
                             reason=f"The following error occured when listing drives: {e}",
                         )
                 
         else:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= http.HTTPStatus.BAD_REQUEST,
             reason="No credentials specified. Please set them in your user jupyter_server_config file.",
             )
         
@@ -311,6 +757,7 @@ class JupyterDrivesManager():
             drive_name: name of drive to mount
         """
         try:
+            region = location or None
             if provider == 's3':
                 if location: 
                     region = location
@@ -321,16 +768,20 @@ class JupyterDrivesManager():
             self._initialize_content_manager(drive_name, provider, region)
 
             # check if user is able to access drive
-            check = await self._file_system._exists(drive_name + '/')
+            check = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._exists(drive_name + '/'))
             if check is False:
                 raise Exception('Failed to mount drive. Access denied.')
 
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= _error_status(e),
             reason= f"{e}"
             )
 
+        if self._prefetcher is not None:
+            # the root listing is usually requested right after mounting
+            self._prefetcher.warm_up(drive_name)
+
         return 
     
     async def unmount_drive(self, drive_name: str):
@@ -340,83 +791,131 @@ class JupyterDrivesManager():
             drive_name: name of drive to unmount
         """
         if drive_name in self._content_managers:
+            try:
+                await self._flush_writes(drive_name)
+            except Exception as e:
+                raise tornado.web.HTTPError(
+                status_code= _error_status(e),
+                reason=f"The following error occured when uploading the saved files of the drive: {e}",
+                )
             self._content_managers.pop(drive_name, None)
+            self._usages.pop(drive_name, None)
+            if self._prefetcher is not None:
+                self._prefetcher.cancel(drive_name)
+                self._prefetcher.forget(drive_name)
 
         else:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.NOT_FOUND,
+            status_code= http.HTTPStatus.NOT_FOUND,
             reason="Drive is not mounted or doesn't exist.",
             )
         
         return
     
-    async def get_contents(self, drive_name, path):
+    async def get_contents(self, drive_name, path, if_none_match=None):
         """Get contents of a file or directory.
 
+        Identical concurrent requests share a single call to the provider.
+        The response carries the entity tag of the contents; the content of a file
+        is not retrieved when its entity tag matches ``if_none_match``.
+
+        Args:
+            drive_name: name of drive to get the contents of
+            path: path to file or directory (empty string for root listing)
+            if_none_match: value of the If-None-Match header of the request
+        """
+        if self._prefetcher is None:
+            key = ("contents", drive_name, path.strip('/'), self._max_files_listed, if_none_match)
+            return await self._single_flight.do(key, lambda: self._get_contents(drive_name, path, if_none_match))
+
+        path = path.strip('/')
+        response = self._prefetcher.take(drive_name, path)
+        if response is None or (self._write_back is not None and (drive_name, path) in self._write_back):
+            key = ("contents", drive_name, path, self._max_files_listed, if_none_match)
+            response = await self._single_flight.do(key, lambda: self._get_contents(drive_name, path, if_none_match))
+        elif _etag_matches(response["etag"], if_none_match):
+            response = {
+                "data": None,
+                "etag": response["etag"]
+            }
+        if isinstance(response["data"], list):
+            # the user navigated to this directory
+            self._prefetcher.after_listing(drive_name, path, response["data"])
+        return response
+
+    async def _get_contents(self, drive_name, path, if_none_match=None):
+        """Helping function to get contents of a file or directory from the provider.
+
         Args:
             drive_name: name of drive to get the contents of
             path: path to file or directory (empty string for root listing)
+            if_none_match: value of the If-None-Match header of the request
         """
+        import obstore as obs
+
         if path == '/':
             path = ''
         else: 
             path = path.strip('/')
 
         try :
+            await self._flush_writes(drive_name, path)
             data = []
-            is_dir = await self._file_system._isdir(drive_name + '/' + path)
-
+            etag = None
+            http_cache = self._get_http_cache(drive_name)
+            if http_cache is not None and [drive_name, path] in http_cache:
+                # only files are cached
+                is_dir = False
+            else:
+                is_dir = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._isdir(drive_name + '/' + path))
             if is_dir == True:
-                chunk_size = 1024
-                if self._max_files_listed < chunk_size:
-                    chunk_size = self._max_files_listed
-                no_batches = int(self._max_files_listed/chunk_size)
-
-                # using Arrow lists as they are recommended for large results
-                # stream will be an async iterable of RecordBatch
-                current_batch = 0
-                stream = obs.list(self._content_managers[drive_name]["store"], path, chunk_size=chunk_size, return_arrow=True)
-                async for batch in stream:
-                    current_batch += 1
-                    # reached last batch that can be shown (partially)
-                    if current_batch == no_batches + 1:
-                        remaining_files = self._max_files_listed - no_batches*chunk_size
-                        
-                    contents_list = pyarrow.record_batch(batch).to_pylist()
-                    for object in contents_list:
-                        # when listing the last batch (partially), make sure we don't exceed limit
-                        if current_batch == no_batches + 1:
-                            if remaining_files <= 0:
-                                break
-                            remaining_files -= 1
-                        data.append({
-                            "path": object["path"],
-                            "last_modified": object["last_modified"].isoformat(),
-                            "size": object["size"],
-                        })
-                    
-                    # check if we reached the limit of files that can be listed
-                    if current_batch == no_batches + 1:
-                        break
+                # the entity tag of a listing covers the attributes of the listed objects
+                listing_hash = hashlib.sha1()
+                async for objects in self._list_objects(drive_name, path):
+                    with span("encode"):
+                        for object in objects:
+                            data.append(_listing_entry(object))
+                            listing_hash.update(
+                                f"{object['path']}\0{object.get('e_tag') or ''}\0{object['last_modified'].isoformat()}\0{object['size']}\n".encode()
+                            )
+                etag = _quote_etag(listing_hash.hexdigest())
                 
             else:
-                content = b""
-                # retrieve contents of object
-                obj = await obs.get_async(self._content_managers[drive_name]["store"], path)
-                stream = obj.stream(min_chunk_size=5 * 1024 * 1024) # 5MB sized chunks
-                async for buf in stream: 
-                    content += buf
-
-                # retrieve metadata of object
-                metadata = await obs.head_async(self._content_managers[drive_name]["store"], path)
-
-                # for certain media type files, extracted content needs to be read as a byte array and decoded to base64 to be viewable in JupyterLab
-                # the following extensions correspond to a base64 file format or are of type PDF
-                ext = os.path.splitext(path)[1]
-                if ext == '.pdf' or ext == '.svg' or ext == '.tif' or ext == '.tiff' or ext == '.jpg' or ext == '.jpeg' or ext == '.gif' or ext == '.png' or ext == '.bmp' or ext == '.webp':
-                    processed_content = base64.b64encode(content).decode("utf-8")
+                store = self._content_managers[drive_name]["store"]
+
+                if http_cache is not None:
+                    # the content is served by the cache while it is fresh, and revalidated otherwise
+                    metadata, content = await http_cache.get(
+                        [drive_name, path],
+                        lambda validators: self._fetch_http_file(drive_name, path, validators),
+                    )
                 else:
-                    processed_content = content.decode("utf-8")
+                    # retrieve metadata of object
+                    metadata = await self._provider_call(drive_name, "head", lambda: obs.head_async(store, path))
+                etag = _object_etag(metadata)
+                if _etag_matches(etag, if_none_match):
+                    # the client already has the current content
+                    return {
+                        "data": None,
+                        "etag": etag
+                    }
+
+                async def read():
+                    content = b""
+                    obj = await obs.get_async(store, path)
+                    stream = obj.stream(min_chunk_size=5 * 1024 * 1024) # 5MB sized chunks
+                    async for buf in stream: 
+                        content += buf
+                    return content
+
+                # retrieve contents of object
+                if http_cache is None:
+                    content = await self._provider_call(drive_name, "get", read, hedge=metadata["size"] <= HEDGED_READ_SIZE)
+
+                processed_content = await self._encode_content(path, content)
+                if not self._is_base64(path):
+                    # skip the upload of the next save if the content doesn't change
+                    self._remember_digest(drive_name, path, await self._codec.run(md5_digest, content), metadata.get("e_tag"))
 
                 data = {
                     "path": path, 
@@ -426,318 +925,1534 @@ class JupyterDrivesManager():
                 }
 
             response = {
-                "data": data
+                "data": data,
+                "etag": etag
             }
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= _error_status(e),
             reason=f"The following error occured when retrieving the contents: {e}",
             )
         
         return response
     
-    async def new_file(self, drive_name, path, type):
-        """Create a new file or directory at the given path.
-        
+    def _is_base64(self, path):
+        """Helping function to check whether the content of a file is returned as base64."""
+        # for certain media type files, extracted content needs to be read as a byte array and decoded to base64 to be viewable in JupyterLab
+        # the following extensions correspond to a base64 file format or are of type PDF
+        return os.path.splitext(path)[1] in BASE64_EXTENSIONS
+
+    async def _encode_content(self, path, content):
+        """Helping function to encode the content of a file to be returned.
+
         Args:
-            drive_name: name of drive where the new content is created
-            path: path where new content should be created
-            type: whether we are dealing with a file or a directory
+            path: path of the file
+            content: content of the file
         """
-        data = {}
+        with span("encode"):
+            if self._is_base64(path):
+                return await self._codec.run(encode_base64, content)
+            return await self._codec.run(decode_text, content)
+
+    async def stream_contents(self, drive_name, path):
+        """Stream the listing of a directory.
+
+        Args:
+            drive_name: name of drive to get the contents of
+            path: path to directory (empty string for root listing)
+        Returns:
+            An async iterator of lists of entries, one list per page of the provider
+            listing, or ``None`` when the path is not a directory.
+        """
+        path = path.strip('/')
         try:
-            # eliminate leading and trailing backslashes
-            path = path.strip('/')
+            await self._flush_writes(drive_name, path)
+            is_dir = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._isdir(drive_name + '/' + path))
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when retrieving the contents: {e}",
+            )
+        if is_dir is not True:
+            return None
 
-            object_name =  drive_name + '/' + path
-            # in the case of S3 directories, we need to add a suffix to feign the creation of a directory
-            if type == 'directory' and self._config.provider == 's3':
-                object_name = object_name + EMPTY_DIR_SUFFIX
+        async def entries():
+            try:
+                async for objects in self._list_objects(drive_name, path):
+                    with span("encode"):
+                        yield [_listing_entry(object) for object in objects]
+            except Exception as e:
+                raise tornado.web.HTTPError(
+                status_code= _error_status(e),
+                reason=f"The following error occured when retrieving the contents: {e}",
+                )
 
-            await self._file_system._touch(object_name)         
-            metadata = await self._file_system._info(object_name)
-            
-            data = {
-                "path": path,
-                "content": "",
-                "last_modified": metadata["LastModified"].isoformat(),
-                "size": metadata["size"],
-                "type": metadata["type"]
-            }
+        return entries()
+
+    async def download_archive(self, drive_name, path):
+        """Stream a ZIP archive of a directory.
+
+        The objects are listed and read while the archive is streamed, the archive
+        is neither buffered in memory nor on disk.
+
+        Args:
+            drive_name: name of drive where the directory exists
+            path: path to directory (empty string for the whole drive)
+        Returns:
+            The file name of the archive and an async iterator of its bytes.
+        """
+        import obstore as obs
+        from .archive import stream_zip
+
+        path = path.strip('/')
+        try:
+            await self._flush_writes(drive_name, path)
+            is_dir = path == '' or await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._isdir(drive_name + '/' + path))
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
-            reason=f"The following error occured when creating the object: {e}",
+            status_code= _error_status(e),
+            reason=f"The following error occured when archiving the directory: {e}",
+            )
+        if is_dir is not True:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_FOUND,
+            reason="Directory does not exist within drive.",
             )
-        
-        response = {
-            "data": data
-        }
-        return response
 
-    async def save_file(self, drive_name, path, content, options_format, content_format, content_type, options_chunk=None):
-        """Save file with new content.
-        
+        store = self._content_managers[drive_name]["store"]
+        root = posixpath.basename(path) or drive_name
+        prefix = path + '/' if path else ''
+
+        async def entries():
+            async for objects in self._list_all_objects(drive_name, path):
+                yield [
+                    {
+                        "name": root + '/' + object["path"][len(prefix):],
+                        "path": object["path"],
+                        "last_modified": object["last_modified"],
+                        "size": object["size"],
+                    }
+                    # objects feigning directories
+                    for object in objects if not object["path"].endswith(EMPTY_DIR_SUFFIX)
+                ]
+
+        async def read(object_path):
+            # a stream can't be retried, the chunks are yielded without holding a slot
+            limiter = self._get_limiter(drive_name)
+            async with limiter.slot():
+                result = await obs.get_async(store, object_path)
+            chunks = iter_pages(result.stream(min_chunk_size=ARCHIVE_CHUNK_SIZE), limiter.slot, "get")
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                await chunks.aclose()
+
+        return root + '.zip', stream_zip(entries(), read, read_ahead=self._config.archive_read_ahead)
+
+    async def get_usage(self, drive_name, path):
+        """Get the disk usage of a directory, in total and per child directory.
+
+        The usage is aggregated from a parallel listing of the directory and kept;
+        it is updated incrementally after the changes made through the manager.
+
         Args:
-            drive_name: name of drive where file exists
-            path: path where new content should be saved
-            content: content of object
-            options_format: format of content (as sent through contents manager request)
-            content_format: format of content (as defined by the registered file formats in JupyterLab)
-            content_type: type of content (as defined by the registered file types in JupyterLab)
+            drive_name: name of drive where the directory exists
+            path: path to directory (empty string for the whole drive)
         """
-        data = {}
-        try: 
-            # eliminate leading and trailing backslashes
-            path = path.strip('/')
+        import obstore as obs
 
-            if options_format == 'json':
-                formatted_content = json.dumps(content, indent=2)
-                formatted_content = formatted_content.encode("utf-8")
-                
-                if options_chunk:
-                    if options_chunk == 1:
-                        self._multipartUploads[path] = '';
-                    
-                    self._multipartUploads[path] = json.dumps(self._multipartUploads[path] + formatted_content,indent = 2);
-            elif options_format == 'base64' and (content_format == 'base64' or (content_format == 'text' and content_type != 'PDF') or content_type == 'PDF' or content_type == 'notebook'):
-                # transform base64 encoding to a UTF-8 byte array for saving or storing
-                byte_characters = base64.b64decode(content)
-                
-                byte_arrays = []
-                for offset in range(0, len(byte_characters), 512):
-                    slice_ = byte_characters[offset:offset + 512]
-                    byte_array = bytearray(slice_)
-                    byte_arrays.append(byte_array)
-                
-                # combine byte arrays
-                formatted_content = b"".join(byte_arrays)
-
-                if options_chunk:
-                    if options_chunk == 1:
-                        self._multipartUploads[path] = b""
-                    self._multipartUploads[path] = self._multipartUploads[path] + formatted_content
-            elif options_format == 'text':
-                formatted_content = content.encode("utf-8")
-
-                if options_chunk: 
-                    if options_chunk == 1:
-                        self._multipartUploads[path] = b""
-                    self._multipartUploads[path] = self._multipartUploads[path] + formatted_content
-            else:
-                formatted_content = content
-                if options_chunk:
-                    if options_chunk == 1:
-                        self._multipartUploads[path] = ""
-                    self._multipartUploads[path] = self._multipartUploads[path] + formatted_content;
+        path = path.strip('/')
+        try:
+            await self._flush_writes(drive_name, path)
+            is_dir = path == '' or await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._isdir(drive_name + '/' + path))
+            if is_dir is not True:
+                raise tornado.web.HTTPError(
+                status_code= http.HTTPStatus.NOT_FOUND,
+                reason="Directory does not exist within drive.",
+                )
 
-            if options_chunk is None or options_chunk == -1:
-                if formatted_content is None or formatted_content == '':
-                    formatted_content = b''
+            if drive_name not in self._usages:
+                store = self._content_managers[drive_name]["store"]
 
-                await self._file_system._pipe(drive_name + '/' + path, self._multipartUploads[path] if options_chunk == -1 else formatted_content)
-                metadata = await self._file_system._info(drive_name + '/' + path)
+                async def list_directory(directory):
+                    result = await self._provider_call(drive_name, "list", lambda: obs.list_with_delimiter_async(store, directory or None))
+                    return result["objects"], result["common_prefixes"]
 
-                data = {
-                    "path": path,
-                    "content": content,
-                    "last_modified": metadata["LastModified"].isoformat(),
-                    "size": metadata["size"]
-                }
-            else: 
-                data = {
-                    "path": path,
-                    "content": content,
-                    "last_modified": datetime.now().isoformat(),
-                    "size": 0
-                }
-            
-            if options_chunk == -1: 
-                del self._multipartUploads[path]
+                self._usages[drive_name] = DiskUsage(
+                    lambda directory: self._list_all_objects(drive_name, directory),
+                    list_directory,
+                    # objects feigning directories
+                    lambda object_path: object_path.endswith(EMPTY_DIR_SUFFIX),
+                )
+            data = await self._usages[drive_name].get(path)
+        except tornado.web.HTTPError:
+            raise
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
-            reason=f"The following error occured when saving the file: {e}",
+            status_code= _error_status(e),
+            reason=f"The following error occured when computing the disk usage: {e}",
             )
-        
+
         response = {
                 "data": data
             }
         return response
-    
-    async def rename_file(self, drive_name, path, new_path):
-        """Rename a file.
-        
+
+    async def get_file_info(self, drive_name, path):
+        """Get the metadata of a file, without its content.
+
         Args:
-            drive_name: name of drive where file is located
-            path: path of file
-            new_path: path of new file name
+            drive_name: name of drive where the file exists
+            path: path of the file
         """
-        data = {}
-        try: 
-            # eliminate leading and trailing backslashes
-            path = path.strip('/')
-            
-            object_name = drive_name + '/' + path
-            new_object_name = drive_name + '/' + new_path
-            is_dir = await self._file_system._isdir(object_name)
-            if is_dir == True:
-                object_name = object_name + EMPTY_DIR_SUFFIX
-                new_object_name = new_object_name + EMPTY_DIR_SUFFIX
-                await self._fix_dir(drive_name, path)
-            
-            await self._file_system._mv_file(object_name, new_object_name)
-            metadata = await self._file_system._info(new_object_name)
+        import obstore as obs
 
-            data = {
-                "path": new_path,
-                "last_modified": metadata["LastModified"].isoformat(),
-                "size": metadata["size"]
-            }
+        path = path.strip('/')
+        try:
+            await self._flush_writes(drive_name, path)
+            store = self._content_managers[drive_name]["store"]
+            metadata = await self._provider_call(drive_name, "head", lambda: obs.head_async(store, path))
+        except FileNotFoundError:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_FOUND,
+            reason="File does not exist within drive.",
+            )
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
-            reason=f"The following error occured when renaming the object: {e}",
+            status_code= _error_status(e),
+            reason=f"The following error occured when retrieving the file: {e}",
             )
-        
+
         response = {
-                "data": data
+                "data": dict(_listing_entry(metadata), etag=_object_etag(metadata))
             }
         return response
 
-    async def delete_file(self, drive_name, path):
-        """Delete an object.
-        
+    async def read_file(self, drive_name, path, start=None, end=None):
+        """Read the raw content of a file, or a range of it.
+
+        Small ranges (e.g. the footer of a Parquet file) are read with a retried and
+        possibly hedged call, larger ones are streamed. Whole files of HTTP drives are
+        served from their cache when it is enabled; ranges are always read from the
+        provider, the cache would retrieve the whole file.
+
+        Args:
+            drive_name: name of drive where the file exists
+            path: path of the file
+            start: offset of the first byte read, negative to read the last bytes
+            end: offset after the last byte read, the end of the file if None
+        Returns:
+            The metadata of the file, the offsets of the range read and an async
+            iterator of its bytes.
+        """
+        import obstore as obs
+
+        path = path.strip('/')
+        try:
+            await self._flush_writes(drive_name, path)
+            store = self._content_managers[drive_name]["store"]
+            http_cache = self._get_http_cache(drive_name)
+            content = None
+            if http_cache is not None and start is None and end is None:
+                metadata, content = await http_cache.get(
+                    [drive_name, path],
+                    lambda validators: self._fetch_http_file(drive_name, path, validators),
+                )
+            else:
+                metadata = await self._provider_call(drive_name, "head", lambda: obs.head_async(store, path))
+        except FileNotFoundError:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_FOUND,
+            reason="File does not exist within drive.",
+            )
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when reading the file: {e}",
+            )
+
+        size = metadata["size"]
+        if start is None:
+            start = 0
+        elif start < 0:
+            start = max(0, size + start)
+        end = size if end is None else min(end, size)
+        if start >= end and not (start == 0 and size == 0):
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+            reason=f"Range is not satisfiable, the file has {size} bytes.",
+            )
+        # the metadata kept by the cache has no path
+        info = dict(_listing_entry(dict(metadata, path=path)), etag=_object_etag(metadata))
+
+        async def chunks():
+            try:
+                if start == end:
+                    # an empty file
+                    return
+                if content is not None:
+                    yield content[start:end]
+                elif end - start <= HEDGED_READ_SIZE:
+                    # e.g. file footers and headers, fetched repeatedly by readers
+                    yield bytes(await self._provider_call(
+                        drive_name,
+                        "get",
+                        lambda: obs.get_range_async(store, path, start=start, end=end),
+                        hedge=True,
+                    ))
+                else:
+                    # a stream can't be retried, the chunks are yielded without holding a slot
+                    limiter = self._get_limiter(drive_name)
+                    async with limiter.slot():
+                        result = await obs.get_async(store, path, options={"range": (start, end)})
+                    stream = iter_pages(result.stream(min_chunk_size=ARCHIVE_CHUNK_SIZE), limiter.slot, "get")
+                    try:
+                        async for chunk in stream:
+                            yield bytes(chunk)
+                    finally:
+                        await stream.aclose()
+            except Exception as e:
+                raise tornado.web.HTTPError(
+                status_code= _error_status(e),
+                reason=f"The following error occured when reading the file: {e}",
+                )
+
+        return info, (start, end), chunks()
+
+    async def list_directory(self, drive_name, path):
+        """List the files and sub-directories directly in a directory.
+
+        Args:
+            drive_name: name of drive where the directory exists
+            path: path to directory (empty string for root listing)
+        """
+        import obstore as obs
+
+        path = path.strip('/')
+        try:
+            await self._flush_writes(drive_name, path)
+            store = self._content_managers[drive_name]["store"]
+            result = await self._provider_call(drive_name, "list", lambda: obs.list_with_delimiter_async(store, path or None))
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when listing the directory: {e}",
+            )
+
+        data = [
+            {"path": prefix.rstrip('/'), "type": "directory", "size": 0}
+            for prefix in result["common_prefixes"]
+        ] + [
+            dict(_listing_entry(object), type="file", etag=_object_etag(object))
+            for object in result["objects"]
+            # objects feigning directories, or the directory itself
+            if not object["path"].endswith(EMPTY_DIR_SUFFIX) and object["path"] != path
+        ]
+        if path != '' and not result["objects"] and not result["common_prefixes"]:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_FOUND,
+            reason="Directory does not exist within drive.",
+            )
+
+        response = {
+                "data": data
+            }
+        return response
+
+    async def get_thumbnail(self, drive_name, path, size=thumbnails.DEFAULT_THUMBNAIL_SIZE, if_none_match=None):
+        """Get a downscaled rendering of an image.
+
+        The thumbnail is generated in the encoding pool, from the thumbnail embedded
+        in the head of JPEG files when it is large enough, and kept in a cache keyed
+        by the entity tag of the image.
+
+        Args:
+            drive_name: name of drive where the image exists
+            path: path of the image
+            size: largest dimension of the thumbnail, in pixels
+            if_none_match: value of the If-None-Match header of the request
+        Returns:
+            The content type, entity tag and content of the thumbnail; the content
+            is None when its entity tag matches ``if_none_match``.
+        """
+        import obstore as obs
+
+        path = path.strip('/')
+        extension = os.path.splitext(path)[1].lower()
+        if not thumbnails.available():
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_IMPLEMENTED,
+            reason="Pillow is required to generate thumbnails, install jupyter_drives[thumbnails].",
+            )
+        if extension not in thumbnails.THUMBNAIL_EXTENSIONS:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST,
+            reason="Thumbnails are only generated for images.",
+            )
+        if not 0 < size <= thumbnails.MAX_THUMBNAIL_SIZE:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST,
+            reason=f"The size of a thumbnail must be between 1 and {thumbnails.MAX_THUMBNAIL_SIZE} pixels.",
+            )
+
+        try:
+            await self._flush_writes(drive_name, path)
+            store = self._content_managers[drive_name]["store"]
+            http_cache = self._get_http_cache(drive_name)
+            metadata = await self._provider_call(drive_name, "head", lambda: obs.head_async(store, path))
+            etag = _quote_etag(hashlib.sha1(f"{_object_etag(metadata)}:{size}".encode()).hexdigest())
+            if _etag_matches(etag, if_none_match):
+                # the client already has the current thumbnail
+                return None, etag, None
+
+            key = ("thumbnail", drive_name, path, _object_etag(metadata), size)
+            thumbnail = self._thumbnails.get(key)
+            if thumbnail is None:
+
+                async def generate():
+                    thumbnail = None
+                    # the head is read from the provider, the cache of HTTP drives would retrieve the whole image
+                    if extension in thumbnails.EXIF_EXTENSIONS and metadata["size"] > thumbnails.EXIF_READ_SIZE:
+                        head = await self._provider_call(
+                            drive_name,
+                            "get",
+                            lambda: obs.get_range_async(store, path, start=0, end=thumbnails.EXIF_READ_SIZE),
+                            hedge=True,
+                        )
+                        with span("encode"):
+                            thumbnail = await self._codec.offload(thumbnails.thumbnail_from_exif, bytes(head), size)
+                    if thumbnail is None:
+                        if http_cache is not None:
+                            _, data = await http_cache.get(
+                                [drive_name, path],
+                                lambda validators: self._fetch_http_file(drive_name, path, validators),
+                            )
+                        else:
+
+                            async def read():
+                                result = await obs.get_async(store, path)
+                                return bytes(await result.bytes_async())
+
+                            data = await self._provider_call(drive_name, "get", read, hedge=metadata["size"] <= HEDGED_READ_SIZE)
+                        with span("encode"):
+                            thumbnail = await self._codec.offload(thumbnails.thumbnail, data, size)
+                    self._thumbnails.put(key, thumbnail)
+                    return thumbnail
+
+                # concurrent requests of the same thumbnail generate it once
+                thumbnail = await self._single_flight.do(key, generate)
+        except FileNotFoundError:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_FOUND,
+            reason="Image does not exist within drive.",
+            )
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when generating the thumbnail: {e}",
+            )
+
+        content_type, data = thumbnail
+        return content_type, etag, data
+
+    async def get_preview(self, drive_name, path, rows=previews.DEFAULT_PREVIEW_ROWS, output_format="json"):
+        """Preview a Parquet, Arrow IPC or CSV file: its schema, number of rows when known and first rows.
+
+        Only the footer and the first row group of a Parquet file are read, and the
+        head of other files, with range reads; they are decoded in the encoding pool.
+
+        Args:
+            drive_name: name of drive where the file exists
+            path: path of the file
+            rows: number of rows previewed
+            output_format: ``json`` for a JSON object with the rows as arrays, or
+                ``arrow`` for an Arrow IPC stream of the rows
+        """
+        import obstore as obs
+
+        path = path.strip('/')
+        kind = previews.preview_format(path)
+        if kind is None:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST,
+            reason="Only Parquet, Arrow IPC and CSV files can be previewed.",
+            )
+        if not 0 < rows <= previews.MAX_PREVIEW_ROWS:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST,
+            reason=f"The number of rows of a preview must be between 1 and {previews.MAX_PREVIEW_ROWS}.",
+            )
+        if output_format not in ("json", "arrow"):
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST,
+            reason="The format of a preview must be json or arrow.",
+            )
+
+        try:
+            await self._flush_writes(drive_name, path)
+            store = self._content_managers[drive_name]["store"]
+            metadata = await self._provider_call(drive_name, "head", lambda: obs.head_async(store, path))
+            size = metadata["size"]
+
+            # the ranges are read from the provider, the cache of HTTP drives would retrieve the whole file
+            async def read(start, end):
+                return bytes(await self._provider_call(
+                    drive_name,
+                    "get",
+                    lambda: obs.get_range_async(store, path, start=start, end=end),
+                    hedge=end - start <= HEDGED_READ_SIZE,
+                ))
+
+            if kind == "parquet":
+                tail_start = max(0, size - previews.FOOTER_READ_SIZE)
+                ranges = [(tail_start, await read(tail_start, size))]
+                footer_start = size - 8 - previews.parquet_footer_length(ranges[0][1])
+                if footer_start < tail_start:
+                    # a large footer, e.g. of a file with many row groups
+                    ranges.append((footer_start, await read(max(0, footer_start), tail_start)))
+                with span("encode"):
+                    columns, (start, end) = await self._codec.offload(
+                        previews.parquet_layout, size, ranges, self._config.preview_max_size
+                    )
+                if end > start:
+                    ranges.append((start, await read(start, end)))
+                with span("encode"):
+                    data = await self._codec.offload(previews.parquet_preview, size, ranges, columns, rows, output_format)
+            else:
+                end = min(size, self._config.preview_head_size)
+                head = await read(0, end) if end > 0 else b""
+                with span("encode"):
+                    if kind in ("csv", "tsv"):
+                        data = await self._codec.offload(
+                            previews.csv_preview, head, end == size, "\t" if kind == "tsv" else ",", rows, output_format
+                        )
+                    else:
+                        data = await self._codec.offload(
+                            previews.ipc_preview, head, end == size, kind == "arrows", rows, output_format
+                        )
+        except FileNotFoundError:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_FOUND,
+            reason="File does not exist within drive.",
+            )
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when previewing the file: {e}",
+            )
+
+        response = {
+                "data": data
+            }
+        return response
+
+    async def _list_objects(self, drive_name, path):
+        """Helping function to list the objects under a path, up to the listing limit.
+
+        Args:
+            drive_name: name of drive to list
+            path: path to directory (empty string for root listing)
+        Returns:
+            An async iterator of lists of objects metadata, one list per page of the provider listing.
+        """
+        import obstore as obs
+        import pyarrow
+
+        chunk_size = min(1024, self._max_files_listed)
+        remaining_files = self._max_files_listed
+
+        # using Arrow lists as they are recommended for large results
+        # stream will be an async iterable of RecordBatch
+        stream = obs.list(self._content_managers[drive_name]["store"], path, chunk_size=chunk_size, return_arrow=True)
+        pages = iter_pages(stream, self._get_limiter(drive_name).slot)
+        async for batch in pages:
+            with span("encode"):
+                objects = pyarrow.record_batch(batch).to_pylist()[:remaining_files]
+            remaining_files -= len(objects)
+            if objects:
+                yield objects
+            # check if we reached the limit of files that can be listed
+            if remaining_files <= 0:
+                break
+        await pages.aclose()
+
+    async def _list_all_objects(self, drive_name, path):
+        """Helping function to list all the objects under a path, in key order.
+
+        The key space is split into ranges listed concurrently, unless the provider
+        doesn't list keys in order.
+
+        Args:
+            drive_name: name of drive to list
+            path: path to directory (empty string for root listing)
+        Returns:
+            An async iterator of lists of objects metadata.
+        """
+        import obstore as obs
+        import pyarrow
+        from .listing import list_sharded
+
+        store = self._content_managers[drive_name]["store"]
+        limiter = self._get_limiter(drive_name)
+        # local file systems are not listed in key order
+        if self._config.listing_shards > 1 and self._get_provider(drive_name) != 'local':
+            async for objects in list_sharded(store, path, shards=self._config.listing_shards, slot=limiter.slot):
+                yield objects
+            return
+
+        stream = obs.list(store, path, chunk_size=1000, return_arrow=True)
+        async for batch in iter_pages(stream, limiter.slot):
+            yield pyarrow.record_batch(batch).to_pylist()
+
+    async def _delete_objects(self, drive_name, path):
+        """Helping function to delete all the objects under a path.
+
+        Args:
+            drive_name: name of drive where the objects exist
+            path: path to directory
+        """
+        import obstore as obs
+
+        store = self._content_managers[drive_name]["store"]
+        async for objects in self._list_all_objects(drive_name, path):
+            paths = [object["path"] for object in objects]
+            await self._provider_call(drive_name, "delete", lambda: obs.delete_async(store, paths))
+
+    async def new_file(self, drive_name, path, type):
+        """Create a new file or directory at the given path.
+        
+        Args:
+            drive_name: name of drive where the new content is created
+            path: path where new content should be created
+            type: whether we are dealing with a file or a directory
+        """
+        data = {}
+        try:
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+            await self._flush_writes(drive_name, path)
+
+            object_name =  drive_name + '/' + path
+            # in the case of S3 directories, we need to add a suffix to feign the creation of a directory
+            if type == 'directory' and self._get_provider(drive_name) in ['s3'] + LOCAL_PROVIDERS:
+                object_name = object_name + EMPTY_DIR_SUFFIX
+
+            await self._provider_call(drive_name, "put", lambda: self._get_file_system(drive_name)._touch(object_name))
+            metadata = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._info(object_name))
+
+            data = {
+                "path": path,
+                "content": "",
+                "last_modified": metadata["LastModified"].isoformat(),
+                "size": metadata["size"],
+                "type": metadata["type"]
+            }
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when creating the object: {e}",
+            )
+        finally:
+            self._on_change(drive_name, path)
+        
+        response = {
+            "data": data
+        }
+        return response
+
+    async def save_file(self, drive_name, path, content, options_format, content_format, content_type, options_chunk=None, content_size=None):
+        """Save file with new content.
+        
+        Args:
+            drive_name: name of drive where file exists
+            path: path where new content should be saved
+            content: content of object
+            options_format: format of content (as sent through contents manager request)
+            content_format: format of content (as defined by the registered file formats in JupyterLab)
+            content_type: type of content (as defined by the registered file types in JupyterLab)
+            content_size: size of the request body the content was parsed from, if any
+        """
+        data = {}
+        saved_digest = None
+        try: 
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+
+            with span("encode"):
+                if options_format == 'json':
+                    formatted_content = await self._codec.run(encode_json, content, content_size)
+                
+                    if options_chunk:
+                        if options_chunk == 1:
+                            self._multipartUploads[path] = '';
+                    
+                        self._multipartUploads[path] = json.dumps(self._multipartUploads[path] + formatted_content,indent = 2);
+                elif options_format == 'base64' and (content_format == 'base64' or (content_format == 'text' and content_type != 'PDF') or content_type == 'PDF' or content_type == 'notebook'):
+                    # transform base64 encoding to a UTF-8 byte array for saving or storing
+                    formatted_content = await self._codec.run(decode_base64, content)
+
+                    if options_chunk:
+                        if options_chunk == 1:
+                            self._multipartUploads[path] = b""
+                        self._multipartUploads[path] = self._multipartUploads[path] + formatted_content
+                elif options_format == 'text':
+                    formatted_content = await self._codec.run(encode_text, content)
+
+                    if options_chunk: 
+                        if options_chunk == 1:
+                            self._multipartUploads[path] = b""
+                        self._multipartUploads[path] = self._multipartUploads[path] + formatted_content
+                else:
+                    formatted_content = content
+                    if options_chunk:
+                        if options_chunk == 1:
+                            self._multipartUploads[path] = ""
+                        self._multipartUploads[path] = self._multipartUploads[path] + formatted_content;
+
+            if self._write_back is not None and options_chunk is None:
+                if not formatted_content:
+                    formatted_content = b''
+                elif isinstance(formatted_content, str):
+                    formatted_content = await self._codec.run(encode_text, formatted_content)
+
+                # acknowledged now, uploaded once the coalescing window of the path is over
+                failed = self._write_back.failed((drive_name, path))
+                self._write_back.submit((drive_name, path), formatted_content)
+                if failed:
+                    # the last upload of the path failed, this save reports whether it still fails
+                    await self._flush_writes(drive_name, path)
+                data = {
+                    "path": path,
+                    "content": content,
+                    "last_modified": datetime.now(timezone.utc).isoformat(),
+                    "size": len(formatted_content)
+                }
+            elif options_chunk is None or options_chunk == -1:
+                if formatted_content is None or formatted_content == '':
+                    formatted_content = b''
+
+                # the buffered saves must not overwrite this one
+                await self._flush_writes(drive_name, path)
+                unchanged = None
+                if options_chunk is None and isinstance(formatted_content, bytes):
+                    digest = await self._codec.run(md5_digest, formatted_content)
+                    unchanged = await self._get_unchanged_metadata(drive_name, path, digest)
+
+                if unchanged is not None:
+                    # e.g. autosave of an unchanged notebook
+                    data = {
+                        "path": path,
+                        "content": content,
+                        "last_modified": unchanged["last_modified"].isoformat(),
+                        "size": unchanged["size"]
+                    }
+                    saved_digest = (digest, unchanged.get("e_tag"))
+                else:
+                    await self._provider_call(drive_name, "put", lambda: self._get_file_system(drive_name)._pipe(drive_name + '/' + path, self._multipartUploads[path] if options_chunk == -1 else formatted_content))
+                    metadata = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._info(drive_name + '/' + path))
+
+                    data = {
+                        "path": path,
+                        "content": content,
+                        "last_modified": metadata["LastModified"].isoformat(),
+                        "size": metadata["size"]
+                    }
+                    if options_chunk is None and isinstance(formatted_content, bytes):
+                        saved_digest = (digest, metadata.get("ETag"))
+            else: 
+                data = {
+                    "path": path,
+                    "content": content,
+                    "last_modified": datetime.now().isoformat(),
+                    "size": 0
+                }
+            
+            if options_chunk == -1: 
+                del self._multipartUploads[path]
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when saving the file: {e}",
+            )
+        finally:
+            self._on_change(drive_name, path)
+
+        if saved_digest is not None:
+            self._remember_digest(drive_name, path, *saved_digest)
+        
+        response = {
+                "data": data
+            }
+        return response
+    
+    async def save_raw_file(self, drive_name, path, body, chunk=None):
+        """Save file with its raw binary content.
+
+        The content is uploaded as it is received, without being copied.
+
+        Args:
+            drive_name: name of drive where file exists
+            path: path where new content should be saved
+            body: async iterable of the parts of the content, as received
+            chunk: number of the chunk of a chunked upload (-1 for the last one), if any
+        """
+        import obstore as obs
+
+        data = {}
+        try:
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+            store = self._content_managers[drive_name]["store"]
+            if chunk is None or chunk == -1:
+                # the buffered saves must not overwrite this one
+                await self._flush_writes(drive_name, path)
+
+            if chunk is None:
+                # streamed upload, a stream can't be retried
+                async with self._get_limiter(drive_name).slot():
+                    with span("put"):
+                        await obs.put_async(store, path, body)
+            else:
+                if chunk == 1:
+                    self._multipartUploads[path] = bytearray()
+                async for part in body:
+                    self._multipartUploads[path] += part
+                if chunk == -1:
+                    content = memoryview(self._multipartUploads.pop(path))
+                    await self._provider_call(drive_name, "put", lambda: obs.put_async(store, path, content))
+
+            if chunk is None or chunk == -1:
+                # the file system caches listings
+                self._get_file_system(drive_name).invalidate_cache(drive_name + '/' + path)
+                metadata = await self._provider_call(drive_name, "head", lambda: obs.head_async(store, path))
+                data = {
+                    "path": path,
+                    "content": None,
+                    "last_modified": metadata["last_modified"].isoformat(),
+                    "size": metadata["size"]
+                }
+            else:
+                data = {
+                    "path": path,
+                    "content": None,
+                    "last_modified": datetime.now().isoformat(),
+                    "size": 0
+                }
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when saving the file: {e}",
+            )
+        finally:
+            self._on_change(drive_name, path)
+
+        response = {
+                "data": data
+            }
+        return response
+
+    async def extract_archive(self, drive_name, path, body, archive_format):
+        """Extract an archive into a directory while it is uploaded.
+
+        Each file of the archive is written as its own object, concurrently, as soon
+        as it is extracted; the archive is not staged.
+
+        Args:
+            drive_name: name of drive where the directory exists
+            path: path of the directory where the files are written
+            body: async iterable of the parts of the archive, as received
+            archive_format: ``zip`` or ``tar`` (possibly compressed with gzip, bz2 or xz)
+        """
+        import obstore as obs
+        from .extract import ArchiveError, extract_archive
+
+        data = {}
+        try:
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+            store = self._content_managers[drive_name]["store"]
+            await self._flush_writes(drive_name, path)
+
+            async def put(name, content):
+                object_path = path + '/' + name if path else name
+                if isinstance(content, bytes):
+                    await self._provider_call(drive_name, "put", lambda: obs.put_async(store, object_path, content))
+                else:
+                    # streamed upload of a large file, a stream can't be retried
+                    async with self._get_limiter(drive_name).slot():
+                        with span("put"):
+                            await obs.put_async(store, object_path, content)
+
+            count = await extract_archive(body, archive_format, put, concurrency=self._config.extract_concurrency)
+            data = {
+                "path": path,
+                "count": count
+            }
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST if isinstance(e, ArchiveError) else _error_status(e),
+            reason=f"The following error occured when extracting the archive: {e}",
+            )
+        finally:
+            # the file system caches listings
+            self._get_file_system(drive_name).invalidate_cache(drive_name + '/' + path)
+            self._on_change(drive_name, path)
+
+        response = {
+                "data": data
+            }
+        return response
+
+    def _resolve_sync_path(self, local_path):
+        """Helping function to get the absolute path of a local directory to sync.
+
+        Args:
+            local_path: path of the directory, relative to the sync root
+        """
+        root = os.path.realpath(self._config.sync_root or os.getcwd())
+        resolved = os.path.realpath(os.path.join(root, local_path.lstrip('/')))
+        if os.path.commonpath([root, resolved]) != root:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.FORBIDDEN,
+            reason="The local directory is outside of the sync root.",
+            )
+        if os.path.exists(resolved) and not os.path.isdir(resolved):
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST,
+            reason="The local path is not a directory.",
+            )
+        return resolved
+
+    async def start_sync(self, drive_name, path, local_path, direction="both", delete=False):
+        """Start syncing a local directory with a directory of a drive.
+
+        The sync runs in the background; only the files that differ are transferred.
+
+        Args:
+            drive_name: name of drive to sync
+            path: path of the directory in the drive (empty string for the whole drive)
+            local_path: path of the local directory, relative to the sync root
+            direction: ``both``, ``upload`` (local to drive) or ``download`` (drive to local)
+            delete: whether to delete the files missing from the source, for one-way syncs
+        Returns:
+            The progress of the sync, with its ``id``.
+        """
+        path = path.strip('/')
+        if direction not in DIRECTIONS:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST,
+            reason=f"The sync direction {direction} is not supported, use one of {', '.join(DIRECTIONS)}.",
+            )
+        if delete and direction == "both":
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST,
+            reason="Deleting files requires a one-way sync.",
+            )
+        if drive_name not in self._content_managers:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_FOUND,
+            reason=f"Drive {drive_name} is not mounted.",
+            )
+        local_root = self._resolve_sync_path(local_path)
+        for job in self._syncs:
+            if job.running and job.drive_name == drive_name and job.path == path and job.local_path == local_root:
+                raise tornado.web.HTTPError(
+                status_code= http.HTTPStatus.CONFLICT,
+                reason=f"The sync {job.id} of these directories is running.",
+                )
+
+        job = SyncJob(drive_name, path, local_root, direction, delete)
+        prefix = path + '/' if path else ''
+
+        async def list_objects():
+            async for objects in self._list_all_objects(drive_name, path):
+                # objects feigning directories
+                yield [object for object in objects if not object["path"].endswith(EMPTY_DIR_SUFFIX) and object["path"].startswith(prefix)]
+
+        synchronizer = Synchronizer(
+            job,
+            local_root,
+            self._content_managers[drive_name]["store"],
+            list_objects,
+            lambda operation, function: self._provider_call(drive_name, operation, function),
+            self._get_limiter(drive_name).slot,
+            await self._syncs.load_state(local_root, drive_name, path),
+            concurrency=self._config.sync_concurrency,
+        )
+
+        async def run():
+            try:
+                await self._flush_writes(drive_name, path)
+                await synchronizer.run()
+            except asyncio.CancelledError:
+                job.finish("cancelled")
+                raise
+            except Exception as e:
+                self.log.error(f"The sync {job.id} of {drive_name}/{path} failed: {e}")
+                job.finish("failed", str(e))
+            else:
+                job.finish("failed" if job.failures else "completed")
+            finally:
+                # the file system caches listings
+                self._get_file_system(drive_name).invalidate_cache(drive_name + '/' + path)
+                self._on_change(drive_name, path)
+                try:
+                    await self._syncs.save_state(local_root, drive_name, path)
+                except OSError as e:
+                    self.log.warning(f"The state of the sync {job.id} could not be saved: {e}")
+
+        job.task = asyncio.ensure_future(run())
+        self._syncs.add(job)
+        response = {
+                "data": job.to_dict()
+            }
+        return response
+
+    async def get_syncs(self, drive_name, path, id=None):
+        """Get the progress of the syncs of a directory of a drive.
+
+        Args:
+            drive_name: name of drive
+            path: path of the directory in the drive
+            id: id of a sync, all the recent syncs of the directory by default
+        """
+        path = path.strip('/')
+        jobs = [
+            job for job in self._syncs
+            if job.drive_name == drive_name and job.path == path and (id is None or job.id == id)
+        ]
+        if id is not None and not jobs:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_FOUND,
+            reason=f"Sync {id} does not exist.",
+            )
+        response = {
+                "data": jobs[0].to_dict() if id is not None else [job.to_dict() for job in jobs]
+            }
+        return response
+
+    async def cancel_sync(self, drive_name, path, id):
+        """Cancel a running sync; the files already transferred are kept.
+
+        Args:
+            drive_name: name of drive
+            path: path of the directory in the drive
+            id: id of the sync
+        """
+        job = self._syncs.get(id)
+        if job is None or job.drive_name != drive_name or job.path != path.strip('/'):
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.NOT_FOUND,
+            reason=f"Sync {id} does not exist.",
+            )
+        if job.running:
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+        response = {
+                "data": job.to_dict()
+            }
+        return response
+
+    async def rename_file(self, drive_name, path, new_path):
+        """Rename a file.
+        
+        Args:
+            drive_name: name of drive where file is located
+            path: path of file
+            new_path: path of new file name
+        """
+        data = {}
+        try: 
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+            
+            await self._flush_writes(drive_name, path)
+            await self._flush_writes(drive_name, new_path)
+
+            object_name = drive_name + '/' + path
+            new_object_name = drive_name + '/' + new_path
+            is_dir = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._isdir(object_name))
+            if is_dir == True:
+                object_name = object_name + EMPTY_DIR_SUFFIX
+                new_object_name = new_object_name + EMPTY_DIR_SUFFIX
+                await self._fix_dir(drive_name, path)
+            
+            await self._provider_call(drive_name, "copy", lambda: self._get_file_system(drive_name)._mv_file(object_name, new_object_name))
+            metadata = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._info(new_object_name))
+
+            data = {
+                "path": new_path,
+                "last_modified": metadata["LastModified"].isoformat(),
+                "size": metadata["size"]
+            }
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when renaming the object: {e}",
+            )
+        finally:
+            self._on_change(drive_name, path)
+            self._on_change(drive_name, new_path)
+        
+        response = {
+                "data": data
+            }
+        return response
+
+    async def delete_file(self, drive_name, path):
+        """Delete an object.
+        
         Args:
             drive_name: name of drive where object exists
             path: path where content is located
         """
+        import obstore as obs
+        import pyarrow
+
         try: 
             # eliminate leading and trailing backslashes
             path = path.strip('/')
+            await self._flush_writes(drive_name, path)
             object_name = drive_name # in case we are only deleting the drive itself
+            is_dir = False
             if path != '':
                 # deleting objects within a drive
-                is_dir = await self._file_system._isdir(drive_name + '/' + path)
+                is_dir = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._isdir(drive_name + '/' + path))
                 if is_dir == True:
                     await self._fix_dir(drive_name, path)
                 object_name = drive_name + '/' + path
-            await self._file_system._rm(object_name, recursive = True)
+            if is_dir == True:
+                # bulk deletes of the objects listed by key ranges
+                await self._delete_objects(drive_name, path)
+            else:
+                await self._provider_call(drive_name, "delete", lambda: self._get_file_system(drive_name)._rm(object_name, recursive = True))
 
             # checking for remaining directories and deleting them
             if object_name != drive_name:
+                remaining = []
                 stream = obs.list(self._content_managers[drive_name]["store"], path, chunk_size=100, return_arrow=True)
-                async for batch in stream:
-                    contents_list = pyarrow.record_batch(batch).to_pylist()
-                    for object in contents_list:
-                        await self._fix_dir(drive_name, object["path"], delete_only = True)               
+                async with self._get_limiter(drive_name).slot():
+                    async for batch in timed_iter("list", stream):
+                        remaining += pyarrow.record_batch(batch).to_pylist()
+                for object in remaining:
+                    await self._fix_dir(drive_name, object["path"], delete_only = True)               
+
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when deleting the object: {e}",
+            )
+        finally:
+            self._on_change(drive_name, path)
+        
+        return
+    
+    async def copy_file(self, drive_name, path, to_path, to_drive):
+        """Save file with new content.
+        
+        Args:
+            drive_name: name of drive where file exists
+            path: path where original content exists
+            to_path: path where object should be copied
+            to_drive: name of drive where to copy object
+        """
+        data = {}
+        try: 
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+
+            await self._flush_writes(drive_name, path)
+            await self._flush_writes(to_drive, to_path)
+
+            object_name = drive_name + '/' + path
+            # copy objects within same drive
+            if to_drive == drive_name:
+                to_object_name = drive_name + '/' + to_path
+            # copy objects to another drive
+            else:
+                to_object_name = to_drive + '/' + to_path
+            
+            is_dir = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._isdir(object_name))
+            if is_dir == True:
+                object_name = object_name + EMPTY_DIR_SUFFIX
+                to_object_name = to_object_name + EMPTY_DIR_SUFFIX
+                await self._fix_dir(drive_name, path)
+           
+            if self._get_file_system(drive_name) is self._get_file_system(to_drive):
+                await self._provider_call(drive_name, "copy", lambda: self._get_file_system(drive_name)._copy(object_name, to_object_name))
+            else:
+                # drives served by different file systems (e.g. S3 and local drives)
+                content = await self._provider_call(drive_name, "get", lambda: self._get_file_system(drive_name)._cat_file(object_name))
+                await self._provider_call(to_drive, "put", lambda: self._get_file_system(to_drive)._pipe(to_object_name, content))
+            metadata = await self._provider_call(to_drive, "head", lambda: self._get_file_system(to_drive)._info(to_object_name))
+
+            data = {
+                "path": to_path,
+                "last_modified": metadata["LastModified"].isoformat(),
+                "size": metadata["size"]
+            }
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when copying the: {e}",
+            )
+        finally:
+            self._on_change(to_drive, to_path)
+        
+        response = {
+                "data": data
+            }
+        return response
+    
+    async def presigned_link(self, drive_name, path):
+        """Get presigned link of object.
+        
+        Args:
+            drive_name: name of drive where file exists
+            path: path where contents exists
+        """
+        import obstore as obs
+
+        data = {}
+        try: 
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+
+            if self._get_provider(drive_name) in LOCAL_PROVIDERS:
+                raise Exception("Presigned links are not supported for local and memory drives.")
+            await self._flush_writes(drive_name, path)
+
+            expiry = timedelta(seconds = 3600) # expiry time for presigned link
+            link = await obs.sign_async(self._content_managers[drive_name]["store"], 'GET', path, expiry)
+
+            data = {
+                "path": path,
+                "link": link
+            }
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= http.HTTPStatus.BAD_REQUEST,
+            reason=f"The following error occured when getting the presigned link: {e}",
+            )
+        
+        response = {
+                "data": data
+            }
+        return response
+    
+    async def check_file(self, drive_name, path):
+        """Check if an object already exists within a drive.
+        
+        Args:
+            drive_name: name of drive where object exists
+            path: path where content is located
+        """
+        # eliminate leading and trailing backslashes
+        path = path.strip('/')
+        if self._write_back is not None and (drive_name, path) in self._write_back:
+            # saved, waiting for its upload
+            return
+        await self._single_flight.do(("check", drive_name, path), lambda: self._check_file(drive_name, path))
+
+    async def _check_file(self, drive_name, path):
+        """Helping function to check if an object exists with the provider.
+
+        Args:
+            drive_name: name of drive where object exists
+            path: path where content is located
+        """
+        check = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._exists(drive_name + '/' + path))
+        if check == False:
+            # check if we are dealing with a directory
+            check = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._exists(drive_name + '/' + path + EMPTY_DIR_SUFFIX))
+            if check == False:
+                raise tornado.web.HTTPError(
+                    status_code= http.HTTPStatus.NOT_FOUND,
+                    reason="Object does not already exist within drive.",
+                )
+
+        return 
+    
+    def _s3_client(self, drive_name):
+        """Helping function to create a client for the S3 specific calls to a drive.
+
+        Args:
+            drive_name: name of the drive
+        """
+        return self._s3_session.create_client(
+            's3',
+            aws_secret_access_key=self._config.secret_access_key,
+            aws_access_key_id=self._config.access_key_id,
+            aws_session_token=self._config.session_token,
+            endpoint_url=self._config.endpoint_url,
+            region_name=self._content_managers[drive_name]["location"],
+        )
+
+    async def _is_versioned(self, drive_name):
+        """Helping function to check whether the object versioning of a drive is enabled.
+
+        Only the versioning of S3 buckets is used. The checkpoints of the other drives,
+        including the GCS buckets with object versioning enabled, are copies: their
+        generations are only reachable through the GCS JSON API, for which there is no
+        client here.
+
+        Args:
+            drive_name: name of the drive
+        """
+        content_manager = self._content_managers[drive_name]
+        if "versioned" not in content_manager:
+            versioned = False
+            if content_manager["provider"] == 's3':
+                async def get_bucket_versioning():
+                    async with self._s3_client(drive_name) as client:
+                        return await client.get_bucket_versioning(Bucket=drive_name)
+
+                try:
+                    result = await self._provider_call(drive_name, "head", get_bucket_versioning)
+                    # saves don't create versions while versioning is suspended
+                    versioned = result.get("Status") == "Enabled"
+                except Exception as e:
+                    # e.g. not allowed to get the versioning configuration
+                    self.log.debug(f"The checkpoints of {drive_name} are copies: {e}")
+            content_manager["versioned"] = versioned
+        return content_manager["versioned"]
+
+    async def create_checkpoint(self, drive_name, path):
+        """Create a checkpoint of a file.
+
+        On drives with object versioning enabled the checkpoint is the current version
+        of the file, nothing is copied. Otherwise the file is copied by the provider
+        next to it, in the checkpoints directory.
+
+        Args:
+            drive_name: name of drive where file exists
+            path: path of the file
+        """
+        data = {}
+        try:
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+            await self._flush_writes(drive_name, path)
+
+            if await self._is_versioned(drive_name):
+                async def head_object():
+                    async with self._s3_client(drive_name) as client:
+                        return await client.head_object(Bucket=drive_name, Key=path)
+
+                metadata = await self._provider_call(drive_name, "head", head_object)
+                data = {
+                    "id": metadata["VersionId"],
+                    "last_modified": metadata["LastModified"].isoformat()
+                }
+            else:
+                checkpoint_path = _checkpoint_path(path)
+                object_name = drive_name + '/' + path
+                checkpoint_name = drive_name + '/' + checkpoint_path
+                try:
+                    await self._provider_call(drive_name, "copy", lambda: self._get_file_system(drive_name)._copy(object_name, checkpoint_name))
+                finally:
+                    self._on_change(drive_name, checkpoint_path)
+                metadata = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._info(checkpoint_name))
+                data = {
+                    "id": CHECKPOINT_ID,
+                    "last_modified": metadata["LastModified"].isoformat()
+                }
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when creating the checkpoint: {e}",
+            )
+
+        response = {
+            "data": data
+        }
+        return response
 
+    async def list_checkpoints(self, drive_name, path):
+        """List the checkpoints of a file, from the oldest to the latest.
+
+        On drives with object versioning enabled these are the versions of the file,
+        including the current one.
+
+        Args:
+            drive_name: name of drive where file exists
+            path: path of the file
+        """
+        data = []
+        try:
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+            await self._flush_writes(drive_name, path)
+
+            if await self._is_versioned(drive_name):
+                async def list_object_versions():
+                    versions = []
+                    async with self._s3_client(drive_name) as client:
+                        paginator = client.get_paginator('list_object_versions')
+                        async for page in paginator.paginate(Bucket=drive_name, Prefix=path):
+                            # the prefix also matches the objects whose name starts with the name of the file
+                            versions += [version for version in page.get("Versions", []) if version["Key"] == path]
+                    return versions
+
+                versions = await self._provider_call(drive_name, "list", list_object_versions)
+                versions.sort(key=lambda version: version["LastModified"])
+                data = [
+                    {
+                        "id": version["VersionId"],
+                        "last_modified": version["LastModified"].isoformat()
+                    }
+                    for version in versions[-CHECKPOINTS_LISTED:]
+                ]
+            else:
+                checkpoint_name = drive_name + '/' + _checkpoint_path(path)
+                exists = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._exists(checkpoint_name))
+                if exists:
+                    metadata = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._info(checkpoint_name))
+                    data = [{
+                        "id": CHECKPOINT_ID,
+                        "last_modified": metadata["LastModified"].isoformat()
+                    }]
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
-            reason=f"The following error occured when deleting the object: {e}",
+            status_code= _error_status(e),
+            reason=f"The following error occured when listing the checkpoints: {e}",
             )
-        
-        return
-    
-    async def copy_file(self, drive_name, path, to_path, to_drive):
-        """Save file with new content.
-        
+
+        response = {
+            "data": data
+        }
+        return response
+
+    async def get_checkpoint(self, drive_name, path, checkpoint_id):
+        """Get the content of a file at a checkpoint.
+
         Args:
             drive_name: name of drive where file exists
-            path: path where original content exists
-            to_path: path where object should be copied
-            to_drive: name of drive where to copy object
+            path: path of the file
+            checkpoint_id: ID of the checkpoint (the version ID on drives with object versioning)
         """
         data = {}
-        try: 
+        try:
             # eliminate leading and trailing backslashes
             path = path.strip('/')
 
-            object_name = drive_name + '/' + path
-            # copy objects within same drive
-            if to_drive == drive_name:
-                to_object_name = drive_name + '/' + to_path
-            # copy objects to another drive
+            if await self._is_versioned(drive_name):
+                async def get_object():
+                    async with self._s3_client(drive_name) as client:
+                        response = await client.get_object(Bucket=drive_name, Key=path, VersionId=checkpoint_id)
+                        async with response["Body"] as body:
+                            return await body.read(), response["LastModified"]
+
+                content, last_modified = await self._provider_call(drive_name, "get", get_object)
             else:
-                to_object_name = to_drive + '/' + to_path
-            
-            is_dir = await self._file_system._isdir(object_name)
-            if is_dir == True:
-                object_name = object_name + EMPTY_DIR_SUFFIX
-                to_object_name = to_object_name + EMPTY_DIR_SUFFIX
-                await self._fix_dir(drive_name, path)
-           
-            await self._file_system._copy(object_name, to_object_name)
-            metadata = await self._file_system._info(to_object_name)
+                checkpoint_name = drive_name + '/' + _checkpoint_path(path)
+                _check_checkpoint_id(checkpoint_id)
+                content = await self._provider_call(drive_name, "get", lambda: self._get_file_system(drive_name)._cat_file(checkpoint_name))
+                metadata = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._info(checkpoint_name))
+                last_modified = metadata["LastModified"]
 
             data = {
-                "path": to_path,
-                "last_modified": metadata["LastModified"].isoformat(),
-                "size": metadata["size"]
+                "path": path,
+                "id": checkpoint_id,
+                "content": await self._encode_content(path, content),
+                "last_modified": last_modified.isoformat(),
+                "size": len(content)
             }
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
-            reason=f"The following error occured when copying the: {e}",
+            status_code= _error_status(e),
+            reason=f"The following error occured when retrieving the checkpoint: {e}",
             )
-        
+
         response = {
-                "data": data
-            }
+            "data": data
+        }
         return response
-    
-    async def presigned_link(self, drive_name, path):
-        """Get presigned link of object.
-        
+
+    async def restore_checkpoint(self, drive_name, path, checkpoint_id):
+        """Restore a file to a checkpoint, with a copy by the provider.
+
         Args:
             drive_name: name of drive where file exists
-            path: path where contents exists
+            path: path of the file
+            checkpoint_id: ID of the checkpoint (the version ID on drives with object versioning)
         """
-        data = {}
-        try: 
+        try:
             # eliminate leading and trailing backslashes
             path = path.strip('/')
+            # the buffered saves must not overwrite the restored content
+            await self._flush_writes(drive_name, path)
+
+            if await self._is_versioned(drive_name):
+                async def copy_object():
+                    async with self._s3_client(drive_name) as client:
+                        return await client.copy_object(
+                            Bucket=drive_name,
+                            Key=path,
+                            CopySource={"Bucket": drive_name, "Key": path, "VersionId": checkpoint_id},
+                        )
 
-            expiry = timedelta(seconds = 3600) # expiry time for presigned link
-            link = await obs.sign_async(self._content_managers[drive_name]["store"], 'GET', path, expiry)
-
-            data = {
-                "path": path,
-                "link": link
-            }
+                await self._provider_call(drive_name, "copy", copy_object)
+                # the file system caches listings
+                self._get_file_system(drive_name).invalidate_cache(drive_name + '/' + path)
+            else:
+                _check_checkpoint_id(checkpoint_id)
+                object_name = drive_name + '/' + path
+                checkpoint_name = drive_name + '/' + _checkpoint_path(path)
+                await self._provider_call(drive_name, "copy", lambda: self._get_file_system(drive_name)._copy(checkpoint_name, object_name))
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
-            reason=f"The following error occured when getting the presigned link: {e}",
+            status_code= _error_status(e),
+            reason=f"The following error occured when restoring the checkpoint: {e}",
             )
-        
-        response = {
-                "data": data
-            }
-        return response
-    
-    async def check_file(self, drive_name, path):
-        """Check if an object already exists within a drive.
-        
+        finally:
+            self._on_change(drive_name, path)
+
+        return
+
+    async def delete_checkpoint(self, drive_name, path, checkpoint_id):
+        """Delete a checkpoint of a file.
+
+        On drives with object versioning enabled the version is deleted permanently;
+        the current version of the file can't be deleted.
+
         Args:
-            drive_name: name of drive where object exists
-            path: path where content is located
+            drive_name: name of drive where file exists
+            path: path of the file
+            checkpoint_id: ID of the checkpoint (the version ID on drives with object versioning)
         """
-        # eliminate leading and trailing backslashes
-        path = path.strip('/')
-        check = await self._file_system._exists(drive_name + '/' + path)
-        if check == False:
-            # check if we are dealing with a directory
-            check = await self._file_system._exists(drive_name + '/' + path + EMPTY_DIR_SUFFIX)
-            if check == False:
-                raise tornado.web.HTTPError(
-                    status_code= httpx.codes.NOT_FOUND,
-                    reason="Object does not already exist within drive.",
-                )
+        try:
+            # eliminate leading and trailing backslashes
+            path = path.strip('/')
+
+            if await self._is_versioned(drive_name):
+                async def delete_object_version():
+                    async with self._s3_client(drive_name) as client:
+                        metadata = await client.head_object(Bucket=drive_name, Key=path)
+                        if metadata.get("VersionId") == checkpoint_id:
+                            raise tornado.web.HTTPError(
+                                status_code=http.HTTPStatus.CONFLICT,
+                                reason="The current version of the file can't be deleted.",
+                            )
+                        return await client.delete_object(Bucket=drive_name, Key=path, VersionId=checkpoint_id)
+
+                await self._provider_call(drive_name, "delete", delete_object_version)
+            else:
+                _check_checkpoint_id(checkpoint_id)
+                checkpoint_path = _checkpoint_path(path)
+                try:
+                    await self._provider_call(drive_name, "delete", lambda: self._get_file_system(drive_name)._rm(drive_name + '/' + checkpoint_path))
+                finally:
+                    self._on_change(drive_name, checkpoint_path)
+        except Exception as e:
+            raise tornado.web.HTTPError(
+            status_code= _error_status(e),
+            reason=f"The following error occured when deleting the checkpoint: {e}",
+            )
+
+        return
 
-        return 
-    
     async def new_drive(self, new_drive_name, location):
         """Create a new drive in the given location.
 
@@ -745,9 +2460,19 @@ class JupyterDrivesManager():
             new_drive_name: name of new drive to create
             location: (optional) region of bucket
         """
+        if self._config.provider in LOCAL_PROVIDERS:
+            try:
+                self._local_drives[self._config.provider].create(new_drive_name)
+            except Exception as e:
+                raise tornado.web.HTTPError(
+                status_code= http.HTTPStatus.BAD_REQUEST,
+                reason=f"The following error occured when creating the new drive: {e}",
+                )
+            return
+
         location = location or 'us-east-1'
 
-        try:
+        async def create_bucket():
             # Create a region-specific S3 client for bucket creation
             # This ensures the client matches the target region
             async with self._s3_session.create_client(
@@ -755,7 +2480,8 @@ class JupyterDrivesManager():
                 aws_secret_access_key=self._config.secret_access_key,
                 aws_access_key_id=self._config.access_key_id,
                 aws_session_token=self._config.session_token,
-                region_name=location
+                region_name=location,
+                endpoint_url=self._config.endpoint_url,
             ) as client:
                 if location == 'us-east-1':
                     # For us-east-1, don't specify location constraint
@@ -766,9 +2492,12 @@ class JupyterDrivesManager():
                         Bucket=new_drive_name,
                         CreateBucketConfiguration={'LocationConstraint': location}
                     )
+
+        try:
+            await self._provider_call(new_drive_name, "put", create_bucket)
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= _error_status(e),
             reason=f"The following error occured when creating the new drive: {e}",
             )
 
@@ -789,7 +2518,7 @@ class JupyterDrivesManager():
             self._external_drives[drive_name] = drive;
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= http.HTTPStatus.BAD_REQUEST,
             reason= f"The following error occured when adding the public drive: {e}"
             )
 
@@ -802,15 +2531,19 @@ class JupyterDrivesManager():
             drive_name: name of drive to get the region of
         """
         location = 'us-east-1'
-        try:
+
+        async def get_bucket_location():
             # set temporary client for location extraction
-            async with self._s3_session.create_client('s3', aws_secret_access_key=self._config.secret_access_key, aws_access_key_id=self._config.access_key_id, aws_session_token=self._config.session_token) as client:
-                result = await client.get_bucket_location(Bucket=drive_name)
-                if result['LocationConstraint'] is not None:
-                    location = result['LocationConstraint']
+            async with self._s3_session.create_client('s3', aws_secret_access_key=self._config.secret_access_key, aws_access_key_id=self._config.access_key_id, aws_session_token=self._config.session_token, endpoint_url=self._config.endpoint_url) as client:
+                return await client.get_bucket_location(Bucket=drive_name)
+
+        try:
+            result = await self._provider_call(drive_name, "head", get_bucket_location)
+            if result['LocationConstraint'] is not None:
+                location = result['LocationConstraint']
         except Exception as e:
              raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= _error_status(e),
             reason=f"{e}",
             )
     
@@ -824,25 +2557,159 @@ class JupyterDrivesManager():
             path: path of object to fix
         """
         try: 
-            check = await self._file_system._exists(drive_name + '/' + path + EMPTY_DIR_SUFFIX)
-            if check == True: # directory has right format
-                return 
-            else: # directory was created from console
-                # delete original object
-                async with self._s3_session.create_client('s3', aws_secret_access_key=self._config.secret_access_key, aws_access_key_id=self._config.access_key_id, aws_session_token=self._config.session_token) as client:
-                    await client.delete_object(Bucket=drive_name, Key=path+'/')
-                if delete_only == True:
+            with span("fix_dir"):
+                marker = drive_name + '/' + path + EMPTY_DIR_SUFFIX
+                check = await self._provider_call(drive_name, "head", lambda: self._get_file_system(drive_name)._exists(marker))
+                if check == True: # directory has right format
                     return 
-                # create new directory
-                await self._file_system._touch(drive_name + '/' + path + EMPTY_DIR_SUFFIX)
+                elif self._get_provider(drive_name) in LOCAL_PROVIDERS: # directory was created without marker
+                    if delete_only == True:
+                        return
+                    await self._provider_call(drive_name, "put", lambda: self._get_file_system(drive_name)._touch(marker))
+                else: # directory was created from console
+                    # delete original object
+                    async def delete_directory_object():
+                        async with self._s3_session.create_client('s3', aws_secret_access_key=self._config.secret_access_key, aws_access_key_id=self._config.access_key_id, aws_session_token=self._config.session_token, endpoint_url=self._config.endpoint_url) as client:
+                            await client.delete_object(Bucket=drive_name, Key=path+'/')
+                    await self._provider_call(drive_name, "delete", delete_directory_object)
+                    if delete_only == True:
+                        return 
+                    # create new directory
+                    await self._provider_call(drive_name, "put", lambda: self._get_file_system(drive_name)._touch(marker))
         except Exception as e:
             raise tornado.web.HTTPError(
-            status_code= httpx.codes.BAD_REQUEST,
+            status_code= _error_status(e),
             reason=f"The following error occured when fixing the directory object: {e}",
             )
         
         return                    
     
+    def _check_provider_credentials(self):
+        """Helping function to check that the credentials of the provider REST API are set."""
+        if not self._config.session_token:
+            raise tornado.web.HTTPError(
+                status_code= http.HTTPStatus.BAD_REQUEST,
+                reason="No session token specified. Please set DriversConfig.session_token in your user jupyter_server_config file.",
+            )
+        
+        if not self._config.access_key_id:
+            raise tornado.web.HTTPError(
+                status_code= http.HTTPStatus.BAD_REQUEST,
+                reason="No access key id specified. Please set DriversConfig.access_key_id in your user jupyter_server_config file.",
+            )
+        
+        if not self._config.secret_access_key:
+            raise tornado.web.HTTPError(
+                status_code= http.HTTPStatus.BAD_REQUEST,
+                reason="No secret access key specified. Please set DriversConfig.secret_access_key in your user jupyter_server_config file.",
+            )
+
+    def _provider_url(self, url: str, params: Optional[Dict[str, str]] = None) -> str:
+        """Helping function to get the absolute URL of an endpoint of the provider REST API."""
+        if (not url.startswith(self.base_api_url)) and (not re.search("^https?:", url)):
+            url = url_path_join(self.base_api_url, url)
+        if params is not None:
+            url = tornado.httputil.url_concat(url, params)
+        return url
+
+    async def _fetch_provider(
+        self,
+        url: str,
+        method: str = "GET",
+        body: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        """Helping function to send a request to the third party service.
+
+        Args:
+            url: absolute URL of the endpoint
+            method: HTTP method
+            body: serialized request body; None if no body
+            headers: request headers as dictionary; None if no headers
+        Returns:
+            The ``httpx`` response.
+        """
+        import httpx
+
+        self.log.debug(f"{method.upper()} {url}")
+        try:
+            response = await self._client.request(method.upper(), url, content=body, headers=headers)
+            response.raise_for_status()
+            return response
+        except httpx.HTTPStatusError as e:
+            self.log.debug(f"Failed to fetch {method.upper()} {url}", exc_info=e)
+            error_body = e.response.text or "{}"
+            self.log.debug(error_body)
+            try:
+                message = json.loads(error_body).get("message", str(e))
+            except (json.JSONDecodeError, AttributeError):
+                message = str(e)
+            raise tornado.web.HTTPError(
+                status_code=e.response.status_code, reason=f"Invalid response in '{url}': {message}"
+            ) from e
+        except Exception as e:
+            self.log.error("Failed to fetch http request", exc_info=e)
+            raise tornado.web.HTTPError(
+                status_code=http.HTTPStatus.INTERNAL_SERVER_ERROR,
+                reason=f"Unknown error in '{url}': {e}",
+            ) from e
+
+    def _decode_provider_response(self, response, url: str):
+        """Helping function to parse the JSON body of a response of the third party service."""
+        try:
+            return json.loads(response.content.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            self.log.error("Failed to decode the response", exc_info=e)
+            raise tornado.web.HTTPError(
+                status_code=http.HTTPStatus.BAD_REQUEST,
+                reason=f"Invalid response in '{url}': {e}",
+            ) from e
+
+    async def _iter_provider(
+        self,
+        url: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        """Iterate over the items of a paginated GET endpoint of the third party service.
+
+        The pages are followed through the ``Link: <url>; rel="next"`` header of the
+        responses, the next page being requested while the items of the current one
+        are consumed.
+
+        Args:
+            url: Endpoint to request
+            params: Query arguments as dictionary; None if no arguments
+            headers: Request headers as dictionary; None if no headers
+        Returns:
+            An async iterator of the items of all the pages.
+        """
+        self._check_provider_credentials()
+        if self.per_page_argument is not None:
+            params = dict(params or {})
+            params.update([self.per_page_argument])
+        url = self._provider_url(url, params)
+
+        page = asyncio.ensure_future(self._fetch_provider(url, headers=headers))
+        try:
+            while page is not None:
+                response = await page
+                next_url = response.links.get("next", {}).get("url")
+                # relevant query arguments are part of the link
+                page = asyncio.ensure_future(
+                    self._fetch_provider(urllib.parse.urljoin(str(response.url), next_url), headers=headers)
+                ) if next_url else None
+
+                items = self._decode_provider_response(response, str(response.url))
+                if not isinstance(items, list):
+                    items = [items]
+                for item in items:
+                    yield item
+        finally:
+            if page is not None:
+                page.cancel()
+                await asyncio.gather(page, return_exceptions=True)
+
     async def _call_provider(
         self,
         url: str,
@@ -860,6 +2727,9 @@ class JupyterDrivesManager():
         - load_json is True
         - The provider returns not None per_page_argument property
 
+        The items of all the pages are then gathered in a list; use ``_iter_provider``
+        to process them while the next pages are retrieved.
+
         Args:
             url: Endpoint to request
             load_json: Is the response of JSON type
@@ -872,124 +2742,23 @@ class JupyterDrivesManager():
             List or Dict: Create from JSON response body if load_json is True
             str: Raw response body if load_json is False
         """
-        if not self._config.session_token:
-            raise tornado.web.HTTPError(
-                status_code= httpx.codes.BAD_REQUEST,
-                reason="No session token specified. Please set DriversConfig.session_token in your user jupyter_server_config file.",
-            )
-        
-        if not self._config.access_key_id:
-            raise tornado.web.HTTPError(
-                status_code= httpx.codes.BAD_REQUEST,
-                reason="No access key id specified. Please set DriversConfig.access_key_id in your user jupyter_server_config file.",
-            )
-        
-        if not self._config.secret_access_key:
-            raise tornado.web.HTTPError(
-                status_code= httpx.codes.BAD_REQUEST,
-                reason="No secret access key specified. Please set DriversConfig.secret_access_key in your user jupyter_server_config file.",
-            )
-
-        if body is not None:
-            if headers is None:
-                headers = {}
-            headers["Content-Type"] = "application/json"
-            body = tornado.escape.json_encode(body)
-
-        if (not url.startswith(self.base_api_url)) and (not re.search("^https?:", url)):
-            url = url_path_join(self.base_api_url, url)
-
-        with_pagination = False
         if (
             load_json
             and has_pagination
             and method.lower() == "get"
             and self.per_page_argument is not None
         ):
-            with_pagination = True
-            params = params or {}
-            params.update([self.per_page_argument])
+            return [item async for item in self._iter_provider(url, params=params, headers=headers)]
 
-        if params is not None:
-            url = tornado.httputil.url_concat(url, params)
-
-        request = tornado.httpclient.HTTPRequest(
-            url,
-            method=method.upper(),
-            body=body,
-            headers=headers,
-        )
+        self._check_provider_credentials()
+        if body is not None:
+            if headers is None:
+                headers = {}
+            headers["Content-Type"] = "application/json"
+            body = tornado.escape.json_encode(body)
 
-        self.log.debug(f"{method.upper()} {url}")
-        try:
-            response = await self._client.fetch(request)
-            result = response.body.decode("utf-8")
-            if load_json:
-                # Handle pagination
-                # Assume the link to be a comma separated list of <url>; rel="relation"
-                # where the next chunk has `relation`=next
-                link = response.headers.get("Link")
-                next_url = None
-                if link is not None:
-                    for e in link.split(","):
-                        args = e.strip().split(";")
-                        data = args[0]
-                        metadata = {
-                            k.strip(): v.strip().strip('"')
-                            for k, v in map(lambda s: s.strip().split("="), args[1:])
-                        }
-                        if metadata.get("rel", "") == "next":
-                            next_url = data[1:-1]
-                            break
-
-                new_ = json.loads(result)
-                if next_url is not None:
-                    next_ = await self._call_provider(
-                        next_url,
-                        load_json=load_json,
-                        method=method,
-                        body=body,
-                        headers=headers,
-                        has_pagination=False,  # Relevant query arguments should be part of the link header
-                    )
-                    if not isinstance(new_, list):
-                        new_ = [new_]
-                    if not isinstance(next_, list):
-                        next_ = [next_]
-                    return new_ + next_
-                else:
-                    if with_pagination and not isinstance(new_, list):
-                        return [new_]
-                    else:
-                        return new_
-            else:
-                return result
-        except tornado.httpclient.HTTPClientError as e:
-            self.log.debug(
-                f"Failed to fetch {request.method} {request.url}", exc_info=e
-            )
-            error_body = (
-                (e.response.body or b"{}").decode("utf-8")
-                if e.response is not None
-                else "{}"
-            )
-            self.log.debug(error_body)
-            try:
-                message = json.loads(error_body).get("message", str(e))
-            except json.JSONDecodeError:
-                message = str(e)
-            raise tornado.web.HTTPError(
-                status_code=e.code, reason=f"Invalid response in '{url}': {message}"
-            ) from e
-        except (json.JSONDecodeError, UnicodeDecodeError) as e:
-            self.log.error("Failed to decode the response", exc_info=e)
-            raise tornado.web.HTTPError(
-                status_code=http.HTTPStatus.BAD_REQUEST,
-                reason=f"Invalid response in '{url}': {e}",
-            ) from e
-        except Exception as e:
-            self.log.error("Failed to fetch http request", exc_info=e)
-            raise tornado.web.HTTPError(
-                status_code=http.HTTPStatus.INTERNAL_SERVER_ERROR,
-                reason=f"Unknown error in '{url}': {e}",
-            ) from e
+        url = self._provider_url(url, params)
+        response = await self._fetch_provider(url, method=method, body=body, headers=headers)
+        if load_json:
+            return self._decode_provider_response(response, url)
+        return response.text
@@ -0,0 +1,73 @@
+"""
+Prometheus metrics of the drives manager.
+
+They are registered in the default registry and are therefore exposed by the
+``/metrics`` endpoint of the Jupyter server.
+"""
+from prometheus_client import Counter, Gauge
+
+PROVIDER_QUEUE_DEPTH = Gauge(
+    "jupyter_drives_provider_queue_depth",
+    "Number of provider calls waiting for a concurrency slot.",
+    ["drive"],
+)
+
+PROVIDER_IN_FLIGHT = Gauge(
+    "jupyter_drives_provider_in_flight",
+    "Number of provider calls in flight.",
+    ["drive"],
+)
+
+PROVIDER_CONCURRENCY_LIMIT = Gauge(
+    "jupyter_drives_provider_concurrency_limit",
+    "Current adaptive limit of concurrent provider calls.",
+    ["drive"],
+)
+
+PROVIDER_THROTTLES = Counter(
+    "jupyter_drives_provider_throttles_total",
+    "Number of provider calls rejected because of throttling.",
+    ["drive"],
+)
+
+PROVIDER_RETRIES = Counter(
+    "jupyter_drives_provider_retries_total",
+    "Number of provider calls retried after a transient error.",
+    ["drive"],
+)
+
+COALESCED_REQUESTS = Counter(
+    "jupyter_drives_coalesced_requests_total",
+    "Number of requests served by an identical provider call already in flight.",
+    ["operation"],
+)
+
+WRITE_BACK_COALESCED = Counter(
+    "jupyter_drives_write_back_coalesced_total",
+    "Number of saves replacing a content waiting for its background upload.",
+    ["drive"],
+)
+
+WRITE_BACK_FAILURES = Counter(
+    "jupyter_drives_write_back_failures_total",
+    "Number of failed background uploads of saved contents.",
+    ["drive"],
+)
+
+PROVIDER_HEDGEABLE_CALLS = Counter(
+    "jupyter_drives_provider_hedgeable_calls_total",
+    "Number of provider calls which could be hedged by a second identical call.",
+    ["drive", "operation"],
+)
+
+PROVIDER_HEDGES = Counter(
+    "jupyter_drives_provider_hedges_total",
+    "Number of second identical provider calls issued because the first one was slow.",
+    ["drive", "operation"],
+)
+
+PROVIDER_HEDGE_WINS = Counter(
+    "jupyter_drives_provider_hedge_wins_total",
+    "Number of hedged provider calls answered first by the second call.",
+    ["drive", "operation"],
+)
@@ -0,0 +1,153 @@
+"""
+Background prefetch of the contents likely to be opened next.
+
+Once a drive is mounted the root listing is retrieved in the background, and once a
+directory is listed the small notebooks and text files directly under it are, most
+recently modified first. Their responses are kept for a short time and served once to
+the next request of the same contents, which then doesn't wait for the provider.
+
+Each prefetch runs under a budget of bytes and concurrent calls, and is cancelled
+when another directory of the same drive is listed (the user navigated away) or the
+drive is unmounted. A change to a drive drops its prefetched responses.
+"""
+import asyncio
+import collections
+import logging
+import posixpath
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+# extensions of the files prefetched after a listing
+PREFETCHED_EXTENSIONS = {
+    ".ipynb", ".py", ".md", ".txt", ".json", ".csv", ".tsv", ".yaml", ".yml",
+    ".toml", ".cfg", ".ini", ".r", ".jl", ".sql", ".sh", ".html", ".xml",
+}
+
+# files prefetched per listing
+PREFETCHED_FILES = 16
+
+# seconds during which a prefetched response can be served
+PREFETCH_TTL = 30
+
+# prefetched responses kept, across the drives
+PREFETCHED_RESPONSES = 256
+
+class Prefetcher():
+    """
+    Prefetches the contents likely to be opened next and keeps their responses.
+
+    Args:
+        fetch: coroutine function getting the response of a contents request, called as
+            ``fetch(drive_name, path)``
+        max_size: size in bytes of the largest prefetched file
+        budget: bytes of the files prefetched per listing
+        concurrency: number of files prefetched concurrently
+        log: logger of the failed prefetches
+    """
+    def __init__(
+        self,
+        fetch: Callable[[str, str], Awaitable[dict]],
+        max_size: int = 1024 * 1024,
+        budget: int = 16 * 1024 * 1024,
+        concurrency: int = 4,
+        log: Optional[logging.Logger] = None,
+    ) -> None:
+        self._fetch = fetch
+        self._max_size = max_size
+        self._budget = budget
+        self._concurrency = concurrency
+        self._log = log or logging.getLogger(__name__)
+        self._responses: collections.OrderedDict[Hashable, Tuple[float, dict]] = collections.OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # incremented by the changes to a drive, the responses fetched before are dropped
+        self._generations: collections.Counter[str] = collections.Counter()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def take(self, drive_name: str, path: str) -> Optional[dict]:
+        """Get the prefetched response of a contents request, if any; it is served once."""
+        stored = self._responses.pop((drive_name, path), None)
+        if stored is None or time.monotonic() - stored[0] > PREFETCH_TTL:
+            return None
+        return stored[1]
+
+    def _store(self, drive_name: str, path: str, response: dict):
+        self._responses[(drive_name, path)] = (time.monotonic(), response)
+        self._responses.move_to_end((drive_name, path))
+        while len(self._responses) > PREFETCHED_RESPONSES:
+            self._responses.popitem(last=False)
+
+    def forget(self, drive_name: str):
+        """Drop the responses prefetched from a drive, e.g. after a change."""
+        self._generations[drive_name] += 1
+        for key in [key for key in self._responses if key[0] == drive_name]:
+            del self._responses[key]
+
+    def warm_up(self, drive_name: str):
+        """Prefetch the root listing of a mounted drive and the files under it."""
+        self._start(drive_name, self._run(drive_name, '', None))
+
+    def after_listing(self, drive_name: str, path: str, entries: List[dict]):
+        """Prefetch the files of a listed directory, cancelling the previous prefetch of the drive."""
+        self._start(drive_name, self._run(drive_name, path, entries))
+
+    def cancel(self, drive_name: Optional[str] = None):
+        """Cancel the prefetch of a drive, or of all the drives."""
+        for name in [name for name in self._tasks if drive_name is None or name == drive_name]:
+            self._tasks.pop(name).cancel()
+
+    def _start(self, drive_name: str, coroutine):
+        self.cancel(drive_name)
+        task = asyncio.ensure_future(coroutine)
+        self._tasks[drive_name] = task
+
+        def done(task):
+            if self._tasks.get(drive_name) is task:
+                del self._tasks[drive_name]
+            if not task.cancelled() and task.exception() is not None:
+                self._log.debug(f"The prefetch of {drive_name} failed: {task.exception()}")
+
+        task.add_done_callback(done)
+
+    async def _prefetch(self, drive_name: str, path: str) -> dict:
+        generation = self._generations[drive_name]
+        response = await self._fetch(drive_name, path)
+        if self._generations[drive_name] == generation:
+            self._store(drive_name, path, response)
+        return response
+
+    async def _run(self, drive_name: str, path: str, entries: Optional[List[dict]]):
+        if entries is None:
+            entries = (await self._prefetch(drive_name, path))["data"]
+
+        prefix = path + '/' if path else ''
+        candidates = [
+            entry for entry in entries
+            # files directly under the directory
+            if '/' not in entry["path"][len(prefix):]
+            and posixpath.splitext(entry["path"])[1].lower() in PREFETCHED_EXTENSIONS
+            and 0 < entry["size"] <= self._max_size
+            and (drive_name, entry["path"]) not in self._responses
+        ]
+        # notebooks first, then the most recently modified files
+        candidates.sort(key=lambda entry: entry["last_modified"], reverse=True)
+        candidates.sort(key=lambda entry: not entry["path"].endswith(".ipynb"))
+
+        budget = self._budget
+        paths = []
+        for entry in candidates[:PREFETCHED_FILES]:
+            if entry["size"] <= budget:
+                budget -= entry["size"]
+                paths.append(entry["path"])
+
+        slots = asyncio.Semaphore(self._concurrency)
+
+        async def prefetch(file_path):
+            async with slots:
+                try:
+                    await self._prefetch(drive_name, file_path)
+                except Exception as e:
+                    self._log.debug(f"The prefetch of {drive_name}/{file_path} failed: {e}")
+
+        await asyncio.gather(*(prefetch(file_path) for file_path in paths))
@@ -0,0 +1,266 @@
+"""
+Previews of the tabular files of the drives: Parquet, Arrow IPC and CSV.
+
+A preview returns the schema of a file, its number of rows when it is known and its
+first rows, reading only a few ranges of the file however large it is:
+
+- Parquet: the footer, whose metadata holds the schema, the number of rows and the
+  layout of the row groups, then the column chunks of the first row group, as
+  long as they fit in a budget of bytes (the other columns are left out);
+- Arrow IPC (``.arrow``, ``.feather``) and CSV: the head of the file, the rows of
+  the last partial record batch or line being dropped.
+
+The ranges are read by the manager and decoded in the encoding pool, by the
+module-level functions below; pyarrow is imported there.
+"""
+import base64
+import datetime
+import decimal
+import io
+import math
+import posixpath
+import struct
+from typing import Any, List, Optional, Tuple
+
+# kinds of the previewed files, by extension
+PREVIEW_FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    '.arrows': 'arrows',
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+}
+
+# bytes read from the end of a Parquet file, holding the footer of most files
+FOOTER_READ_SIZE = 64 * 1024
+
+# bytes read after a column chunk, written without their dictionary page header by old writers
+COLUMN_CHUNK_PADDING = 100
+
+# rows of a preview by default and at most
+DEFAULT_PREVIEW_ROWS = 100
+MAX_PREVIEW_ROWS = 1000
+
+# magic bytes of the file formats
+PARQUET_MAGIC = b"PAR1"
+ARROW_MAGIC = b"ARROW1"
+
+def preview_format(path: str) -> Optional[str]:
+    """Get the kind of a previewed file (``parquet``, ``arrow``, ``arrows``, ``csv`` or ``tsv``), if it can be previewed."""
+    return PREVIEW_FORMATS.get(posixpath.splitext(path)[1].lower())
+
+class _RangesFile(io.RawIOBase):
+    """
+    Read-only file of which only some ranges were retrieved; reading any other
+    range fails.
+
+    Args:
+        size: size of the whole file
+        ranges: offsets and contents of the retrieved ranges
+    """
+    def __init__(self, size: int, ranges: List[Tuple[int, bytes]]) -> None:
+        self._size = size
+        self._ranges = sorted(ranges)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        end = self._size if size < 0 else min(self._size, self._position + size)
+        parts = []
+        for start, content in self._ranges:
+            if self._position >= end:
+                break
+            if start <= self._position < start + len(content):
+                part = content[self._position - start:end - start]
+                parts.append(part)
+                self._position += len(part)
+        if self._position < end:
+            raise OSError(f"Bytes {self._position} to {end} of the file were not retrieved.")
+        return b"".join(parts)
+
+    def readall(self) -> bytes:
+        return self.read()
+
+def parquet_footer_length(tail: bytes) -> int:
+    """Get the length of the metadata of a Parquet file from its last bytes."""
+    if len(tail) < 12 or tail[-4:] != PARQUET_MAGIC:
+        raise ValueError("Not a Parquet file.")
+    return struct.unpack("<I", tail[-8:-4])[0]
+
+def parquet_layout(size: int, ranges: List[Tuple[int, bytes]], max_size: int) -> Tuple[List[str], Tuple[int, int]]:
+    """Find the columns of the first row group of a Parquet file fitting in a budget, from its footer.
+
+    Args:
+        size: size of the file
+        ranges: retrieved ranges of the file, including its footer
+        max_size: bytes of the column chunks which can be read
+    Returns:
+        The names of the columns, and the range of the file holding their chunks.
+    """
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_metadata(_RangesFile(size, ranges))
+    if metadata.num_row_groups == 0:
+        return [], (0, 0)
+    row_group = metadata.row_group(0)
+    # chunks of the leaf columns, by top-level column
+    chunks = {}
+    for index in range(row_group.num_columns):
+        column = row_group.column(index)
+        start = column.data_page_offset
+        if column.has_dictionary_page and column.dictionary_page_offset and column.dictionary_page_offset < start:
+            start = column.dictionary_page_offset
+        end = min(size, start + column.total_compressed_size + COLUMN_CHUNK_PADDING)
+        chunks.setdefault(column.path_in_schema.split('.')[0], []).append((start, end))
+
+    names = []
+    start, end = size, 0
+    for name in metadata.schema.to_arrow_schema().names:
+        ranges_start = min([start] + [chunk[0] for chunk in chunks.get(name, [])])
+        ranges_end = max([end] + [chunk[1] for chunk in chunks.get(name, [])])
+        # the chunks of the columns follow each other, the range grows with each column
+        if ranges_end - ranges_start > max_size:
+            break
+        names.append(name)
+        start, end = ranges_start, ranges_end
+    return names, (start, end) if names else (0, 0)
+
+def parquet_preview(size: int, ranges: List[Tuple[int, bytes]], columns: List[str], rows: int, output_format: str) -> Any:
+    """Preview a Parquet file from its footer and the chunks of the first row group.
+
+    Args:
+        size: size of the file
+        ranges: retrieved ranges of the file, including its footer and the chunks of the columns
+        columns: names of the previewed columns
+        rows: number of rows previewed
+        output_format: ``json`` or ``arrow``
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(_RangesFile(size, ranges))
+    schema = parquet_file.schema_arrow
+    if columns:
+        table = parquet_file.read_row_group(0, columns=columns)
+    else:
+        table = schema.empty_table().select(columns)
+    return _preview("parquet", schema, table.slice(0, rows), parquet_file.metadata.num_rows, output_format)
+
+def csv_preview(head: bytes, complete: bool, delimiter: str, rows: int, output_format: str) -> Any:
+    """Preview a CSV file from its head.
+
+    Args:
+        head: first bytes of the file
+        complete: whether the head is the whole file
+        delimiter: delimiter of the fields
+        rows: number of rows previewed
+        output_format: ``json`` or ``arrow``
+    """
+    import pyarrow.csv as csv
+
+    if not complete:
+        # the last line is partial
+        head = head[:head.rfind(b"\n") + 1]
+    table = csv.read_csv(io.BytesIO(head), parse_options=csv.ParseOptions(delimiter=delimiter))
+    num_rows = table.num_rows if complete else None
+    return _preview("csv", table.schema, table.slice(0, rows), num_rows, output_format)
+
+def ipc_preview(head: bytes, complete: bool, stream: bool, rows: int, output_format: str) -> Any:
+    """Preview an Arrow IPC file from its head.
+
+    The messages following the magic bytes of the IPC file format are those of the
+    IPC stream format, the head is read as a stream.
+
+    Args:
+        head: first bytes of the file
+        complete: whether the head is the whole file
+        stream: whether the file has the IPC stream format rather than the file format
+        rows: number of rows previewed
+        output_format: ``json`` or ``arrow``
+    """
+    import pyarrow as pa
+
+    if not stream:
+        if head[:len(ARROW_MAGIC)] != ARROW_MAGIC:
+            raise ValueError("Not an Arrow IPC file.")
+        # the magic bytes are padded to 8 bytes
+        head = head[8:]
+    reader = pa.ipc.open_stream(pa.BufferReader(head))
+    batches = []
+    read_rows = 0
+    exhausted = False
+    while read_rows < rows or complete:
+        try:
+            batch = reader.read_next_batch()
+        except StopIteration:
+            exhausted = True
+            break
+        except (pa.ArrowInvalid, OSError):
+            # the batch is partial
+            break
+        if read_rows < rows:
+            batches.append(batch)
+        read_rows += batch.num_rows
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    num_rows = read_rows if complete and exhausted else None
+    return _preview("arrow", reader.schema, table.slice(0, rows), num_rows, output_format)
+
+def _json_value(value: Any) -> Any:
+    """Convert a value of a column to JSON."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, dict):
+        return {key: _json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    return value
+
+def _preview(kind: str, schema, table, num_rows: Optional[int], output_format: str) -> Any:
+    """Encode a preview, as a JSON object or as an Arrow IPC stream."""
+    import pyarrow as pa
+
+    if output_format == "arrow":
+        metadata = dict(table.schema.metadata or {})
+        if num_rows is not None:
+            metadata[b"jupyter_drives.num_rows"] = str(num_rows).encode()
+        table = table.replace_schema_metadata(metadata)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    columns = [column.to_pylist() for column in table.columns]
+    return {
+        "format": kind,
+        "schema": [{"name": field.name, "type": str(field.type)} for field in schema],
+        "num_rows": num_rows,
+        "columns": table.column_names,
+        # rows as arrays, the names of the columns being listed once
+        "rows": [[_json_value(value) for value in row] for row in zip(*columns)],
+    }
@@ -0,0 +1,93 @@
+"""
+Local-filesystem and in-memory drive providers.
+
+Drives of the ``local`` provider are the sub-directories of a root directory, backed by
+``obstore.store.LocalStore``; drives of the ``memory`` provider live in the server process,
+backed by ``obstore.store.MemoryStore``. Both are exposed to the manager through
+``jupyter_drives.filesystems.ObstoreFileSystem``, an fsspec file system operating on the
+same stores as the ``obstore`` calls, so that both APIs see the same objects.
+"""
+import os
+import shutil
+from datetime import datetime, timezone
+
+class LocalDrives():
+    """
+    Drives of the ``local`` provider: each sub-directory of ``root`` is a drive.
+
+    Args:
+        root: directory containing the drives
+    """
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(os.path.expanduser(root))
+
+    def list_containers(self):
+        """List the drives, following the libcloud storage driver interface."""
+        from libcloud.storage.base import Container
+
+        containers = []
+        if not os.path.isdir(self.root):
+            return containers
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                creation_date = datetime.fromtimestamp(entry.stat().st_ctime, tz=timezone.utc)
+                containers.append(Container(
+                    name=entry.name,
+                    extra={"creation_date": creation_date.isoformat(timespec='milliseconds').replace('+00:00', 'Z')},
+                    driver=self,
+                ))
+        return containers
+
+    def create(self, drive_name: str):
+        """Create a drive."""
+        os.makedirs(os.path.join(self.root, drive_name))
+
+    def remove(self, drive_name: str):
+        """Remove a drive and its contents."""
+        shutil.rmtree(os.path.join(self.root, drive_name), ignore_errors=True)
+
+    def get_store(self, drive_name: str):
+        """Get the object store of a drive."""
+        import obstore as obs
+
+        location = os.path.join(self.root, drive_name)
+        if not os.path.isdir(location):
+            raise FileNotFoundError(f"Drive {drive_name} does not exist in {self.root}.")
+        return obs.store.LocalStore(location)
+
+class MemoryDrives():
+    """
+    Drives of the ``memory`` provider, kept in memory for the lifetime of the server.
+    """
+    def __init__(self) -> None:
+        self._stores = {}
+        self._creation_dates = {}
+
+    def list_containers(self):
+        """List the drives, following the libcloud storage driver interface."""
+        from libcloud.storage.base import Container
+
+        return [
+            Container(name=drive_name, extra={"creation_date": self._creation_dates[drive_name]}, driver=self)
+            for drive_name in self._stores
+        ]
+
+    def create(self, drive_name: str):
+        """Create a drive."""
+        import obstore as obs
+
+        if drive_name in self._stores:
+            raise FileExistsError(f"Drive {drive_name} already exists.")
+        self._stores[drive_name] = obs.store.MemoryStore()
+        self._creation_dates[drive_name] = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+    def remove(self, drive_name: str):
+        """Remove a drive and its contents."""
+        self._stores.pop(drive_name, None)
+        self._creation_dates.pop(drive_name, None)
+
+    def get_store(self, drive_name: str):
+        """Get the object store of a drive, creating the drive if needed."""
+        if drive_name not in self._stores:
+            self.create(drive_name)
+        return self._stores[drive_name]
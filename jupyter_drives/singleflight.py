@@ -0,0 +1,61 @@
+"""
+Single-flight coalescing of identical concurrent provider reads.
+
+While a call for a given key is in flight, identical calls wait for it and share
+its result (or its error) instead of calling the provider again.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+from .metrics import COALESCED_REQUESTS
+from .timing import span
+
+class SingleFlight():
+    """
+    Deduplicates concurrent calls sharing the same key.
+
+    The shared result is returned to every caller and must not be modified.
+    """
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable]):
+        """Call ``function`` unless a call with the same key is in flight.
+
+        Args:
+            key: key of the call, its first item is the operation name (e.g.
+                ``("contents", drive_name, path)``)
+            function: callable returning the awaitable to run
+        Returns:
+            The result of the call.
+        """
+        if key in self._calls:
+            COALESCED_REQUESTS.labels(key[0]).inc()
+            with span("coalesced"):
+                return await asyncio.shield(self._calls[key])
+
+        # run the call in its own task, so that a cancelled caller doesn't cancel
+        # the call shared with the other ones
+        task = asyncio.ensure_future(function())
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._forget_task(key, task))
+        return await asyncio.shield(task)
+
+    def _forget_task(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # mark the error as retrieved when every caller was cancelled
+            task.exception()
+
+    def forget(self, predicate: Callable[[Hashable], bool]):
+        """Stop sharing the calls in flight whose key matches ``predicate``.
+
+        Calls started afterwards reach the provider again, e.g. after a write
+        making the results of the calls in flight stale.
+        """
+        for key in [key for key in self._calls if predicate(key)]:
+            del self._calls[key]
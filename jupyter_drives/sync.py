@@ -0,0 +1,406 @@
+"""
+Incremental synchronization between a local directory and a drive prefix.
+
+Both trees are listed, then only the files that differ are transferred, concurrently.
+Files are compared by size first. Files of the same size are unchanged when they match
+the state recorded by the previous sync, or when the MD5 digest of the local file
+matches the entity tag of the object (single-part S3 uploads). Otherwise the
+modification times decide: the newer side wins, with a tolerance for the precision of
+the local file systems.
+
+Downloaded files get the modification time of their object, and the state of each
+transferred file is recorded, so that re-syncing an unchanged tree only costs its
+listing. The states are saved to disk after each sync, so that this holds after a
+restart of the server too.
+"""
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+# directions of the sync
+DIRECTIONS = ("both", "upload", "download")
+
+# files up to this size are transferred with a single call, which can be retried
+SMALL_FILE_SIZE = 8 * 1024 * 1024
+
+# size of the chunks of the streamed transfers
+CHUNK_SIZE = 5 * 1024 * 1024
+
+# objects deleted per provider call
+DELETE_BATCH_SIZE = 1000
+
+# difference of modification times below which a side is not considered newer
+MTIME_TOLERANCE = timedelta(seconds=1)
+
+# failed files reported per sync
+ERRORS_REPORTED = 100
+
+_MD5_ETAG = re.compile(r'"?([0-9a-f]{32})"?')
+
+class SyncJob():
+    """
+    Progress of a sync between a local directory and a drive prefix.
+
+    Args:
+        drive_name: name of the drive
+        path: prefix of the objects in the drive
+        local_path: local directory
+        direction: ``both``, ``upload`` (local to drive) or ``download`` (drive to local)
+        delete: whether to delete the files missing from the source
+    """
+    def __init__(self, drive_name: str, path: str, local_path: str, direction: str, delete: bool) -> None:
+        self.id = uuid.uuid4().hex
+        self.drive_name = drive_name
+        self.path = path
+        self.local_path = local_path
+        self.direction = direction
+        self.delete = delete
+        self.state = "running"
+        self.error: Optional[str] = None
+        self.started = datetime.now(timezone.utc)
+        self.finished: Optional[datetime] = None
+        self.listed = 0
+        self.pending = 0
+        self.uploaded = 0
+        self.downloaded = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.bytes_transferred = 0
+        self.failures = []
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    def fail(self, path: str, error: BaseException):
+        """Report a file which couldn't be synced."""
+        if len(self.failures) < ERRORS_REPORTED:
+            self.failures.append({"path": path, "error": str(error)})
+
+    def finish(self, state: str, error: Optional[str] = None):
+        self.state = state
+        self.error = error
+        self.finished = datetime.now(timezone.utc)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "drive": self.drive_name,
+            "path": self.path,
+            "local_path": self.local_path,
+            "direction": self.direction,
+            "delete": self.delete,
+            "state": self.state,
+            "error": self.error,
+            "started": self.started.isoformat(),
+            "finished": self.finished.isoformat() if self.finished else None,
+            "listed": self.listed,
+            "pending": self.pending,
+            "uploaded": self.uploaded,
+            "downloaded": self.downloaded,
+            "deleted": self.deleted,
+            "unchanged": self.unchanged,
+            "bytes_transferred": self.bytes_transferred,
+            "failures": self.failures,
+        }
+
+def _md5_file(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+def _mtime(stat: os.stat_result) -> datetime:
+    return datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+
+def _list_local(root: str) -> Dict[str, Tuple[int, datetime]]:
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # removed meanwhile
+                continue
+            key = os.path.relpath(path, root).replace(os.sep, '/')
+            files[key] = (stat.st_size, _mtime(stat))
+    return files
+
+class Synchronizer():
+    """
+    Runs a sync job.
+
+    Args:
+        job: the sync job, updated with its progress
+        local_root: absolute path of the local directory
+        store: obstore store of the drive
+        list_objects: callable returning an async iterator of the pages of objects under the prefix
+        provider_call: coroutine function calling the provider with retries, as
+            ``provider_call(operation, function)``
+        slot: async context manager factory held by the streamed transfers
+        state: state recorded by the previous syncs of the same trees, updated
+        concurrency: number of files transferred concurrently
+    """
+    def __init__(
+        self,
+        job: SyncJob,
+        local_root: str,
+        store,
+        list_objects: Callable,
+        provider_call: Callable[[str, Callable[[], Awaitable]], Awaitable],
+        slot: Callable,
+        state: Dict[str, Tuple[int, float, str]],
+        concurrency: int = 8,
+    ) -> None:
+        self._job = job
+        self._local_root = local_root
+        self._store = store
+        self._list_objects = list_objects
+        self._provider_call = provider_call
+        self._slot = slot
+        self._state = state
+        self._concurrency = concurrency
+        self._prefix = job.path + '/' if job.path else ''
+
+    def _local_file(self, key: str) -> str:
+        return os.path.join(self._local_root, *key.split('/'))
+
+    async def run(self):
+        """List both trees and transfer the differences."""
+        import obstore as obs
+
+        job = self._job
+        loop = asyncio.get_running_loop()
+        os.makedirs(self._local_root, exist_ok=True)
+        self._local_store = obs.store.LocalStore(self._local_root)
+
+        local = await loop.run_in_executor(None, _list_local, self._local_root)
+        remote = {}
+        async for objects in self._list_objects():
+            for object in objects:
+                remote[object["path"][len(self._prefix):]] = object
+        job.listed = len(set(local) | set(remote))
+
+        # the files present on both sides are compared concurrently, their digests computed in the executor
+        compared = {}
+        keys = iter(sorted(set(local) & set(remote)))
+
+        async def compare():
+            for key in keys:
+                compared[key] = await self._compare(key, local[key], remote[key])
+
+        await asyncio.gather(*(compare() for _ in range(self._concurrency)))
+
+        transfers = []
+        for key in sorted(set(local) | set(remote)):
+            if key in compared:
+                operation = compared[key]
+            elif key in local:
+                operation = "upload" if job.direction != "download" else ("delete_local" if job.delete else None)
+            else:
+                operation = "download" if job.direction != "upload" else ("delete_remote" if job.delete else None)
+            if operation is None:
+                job.unchanged += 1
+            else:
+                transfers.append((operation, key))
+        job.pending = len(transfers)
+
+        slots = asyncio.Semaphore(self._concurrency)
+
+        async def transfer(operation, key):
+            async with slots:
+                try:
+                    if operation == "upload":
+                        await self._upload(key, local[key])
+                        job.uploaded += 1
+                    elif operation == "download":
+                        await self._download(key, remote[key])
+                        job.downloaded += 1
+                except Exception as e:
+                    job.fail(key, e)
+                finally:
+                    job.pending -= 1
+
+        await asyncio.gather(*(
+            transfer(operation, key) for operation, key in transfers
+            if operation in ("upload", "download")
+        ))
+        await self._delete_remote([key for operation, key in transfers if operation == "delete_remote"])
+        await self._delete_local([key for operation, key in transfers if operation == "delete_local"])
+
+    async def _compare(self, key: str, local: Tuple[int, datetime], remote: dict) -> Optional[str]:
+        """Get the transfer syncing a file present on both sides, if any."""
+        job = self._job
+        size, mtime = local
+        etag = remote.get("e_tag") or ""
+        recorded = (size, mtime.timestamp(), etag)
+        if size == remote["size"]:
+            if self._state.get(key) == recorded:
+                return None
+            match = _MD5_ETAG.fullmatch(etag)
+            if match:
+                digest = await asyncio.get_running_loop().run_in_executor(None, _md5_file, self._local_file(key))
+                if digest == match.group(1):
+                    self._state[key] = recorded
+                    return None
+                # the contents differ, the newer one wins
+                return self._newer(mtime, remote["last_modified"], tolerance=timedelta(0))
+
+        if job.direction == "upload":
+            return "upload" if size != remote["size"] or mtime - remote["last_modified"] > MTIME_TOLERANCE else None
+        if job.direction == "download":
+            return "download" if size != remote["size"] or remote["last_modified"] - mtime > MTIME_TOLERANCE else None
+        tolerance = MTIME_TOLERANCE if size == remote["size"] else timedelta(0)
+        return self._newer(mtime, remote["last_modified"], tolerance)
+
+    def _newer(self, mtime: datetime, last_modified: datetime, tolerance: timedelta) -> Optional[str]:
+        direction = self._job.direction
+        if direction != "download" and mtime - last_modified >= tolerance:
+            return "upload"
+        if direction != "upload" and last_modified - mtime >= tolerance:
+            return "download"
+        return None
+
+    async def _upload(self, key: str, local: Tuple[int, datetime]):
+        import obstore as obs
+
+        size, mtime = local
+        remote_key = self._prefix + key
+        if size <= SMALL_FILE_SIZE:
+            content = await asyncio.get_running_loop().run_in_executor(None, _read_file, self._local_file(key))
+            result = await self._provider_call("put", lambda: obs.put_async(self._store, remote_key, content))
+        else:
+            # streamed, a stream can't be retried
+            async with self._slot():
+                source = await obs.get_async(self._local_store, key)
+                result = await obs.put_async(self._store, remote_key, source.stream(min_chunk_size=CHUNK_SIZE))
+        self._job.bytes_transferred += size
+        self._state[key] = (size, mtime.timestamp(), result.get("e_tag") or "")
+
+    async def _download(self, key: str, remote: dict):
+        import obstore as obs
+
+        remote_key = self._prefix + key
+        async with self._slot():
+            source = await obs.get_async(self._store, remote_key)
+            await obs.put_async(self._local_store, key, source.stream(min_chunk_size=CHUNK_SIZE))
+        # the local file gets the modification time of the object
+        local_file = self._local_file(key)
+        os.utime(local_file, (time.time(), remote["last_modified"].timestamp()))
+        self._job.bytes_transferred += remote["size"]
+        self._state[key] = (remote["size"], _mtime(os.stat(local_file)).timestamp(), remote.get("e_tag") or "")
+
+    async def _delete_remote(self, keys):
+        import obstore as obs
+
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            paths = [self._prefix + key for key in batch]
+            try:
+                await self._provider_call("delete", lambda: obs.delete_async(self._store, paths))
+                self._job.deleted += len(batch)
+            except Exception as e:
+                for key in batch:
+                    self._job.fail(key, e)
+            finally:
+                self._job.pending -= len(batch)
+            for key in batch:
+                self._state.pop(key, None)
+
+    async def _delete_local(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._local_file(key))
+                self._job.deleted += 1
+            except OSError as e:
+                self._job.fail(key, e)
+            finally:
+                self._job.pending -= 1
+            self._state.pop(key, None)
+
+def _state_file(directory: str, trees: Tuple[str, str, str]) -> str:
+    name = hashlib.sha256(json.dumps(trees).encode("utf-8")).hexdigest()
+    return os.path.join(directory, name + ".json")
+
+def _load_state(directory: str, trees: Tuple[str, str, str]) -> Dict[str, Tuple[int, float, str]]:
+    try:
+        with open(_state_file(directory, trees)) as file:
+            saved = json.load(file)
+    except (OSError, ValueError):
+        # never synced, or unreadable: the files of the same size are compared by digest
+        return {}
+    if tuple(saved.get("trees", ())) != trees:
+        return {}
+    return {key: tuple(recorded) for key, recorded in saved.get("files", {}).items()}
+
+def _save_state(directory: str, trees: Tuple[str, str, str], state: Dict[str, Tuple[int, float, str]]):
+    os.makedirs(directory, exist_ok=True)
+    path = _state_file(directory, trees)
+    with open(path + ".tmp", "w") as file:
+        json.dump({"trees": trees, "files": state}, file)
+    os.replace(path + ".tmp", path)
+
+class SyncJobs():
+    """
+    Sync jobs of the manager, running and recently finished.
+
+    Args:
+        kept: number of finished jobs kept
+        state_directory: directory the states recorded by the syncs are saved in, they
+            are only kept in memory by default
+    """
+    def __init__(self, kept: int = 100, state_directory: Optional[str] = None) -> None:
+        self._jobs: collections.OrderedDict[str, SyncJob] = collections.OrderedDict()
+        self._kept = kept
+        self._state_directory = state_directory
+        # state recorded by the syncs, per local directory, drive and prefix
+        self.states: Dict[Tuple[str, str, str], Dict[str, Tuple[int, float, str]]] = {}
+
+    async def load_state(self, local_path: str, drive_name: str, path: str) -> Dict[str, Tuple[int, float, str]]:
+        """Get the state recorded by the syncs of a local directory with a drive prefix, loading the saved one."""
+        trees = (local_path, drive_name, path)
+        if trees not in self.states:
+            state = {}
+            if self._state_directory is not None:
+                state = await asyncio.get_running_loop().run_in_executor(None, _load_state, self._state_directory, trees)
+            # loaded meanwhile by another sync of the same trees
+            self.states.setdefault(trees, state)
+        return self.states[trees]
+
+    async def save_state(self, local_path: str, drive_name: str, path: str):
+        """Save the state recorded by the syncs of a local directory with a drive prefix.
+
+        Raises:
+            OSError: the state could not be written
+        """
+        trees = (local_path, drive_name, path)
+        if self._state_directory is None or trees not in self.states:
+            return
+        state = dict(self.states[trees])
+        await asyncio.get_running_loop().run_in_executor(None, _save_state, self._state_directory, trees, state)
+
+    def __iter__(self):
+        return iter(list(self._jobs.values()))
+
+    def get(self, id: str) -> Optional[SyncJob]:
+        return self._jobs.get(id)
+
+    def add(self, job: SyncJob):
+        self._jobs[job.id] = job
+        finished = [id for id, job in self._jobs.items() if not job.running]
+        for id in finished[:max(0, len(finished) - self._kept)]:
+            del self._jobs[id]
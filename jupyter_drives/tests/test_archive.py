@@ -0,0 +1,115 @@
+import asyncio
+import io
+import zipfile
+from datetime import datetime, timezone
+
+import pytest
+
+from jupyter_drives.archive import stream_zip
+
+CONTENTS = {f"dir/file{i}.bin": bytes([i]) * 100000 * i for i in range(6)}
+
+
+async def entries():
+    paths = sorted(CONTENTS)
+    for page in [paths[:3], paths[3:]]:
+        yield [
+            {
+                "name": "dir/" + path[len("dir/"):],
+                "path": path,
+                "last_modified": datetime(2024, 1, 1, tzinfo=timezone.utc),
+                "size": len(CONTENTS[path]),
+            }
+            for path in page
+        ]
+
+
+async def read(path):
+    content = CONTENTS[path]
+    for start in range(0, len(content), 65536):
+        await asyncio.sleep(0)
+        yield content[start:start + 65536]
+
+
+async def test_stream_zip():
+    chunks = [chunk async for chunk in stream_zip(entries(), read, read_ahead=2)]
+    # the archive is streamed as the entries are written
+    assert len(chunks) > len(CONTENTS)
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == sorted(CONTENTS)
+    for path, content in CONTENTS.items():
+        assert archive.read(path) == content
+    assert archive.getinfo("dir/file1.bin").date_time == (2024, 1, 1, 0, 0, 0)
+
+
+async def test_stream_zip_read_error():
+    async def fail(path):
+        yield b"partial"
+        raise ConnectionError("connection reset")
+
+    with pytest.raises(ConnectionError):
+        async for _ in stream_zip(entries(), fail):
+            pass
+
+
+async def test_aborted_download_archive(monkeypatch):
+    obstore = pytest.importorskip("obstore")
+    from traitlets.config import Config
+    from jupyter_drives.manager import JupyterDrivesManager
+
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    config.DrivesConfig.initial_concurrency = 2
+    config.DrivesConfig.max_concurrency = 2
+    manager = JupyterDrivesManager(config)
+    await manager.new_drive("drive", "")
+    await manager.mount_drive("drive", "memory")
+
+    async def parts(content):
+        yield content
+
+    for i in range(4):
+        await manager.save_raw_file("drive", f"dir/file{i}.bin", parts(bytes([i]) * 3 * 1024 * 1024))
+
+    # bodies streamed in several chunks, as from a remote provider
+    get_async = obstore.get_async
+
+    class ChunkedResult():
+        def __init__(self, result):
+            self._result = result
+
+        async def _chunks(self):
+            content = bytes(await self._result.bytes_async())
+            for start in range(0, len(content), 65536):
+                await asyncio.sleep(0)
+                yield content[start:start + 65536]
+
+        def stream(self, min_chunk_size=None):
+            return self._chunks()
+
+    async def chunked_get(store, path, **kwargs):
+        return ChunkedResult(await get_async(store, path, **kwargs))
+
+    monkeypatch.setattr(obstore, "get_async", chunked_get)
+
+    async def abort():
+        _, archive = await manager.download_archive("drive", "dir")
+        await archive.__anext__()
+        await archive.aclose()
+
+    # the clients go away in the middle of the downloads
+    for _ in range(3):
+        await asyncio.wait_for(abort(), 10)
+        await asyncio.sleep(0.01)
+    assert manager._get_limiter("drive").in_flight == 0
+
+    async def download():
+        _, archive = await manager.download_archive("drive", "dir")
+        return b"".join([chunk async for chunk in archive])
+
+    # no slot was leaked by the aborted downloads
+    content = await asyncio.wait_for(download(), 30)
+    assert len(zipfile.ZipFile(io.BytesIO(content)).namelist()) == 4
+    await manager.close()
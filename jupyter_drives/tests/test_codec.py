@@ -0,0 +1,50 @@
+import base64
+import json
+import math
+import threading
+
+import pytest
+
+from jupyter_drives.codec import Codec, decode_base64, dumps, encode_json, loads
+
+
+NOTEBOOK = {
+    "cells": [{"cell_type": "code", "source": "print('héllo')", "outputs": [], "metadata": {"x": 1e-07}}],
+    "metadata": {"language_info": {"version": "3.11.4"}},
+    "nbformat": 4,
+    "nbformat_minor": 5,
+}
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+async def test_offloaded_transforms_store_identical_bytes(executor):
+    codec = Codec(executor, workers=1, threshold=0)
+    try:
+        assert await codec.run(encode_json, NOTEBOOK) == json.dumps(NOTEBOOK, indent=2).encode("utf-8")
+        data = bytes(range(256)) * 10
+        assert await codec.run(decode_base64, base64.b64encode(data).decode()) == data
+    finally:
+        codec.shutdown()
+
+
+def current_thread(content):
+    return threading.current_thread()
+
+
+async def test_offload_threshold():
+    codec = Codec("thread", workers=1, threshold=1024)
+    try:
+        assert await codec.run(current_thread, "content") is threading.main_thread()
+        assert await codec.run(current_thread, "x" * 1024) is not threading.main_thread()
+        # the size of JSON contents is estimated from the body they were parsed from
+        assert await codec.run(current_thread, NOTEBOOK, 512) is threading.main_thread()
+        assert await codec.run(current_thread, NOTEBOOK, 2048) is not threading.main_thread()
+        assert await codec.run(current_thread, NOTEBOOK) is not threading.main_thread()
+    finally:
+        codec.shutdown()
+
+
+def test_payloads():
+    # bodies accepted by json only are still parsed
+    assert math.isnan(loads(b'{"value": NaN}')["value"])
+    assert loads(dumps({"path": "é", "size": 2**70})) == {"path": "é", "size": 2**70}
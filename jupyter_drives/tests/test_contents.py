@@ -0,0 +1,367 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+import tornado
+from traitlets.config import Config
+
+pytest.importorskip("obstore")
+
+from jupyter_drives.manager import JupyterDrivesManager, _etag_matches
+
+DRIVE = "drive"
+
+
+@pytest_asyncio.fixture
+async def memory_manager():
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    manager = JupyterDrivesManager(config)
+    await manager.new_drive(DRIVE, "")
+    await manager.mount_drive(DRIVE, "memory")
+    yield manager
+    await manager.close()
+
+
+def test_etag_matches():
+    assert _etag_matches('"abc"', '"abc"')
+    assert _etag_matches('"abc"', 'W/"abc", "def"')
+    assert _etag_matches('"abc"', '*')
+    assert not _etag_matches('"abc"', '"def"')
+    assert not _etag_matches('"abc"', None)
+
+
+async def test_file_etag(memory_manager):
+    await memory_manager.save_file(DRIVE, "file.txt", "content", "text", "text", "file")
+
+    result = await memory_manager.get_contents(DRIVE, "file.txt")
+    assert result["data"]["content"] == "content"
+    etag = result["etag"]
+
+    # the content is not retrieved when the client already has it
+    result = await memory_manager.get_contents(DRIVE, "file.txt", etag)
+    assert result == {"data": None, "etag": etag}
+
+    await memory_manager.save_file(DRIVE, "file.txt", "new content", "text", "text", "file")
+    result = await memory_manager.get_contents(DRIVE, "file.txt", etag)
+    assert result["data"]["content"] == "new content"
+    assert result["etag"] != etag
+
+
+async def test_listing_etag(memory_manager):
+    await memory_manager.save_file(DRIVE, "dir/a.txt", "a", "text", "text", "file")
+    etag = (await memory_manager.get_contents(DRIVE, "dir"))["etag"]
+    assert (await memory_manager.get_contents(DRIVE, "dir"))["etag"] == etag
+
+    await memory_manager.save_file(DRIVE, "dir/b.txt", "b", "text", "text", "file")
+    assert (await memory_manager.get_contents(DRIVE, "dir"))["etag"] != etag
+
+
+async def test_stream_contents(memory_manager):
+    for name in ["a.txt", "b.txt", "c.txt"]:
+        await memory_manager.save_file(DRIVE, f"dir/{name}", name, "text", "text", "file")
+    memory_manager.set_listing_limit(2)
+
+    listing = await memory_manager.stream_contents(DRIVE, "dir")
+    entries = [entry async for entries in listing for entry in entries]
+    assert [entry["path"] for entry in entries] == ["dir/a.txt", "dir/b.txt"]
+
+    # files are not streamed
+    assert await memory_manager.stream_contents(DRIVE, "dir/a.txt") is None
+
+
+async def _parts(*parts):
+    for part in parts:
+        yield part
+
+
+async def test_save_raw_file(memory_manager):
+    content = bytes(range(256)) * 4
+
+    result = await memory_manager.save_raw_file(DRIVE, "image.png", _parts(content[:100], content[100:]))
+    assert result["data"]["size"] == len(content)
+
+    # chunked upload
+    await memory_manager.save_raw_file(DRIVE, "chunked.png", _parts(content[:100]), chunk=1)
+    await memory_manager.save_raw_file(DRIVE, "chunked.png", _parts(content[100:]), chunk=-1)
+
+    for path in ["image.png", "chunked.png"]:
+        stored = await memory_manager._get_file_system(DRIVE)._cat_file(f"{DRIVE}/{path}")
+        assert stored == content
+
+
+async def test_unchanged_save_is_skipped(memory_manager):
+    notebook = {"cells": [], "metadata": {}, "nbformat": 4, "nbformat_minor": 5}
+    await memory_manager.save_file(DRIVE, "notebook.ipynb", notebook, "json", "json", "notebook")
+    etag = (await memory_manager.get_contents(DRIVE, "notebook.ipynb"))["etag"]
+
+    result = await memory_manager.save_file(DRIVE, "notebook.ipynb", notebook, "json", "json", "notebook")
+    assert result["data"]["size"] > 0
+    assert (await memory_manager.get_contents(DRIVE, "notebook.ipynb"))["etag"] == etag
+
+    notebook["metadata"]["changed"] = True
+    await memory_manager.save_file(DRIVE, "notebook.ipynb", notebook, "json", "json", "notebook")
+    assert (await memory_manager.get_contents(DRIVE, "notebook.ipynb"))["etag"] != etag
+
+
+async def test_write_back_save():
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    config.DrivesConfig.write_back_delay = 60
+    manager = JupyterDrivesManager(config)
+    await manager.new_drive(DRIVE, "")
+    await manager.mount_drive(DRIVE, "memory")
+
+    for version in range(3):
+        result = await manager.save_file(DRIVE, "file.txt", f"version {version}", "text", "text", "file")
+        assert result["data"]["size"] == len(f"version {version}")
+    assert manager.pending_saves == 1
+
+    # reads upload the buffered save first
+    result = await manager.get_contents(DRIVE, "file.txt")
+    assert result["data"]["content"] == "version 2"
+    assert manager.pending_saves == 0
+
+    await manager.save_file(DRIVE, "other.txt", "content", "text", "text", "file")
+    await manager.close()
+    assert manager.pending_saves == 0
+    assert (await manager.get_contents(DRIVE, "other.txt"))["data"]["content"] == "content"
+
+
+async def test_write_back_save_failure(monkeypatch):
+    from jupyter_drives import writeback
+
+    monkeypatch.setattr(writeback, "RETRY_DELAY", 60)
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    config.DrivesConfig.write_back_delay = 0.01
+    manager = JupyterDrivesManager(config)
+    await manager.new_drive(DRIVE, "")
+    await manager.mount_drive(DRIVE, "memory")
+
+    upload_content = manager._upload_content
+    errors = [ConnectionError("connection reset")]
+
+    async def upload(drive_name, path, content):
+        if errors:
+            raise errors.pop()
+        await upload_content(drive_name, path, content)
+
+    monkeypatch.setattr(manager, "_upload_content", upload)
+    result = await manager.save_file(DRIVE, "file.txt", "version 0", "text", "text", "file")
+    assert datetime.fromisoformat(result["data"]["last_modified"]).tzinfo is not None
+    await asyncio.sleep(0.1)
+
+    # the save following a failed upload reports whether it still fails
+    errors.append(ConnectionError("connection reset"))
+    with pytest.raises(tornado.web.HTTPError):
+        await manager.save_file(DRIVE, "file.txt", "version 1", "text", "text", "file")
+    await manager.save_file(DRIVE, "file.txt", "version 2", "text", "text", "file")
+    assert manager.pending_saves == 0
+    assert (await manager.get_contents(DRIVE, "file.txt"))["data"]["content"] == "version 2"
+    await manager.close()
+
+
+@pytest.mark.parametrize("shards", [1, 2])
+async def test_delete_large_directory(shards):
+    import obstore as obs
+
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    config.DrivesConfig.initial_concurrency = 1
+    config.DrivesConfig.max_concurrency = 1
+    config.DrivesConfig.listing_shards = shards
+    manager = JupyterDrivesManager(config)
+    await manager.new_drive(DRIVE, "")
+    await manager.mount_drive(DRIVE, "memory")
+    store = manager._content_managers[DRIVE]["store"]
+    await asyncio.gather(*(obs.put_async(store, f"dir/file_{i:05d}", b"") for i in range(20000)))
+
+    # the listing doesn't hold a slot the deletes of its pages wait for
+    await asyncio.wait_for(manager.delete_file(DRIVE, "dir"), 30)
+    assert await obs.list(store, "dir").collect_async() == []
+    await manager.close()
+
+
+async def test_copied_checkpoints(memory_manager):
+    await memory_manager.save_file(DRIVE, "dir/file.txt", "saved", "text", "text", "file")
+    assert (await memory_manager.list_checkpoints(DRIVE, "dir/file.txt"))["data"] == []
+
+    # drives without object versioning copy the file next to it
+    checkpoint = (await memory_manager.create_checkpoint(DRIVE, "dir/file.txt"))["data"]
+    assert checkpoint["id"] == "checkpoint"
+    assert (await memory_manager.list_checkpoints(DRIVE, "dir/file.txt"))["data"] == [checkpoint]
+    await memory_manager.check_file(DRIVE, "dir/.ipynb_checkpoints/file-checkpoint.txt")
+
+    await memory_manager.save_file(DRIVE, "dir/file.txt", "changed", "text", "text", "file")
+    result = await memory_manager.get_checkpoint(DRIVE, "dir/file.txt", "checkpoint")
+    assert result["data"]["content"] == "saved"
+
+    await memory_manager.restore_checkpoint(DRIVE, "dir/file.txt", "checkpoint")
+    assert (await memory_manager.get_contents(DRIVE, "dir/file.txt"))["data"]["content"] == "saved"
+
+    await memory_manager.delete_checkpoint(DRIVE, "dir/file.txt", "checkpoint")
+    assert (await memory_manager.list_checkpoints(DRIVE, "dir/file.txt"))["data"] == []
+
+
+async def test_gcs_checkpoints_are_copied(memory_manager, monkeypatch):
+    # the generations of versioned GCS buckets aren't used, nor is the S3 client
+    memory_manager._content_managers[DRIVE]["provider"] = "gcs"
+    monkeypatch.setattr(memory_manager, "_s3_client", None)
+    await memory_manager.save_file(DRIVE, "file.txt", "saved", "text", "text", "file")
+
+    assert not await memory_manager._is_versioned(DRIVE)
+    checkpoint = (await memory_manager.create_checkpoint(DRIVE, "file.txt"))["data"]
+    assert checkpoint["id"] == "checkpoint"
+    await memory_manager.check_file(DRIVE, ".ipynb_checkpoints/file-checkpoint.txt")
+
+
+
+async def test_read_file_ranges(memory_manager):
+    content = bytes(range(256)) * 8192
+    await memory_manager.save_raw_file(DRIVE, "data/table.bin", _parts(content))
+
+    async def read(start=None, end=None):
+        info, offsets, chunks = await memory_manager.read_file(DRIVE, "data/table.bin", start, end)
+        assert info["size"] == len(content)
+        return offsets, b"".join([chunk async for chunk in chunks])
+
+    assert await read() == ((0, len(content)), content)
+    assert await read(10, 20) == ((10, 20), content[10:20])
+    # the last bytes, e.g. a Parquet footer
+    assert await read(-8) == ((len(content) - 8, len(content)), content[-8:])
+    # streamed
+    assert await read(1, None) == ((1, len(content)), content[1:])
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await read(len(content), None)
+    assert error.value.status_code == 416
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await memory_manager.read_file(DRIVE, "data/missing.bin")
+    assert error.value.status_code == 404
+
+
+async def test_read_file_client_disconnect(monkeypatch):
+    import obstore
+
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    config.DrivesConfig.initial_concurrency = 1
+    config.DrivesConfig.max_concurrency = 1
+    manager = JupyterDrivesManager(config)
+    await manager.new_drive(DRIVE, "")
+    await manager.mount_drive(DRIVE, "memory")
+    content = bytes(range(256)) * 16384
+    await manager.save_raw_file(DRIVE, "data.bin", _parts(content))
+
+    # a body streamed in several chunks, as from a remote provider
+    get_async = obstore.get_async
+
+    class ChunkedResult():
+        def __init__(self, result):
+            self._result = result
+
+        async def _chunks(self):
+            body = bytes(await self._result.bytes_async())
+            for start in range(0, len(body), 65536):
+                yield body[start:start + 65536]
+
+        def stream(self, min_chunk_size=None):
+            return self._chunks()
+
+    async def chunked_get(store, path, **kwargs):
+        return ChunkedResult(await get_async(store, path, **kwargs))
+
+    monkeypatch.setattr(obstore, "get_async", chunked_get)
+
+    async def disconnect():
+        _, _, chunks = await manager.read_file(DRIVE, "data.bin", 1, None)
+        await chunks.__anext__()
+        # as the files handler does when the client goes away
+        await chunks.aclose()
+
+    for _ in range(3):
+        await asyncio.wait_for(disconnect(), 10)
+    assert manager._get_limiter(DRIVE).in_flight == 0
+    await manager.close()
+
+
+async def test_read_file_ranges_skip_http_cache(memory_manager, tmp_path):
+    from jupyter_drives.httpcache import HTTPCache
+
+    content = bytes(range(256)) * 4096
+    await memory_manager.save_raw_file(DRIVE, "data/table.bin", _parts(content))
+    # as an HTTP drive with its cache enabled
+    cache = HTTPCache(str(tmp_path), 16 * 1024 * 1024)
+    memory_manager._get_http_cache = lambda drive_name: cache
+    fetched = []
+    fetch = memory_manager._fetch_http_file
+
+    async def record(drive_name, path, validators):
+        fetched.append(path)
+        return await fetch(drive_name, path, validators)
+
+    memory_manager._fetch_http_file = record
+
+    _, _, chunks = await memory_manager.read_file(DRIVE, "data/table.bin", -8)
+    assert b"".join([chunk async for chunk in chunks]) == content[-8:]
+    # the range was read without retrieving the whole file
+    assert fetched == []
+    assert ["drive", "data/table.bin"] not in cache
+
+    _, _, chunks = await memory_manager.read_file(DRIVE, "data/table.bin")
+    assert b"".join([chunk async for chunk in chunks]) == content
+    assert fetched == ["data/table.bin"]
+
+
+async def test_list_directory(memory_manager):
+    await memory_manager.save_file(DRIVE, "dir/a.txt", "a", "text", "text", "file")
+    await memory_manager.save_file(DRIVE, "dir/sub/b.txt", "b", "text", "text", "file")
+    await memory_manager.new_file(DRIVE, "dir/empty", "directory")
+
+    entries = (await memory_manager.list_directory(DRIVE, "dir"))["data"]
+    assert sorted((entry["path"], entry["type"]) for entry in entries) == [
+        ("dir/a.txt", "file"),
+        ("dir/empty", "directory"),
+        ("dir/sub", "directory"),
+    ]
+    assert (await memory_manager.list_directory(DRIVE, "dir/empty"))["data"] == []
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await memory_manager.list_directory(DRIVE, "dir/a.txt")
+    assert error.value.status_code == 404
+
+async def test_provider_pagination():
+    httpx = pytest.importorskip("httpx")
+
+    pages = 50
+    requested = []
+
+    def respond(request):
+        page = int(request.url.params.get("page", 0))
+        requested.append(page)
+        headers = {}
+        if page + 1 < pages:
+            headers["Link"] = f'<https://api.example.com/items?page={page + 1}>; rel="next"'
+        return httpx.Response(200, json=[{"page": page, "item": i} for i in range(3)], headers=headers)
+
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    config.DrivesConfig.api_base_url = "https://api.example.com/"
+    config.DrivesConfig.session_token = "token"
+    config.DrivesConfig.access_key_id = "id"
+    config.DrivesConfig.secret_access_key = "secret"
+    manager = JupyterDrivesManager(config)
+    manager._http_client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+
+    items = manager._iter_provider("items")
+    first = await items.__anext__()
+    assert first == {"page": 0, "item": 0}
+    await asyncio.sleep(0.05)
+    await items.aclose()
+    # the next page was requested while the first one was consumed
+    assert requested == [0, 1]
+
+    items = await manager._call_provider("items")
+    assert len(items) == 3 * pages
+    assert items[-1] == {"page": pages - 1, "item": 2}
+    await manager.close()
@@ -1,3 +1,5 @@
+import pytest
+
 from .. import (
     _jupyter_labextension_paths,
     _jupyter_server_extension_points,
@@ -5,6 +7,14 @@ from .. import (
 )
 
 
+@pytest.fixture
+def jp_server_config(jp_server_config):
+    return {
+        "ServerApp": {"jpserver_extensions": {"jupyter_drives": True}},
+        "DrivesConfig": {"provider": "memory", "write_back_delay": 60},
+    }
+
+
 def test_labextension():
     assert len(_jupyter_labextension_paths()) == 1
 
@@ -15,3 +25,35 @@ def test_server_extension():
 
 def test_load_extension(jp_serverapp):
     _load_jupyter_server_extension(jp_serverapp)
+
+
+async def test_shutdown_uploads_buffered_saves(jp_serverapp):
+    obstore = pytest.importorskip("obstore")
+    manager = jp_serverapp.extension_manager.extension_points["jupyter_drives"].app.manager
+    await manager.new_drive("drive", "")
+    await manager.mount_drive("drive", "memory")
+    await manager.save_file("drive", "file.txt", "content", "text", "text", "file")
+    assert manager.pending_saves == 1
+
+    # on the event loop of the server
+    await jp_serverapp.cleanup_extensions()
+    assert manager.pending_saves == 0
+    store = manager._content_managers["drive"]["store"]
+    assert bytes(await (await obstore.get_async(store, "file.txt")).bytes_async()) == b"content"
+
+
+def test_kernels_environment(jp_serverapp):
+    import os
+
+    kernel_manager = jp_serverapp.kernel_manager
+    if kernel_manager.default_kernel_name not in jp_serverapp.kernel_spec_manager.find_kernel_specs():
+        pytest.skip("No kernel spec installed.")
+    manager = kernel_manager.kernel_manager_factory(
+        parent=kernel_manager,
+        kernel_name=kernel_manager.default_kernel_name,
+        kernel_spec_manager=jp_serverapp.kernel_spec_manager,
+    )
+    assert manager.kernel_spec.env["JUPYTER_DRIVES_URL"] == jp_serverapp.connection_url
+    # only the kernels get the URL and token of the server, not e.g. the terminals
+    assert "JUPYTER_DRIVES_URL" not in os.environ
+    assert "JUPYTER_DRIVES_TOKEN" not in os.environ
@@ -0,0 +1,54 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from jupyter_drives.extract import ArchiveError, extract_archive
+
+FILES = {f"data/file{i}.txt": f"content {i}\n".encode() * 1000 * i for i in range(10)}
+
+
+async def received(archive, part_size=8192):
+    for start in range(0, len(archive), part_size):
+        yield archive[start:start + part_size]
+
+
+async def extract(archive, archive_format):
+    written = {}
+
+    async def put(name, content):
+        if not isinstance(content, bytes):
+            content = b"".join([chunk async for chunk in content])
+        written[name] = content
+
+    count = await extract_archive(received(archive), archive_format, put, concurrency=4)
+    assert count == len(written)
+    return written
+
+
+async def test_extract_zip():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("data/", b"")
+        for name, content in FILES.items():
+            zip_file.writestr(name, content)
+    assert await extract(archive.getvalue(), "zip") == FILES
+
+
+async def test_extract_compressed_tar():
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar_file:
+        for name, content in FILES.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar_file.addfile(info, io.BytesIO(content))
+    assert await extract(archive.getvalue(), "tar") == FILES
+
+
+async def test_extract_outside_directory():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("../file.txt", b"content")
+    with pytest.raises(ArchiveError):
+        await extract(archive.getvalue(), "zip")
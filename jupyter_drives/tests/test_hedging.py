@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from jupyter_drives.hedging import MIN_SAMPLES, Hedger
+
+
+async def warm_up(hedger, latency=0.001):
+    async def call():
+        await asyncio.sleep(latency)
+        return "fast"
+
+    for _ in range(MIN_SAMPLES):
+        await hedger.call("head", call)
+
+
+async def test_hedger_takes_first_response():
+    hedger = Hedger("drive", percentile=95, budget=1)
+    await warm_up(hedger)
+
+    calls = []
+    cancelled = []
+
+    async def call():
+        calls.append(None)
+        if len(calls) == 1:
+            try:
+                # outlier
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(None)
+                raise
+        return "hedged"
+
+    assert await asyncio.wait_for(hedger.call("head", call), 1) == "hedged"
+    assert len(calls) == 2
+    assert len(cancelled) == 1
+
+
+async def test_hedger_budget():
+    hedger = Hedger("drive", percentile=95, budget=0.01)
+    await warm_up(hedger)
+
+    calls = []
+
+    async def call():
+        calls.append(None)
+        await asyncio.sleep(0.05)
+        return "slow"
+
+    # the warm-up didn't earn a whole hedge
+    assert await hedger.call("head", call) == "slow"
+    assert len(calls) == 1
+
+
+async def test_hedger_without_latencies():
+    hedger = Hedger("drive")
+
+    async def fail():
+        raise FileNotFoundError("drive/missing.txt")
+
+    with pytest.raises(FileNotFoundError):
+        await hedger.call("head", fail)
+    assert hedger.delay("head") is None
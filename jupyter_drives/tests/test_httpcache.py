@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timezone
+
+from jupyter_drives.httpcache import HTTPCache, parse_cache_control
+
+LAST_MODIFIED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class Origin():
+    def __init__(self, content=b"content", cache_control="max-age=60", etag='"1"'):
+        self.content = content
+        self.cache_control = cache_control
+        self.etag = etag
+        self.delay = 0
+        self.requests = []
+
+    async def fetch(self, validators):
+        self.requests.append(validators)
+        await asyncio.sleep(self.delay)
+        if validators.get("if_none_match") == self.etag:
+            return None
+        metadata = {"e_tag": self.etag, "last_modified": LAST_MODIFIED, "size": len(self.content)}
+        return metadata, {"Cache-Control": self.cache_control}, self.content
+
+
+def test_parse_cache_control():
+    assert parse_cache_control('public, max-age=60, stale-if-error="30"') == {
+        "public": "",
+        "max-age": "60",
+        "stale-if-error": "30",
+    }
+
+
+async def test_http_cache_serves_fresh_files(tmp_path):
+    cache = HTTPCache(str(tmp_path), 1024)
+    origin = Origin()
+
+    for _ in range(3):
+        metadata, content = await cache.get(["drive", "file.txt"], origin.fetch)
+        assert content == b"content"
+        assert metadata["e_tag"] == '"1"'
+    assert len(origin.requests) == 1
+
+    # kept across restarts
+    cache = HTTPCache(str(tmp_path), 1024)
+    assert (await cache.get(["drive", "file.txt"], origin.fetch))[1] == b"content"
+    assert len(origin.requests) == 1
+
+
+async def test_http_cache_revalidates_stale_files(tmp_path):
+    cache = HTTPCache(str(tmp_path), 1024, stale_timeout=0.05)
+    origin = Origin(cache_control="no-cache")
+
+    await cache.get(["drive", "file.txt"], origin.fetch)
+    assert (await cache.get(["drive", "file.txt"], origin.fetch))[1] == b"content"
+    assert origin.requests[-1] == {"if_none_match": '"1"'}
+
+    # the stale file is served while the slow origin revalidates it
+    origin.content, origin.etag, origin.delay = b"changed", '"2"', 0.2
+    assert (await cache.get(["drive", "file.txt"], origin.fetch))[1] == b"content"
+    await asyncio.sleep(0.3)
+    origin.delay = 0
+    assert (await cache.get(["drive", "file.txt"], origin.fetch))[1] == b"changed"
+
+
+async def test_http_cache_evicts_least_recently_used_files(tmp_path):
+    cache = HTTPCache(str(tmp_path), 20)
+    origin = Origin(content=b"0123456789")
+
+    await cache.get(["drive", "a"], origin.fetch)
+    await cache.get(["drive", "b"], origin.fetch)
+    await cache.get(["drive", "a"], origin.fetch)
+    await cache.get(["drive", "c"], origin.fetch)
+    assert ["drive", "a"] in cache
+    assert ["drive", "b"] not in cache
+    assert cache.size == 20
@@ -0,0 +1,53 @@
+import json
+import subprocess
+import sys
+
+# provider SDKs that must only be imported when the matching provider is used
+HEAVY_MODULES = [
+    "aiobotocore",
+    "boto3",
+    "botocore",
+    "entrypoints",
+    "fsspec",
+    "httpx",
+    "libcloud",
+    "obstore",
+    "pyarrow",
+    "s3fs",
+]
+
+# import time budget of the manager module, on top of jupyter_server
+IMPORT_BUDGET = 0.5
+
+
+def _run(code):
+    script = (
+        "import sys, json\n"
+        + code
+        + f"\nprint(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+    )
+    output = subprocess.check_output([sys.executable, "-c", script], text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_manager_is_lazy():
+    assert _run("import jupyter_drives.handlers") == []
+
+
+def test_gcs_manager_does_not_import_s3_dependencies():
+    loaded = _run(
+        "from traitlets.config import Config\n"
+        "from jupyter_drives.manager import JupyterDrivesManager\n"
+        "config = Config()\n"
+        "config.DrivesConfig.provider = 'gcs'\n"
+        "JupyterDrivesManager(config)"
+    )
+    assert not {"aiobotocore", "boto3", "s3fs", "obstore", "pyarrow"} & set(loaded)
+
+
+def test_import_time_budget():
+    # jupyter_server is already loaded when the extension is imported by the server
+    baseline = "import jupyter_server.base.handlers"
+    timer = "import time; start = time.perf_counter(); import jupyter_drives.handlers; print(time.perf_counter() - start)"
+    output = subprocess.check_output([sys.executable, "-c", f"{baseline}\n{timer}"], text=True)
+    assert float(output.strip().splitlines()[-1]) < IMPORT_BUDGET
@@ -0,0 +1,84 @@
+import re
+
+import pytest
+
+pytest.importorskip("fsspec")
+httpx = pytest.importorskip("httpx")
+
+from jupyter_drives.kernelfs import DrivesFileSystem
+
+
+def _server(files, requests):
+    """Mock of the files endpoints of the server extension, serving byte ranges."""
+
+    async def respond(request):
+        requests.append(request)
+        key = request.url.path.split("/", 4)[-1]
+        if request.method == "PUT":
+            files[key] = await request.aread()
+            return httpx.Response(200, json={"data": {"path": key}})
+        if key not in files:
+            return httpx.Response(404, json={"error": "File does not exist within drive."})
+        content = files[key]
+        headers = {"Content-Length": str(len(content)), "Last-Modified": "Mon, 19 Oct 2026 10:00:00 GMT", "ETag": '"1"'}
+        if request.method == "HEAD":
+            return httpx.Response(200, headers=headers)
+        match = re.match(r"bytes=(\d*)-(\d*)", request.headers.get("Range", ""))
+        if match is None:
+            return httpx.Response(200, content=content)
+        first, last = match.groups()
+        start = len(content) - int(last) if first == "" else int(first)
+        end = len(content) if first == "" or last == "" else int(last) + 1
+        if start >= len(content):
+            return httpx.Response(416, json={"error": "Range is not satisfiable."})
+        return httpx.Response(206, content=content[start:end])
+
+    return respond
+
+
+def _file_system(files, requests):
+    fs = DrivesFileSystem(url="http://localhost:8888/", token="secret", skip_instance_cache=True)
+    headers = fs._get_client().headers
+    assert headers["Authorization"] == "token secret"
+    fs._client = httpx.AsyncClient(transport=httpx.MockTransport(_server(files, requests)), headers=headers)
+    return fs
+
+
+def test_range_reads():
+    files = {"data/table.bin": bytes(range(256)) * 100}
+    requests = []
+    fs = _file_system(files, requests)
+
+    assert fs.info("drives://bucket/data/table.bin")["size"] == 25600
+    assert fs.cat_file("bucket/data/table.bin", start=10, end=20) == bytes(range(10, 20))
+    assert requests[-1].headers["Range"] == "bytes=10-19"
+    # a footer, as read by Parquet readers
+    assert fs.cat_file("bucket/data/table.bin", start=-8) == bytes(range(248, 256))
+    assert requests[-1].headers["Range"] == "bytes=-8"
+    assert fs.cat_file("bucket/data/table.bin", start=30000) == b""
+
+    requests.clear()
+    with fs.open("bucket/data/table.bin", block_size=1024) as file:
+        file.seek(5000)
+        assert file.read(4) == files["data/table.bin"][5000:5004]
+    # the metadata, then only the block read
+    assert [request.method for request in requests] == ["HEAD", "GET"]
+
+    with pytest.raises(FileNotFoundError):
+        fs.cat_file("bucket/missing.bin")
+
+
+def test_streamed_write():
+    files = {}
+    requests = []
+    fs = _file_system(files, requests)
+
+    with fs.open("bucket/out.bin", "wb", block_size=5 * 1024 * 1024) as file:
+        for i in range(3):
+            file.write(bytes([i]) * 4 * 1024 * 1024)
+    assert files["out.bin"] == b"".join(bytes([i]) * 4 * 1024 * 1024 for i in range(3))
+    # a single request, whose body was streamed
+    puts = [request for request in requests if request.method == "PUT"]
+    assert len(puts) == 1
+    assert "Content-Length" not in puts[0].headers
+    assert puts[0].url.path == "/jupyter-drives/drives/bucket/out.bin"
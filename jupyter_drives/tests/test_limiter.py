@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from jupyter_drives.limiter import (
+    AdaptiveLimiter,
+    ProviderThrottledError,
+    is_throttling_error,
+    is_transient_error,
+)
+
+
+class SlowDownError(Exception):
+    def __init__(self):
+        super().__init__("An error occurred (SlowDown) when calling the PutObject operation")
+        self.response = {
+            "Error": {"Code": "SlowDown"},
+            "ResponseMetadata": {"HTTPStatusCode": 503},
+        }
+
+
+def test_error_classification():
+    assert is_throttling_error(SlowDownError())
+    try:
+        try:
+            raise SlowDownError()
+        except SlowDownError as e:
+            raise OSError("Failed to put object") from e
+    except OSError as e:
+        assert is_throttling_error(e)
+    assert is_transient_error(ConnectionResetError())
+    assert not is_transient_error(FileNotFoundError("drive/missing.txt"))
+
+
+def test_error_classification_ignores_messages():
+    httpx = pytest.importorskip("httpx")
+
+    # object paths looking like statuses
+    missing = FileNotFoundError("drive/data/503.json")
+    assert not is_throttling_error(missing)
+    assert not is_transient_error(missing)
+    assert not is_transient_error(OSError("Generic error: drive/run-500/x.txt timed out"))
+
+    request = httpx.Request("GET", "https://example.com/data/404.json")
+    error = httpx.HTTPStatusError("Too many requests", request=request, response=httpx.Response(429, request=request))
+    assert is_throttling_error(error)
+    error = httpx.HTTPStatusError("Not found", request=request, response=httpx.Response(404, request=request))
+    assert not is_transient_error(error)
+    assert is_transient_error(httpx.ConnectTimeout("timed out", request=request))
+
+
+async def test_limiter_aimd():
+    limiter = AdaptiveLimiter("drive", initial=8, minimum=1, maximum=10, backoff=0)
+
+    limiter.on_throttle()
+    assert int(limiter.limit) == 4
+    for _ in range(20):
+        limiter.on_success()
+    assert 4 < limiter.limit <= 10
+
+
+async def test_limiter_bounds_concurrency():
+    limiter = AdaptiveLimiter("drive", initial=2, maximum=2)
+    in_flight = []
+
+    async def call():
+        in_flight.append(limiter.in_flight)
+        await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(limiter.call(call) for _ in range(6)))
+    assert max(in_flight) <= 2
+    assert limiter.in_flight == 0
+    assert limiter.queue_depth == 0
+
+
+async def test_limiter_retries_throttled_calls():
+    limiter = AdaptiveLimiter("drive", max_retries=3, backoff=0.001)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise SlowDownError()
+        return "done"
+
+    assert await limiter.call(flaky) == "done"
+    assert len(attempts) == 3
+
+    async def throttled():
+        raise SlowDownError()
+
+    with pytest.raises(ProviderThrottledError):
+        await limiter.call(throttled)
+
+
+async def test_slot_released_when_generator_closed():
+    limiter = AdaptiveLimiter("drive", initial=2, maximum=2)
+
+    async def stream():
+        async with limiter.slot():
+            yield b"first"
+            yield b"second"
+
+    # e.g. downloads aborted by their clients
+    for _ in range(2):
+        chunks = stream()
+        assert await chunks.__anext__() == b"first"
+        await chunks.aclose()
+    assert limiter.in_flight == 0
+
+    async def call():
+        return "done"
+
+    assert await asyncio.wait_for(limiter.call(call), 1) == "done"
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+from jupyter_drives.listing import list_sharded, split_key_space
+
+
+def test_split_key_space():
+    # keys sampled at the starts of the ten thousands, and following the first key
+    keys = ["data/0000000999"] + [f"data/{i:010d}" for i in range(10000, 300000, 10000)]
+    boundaries = split_key_space(keys, 8)
+
+    assert len(boundaries) == 7
+    assert boundaries == sorted(boundaries)
+    # boundaries are sampled keys, about evenly spread
+    assert set(boundaries) <= set(keys[1:])
+    assert boundaries[0] in ("data/0000030000", "data/0000040000")
+    assert boundaries[-1] in ("data/0000260000", "data/0000270000")
+
+
+async def test_list_sharded():
+    obs = pytest.importorskip("obstore")
+
+    store = obs.store.MemoryStore()
+    keys = [f"dir/file_{i:05d}" for i in range(2500)] + ["dir/A", "dir/sub/file", "dirx/file", "other"]
+    for key in keys:
+        await obs.put_async(store, key, b"")
+
+    listed = [object["path"] async for objects in list_sharded(store, "dir", shards=4, chunk_size=100) for object in objects]
+    assert listed == sorted(key for key in keys if key.startswith("dir/"))
+
+
+async def test_list_sharded_speedup(monkeypatch):
+    obs = pytest.importorskip("obstore")
+
+    store = obs.store.MemoryStore()
+    keys = [f"data/{i:010d}" for i in range(5000)]
+    for key in keys:
+        await obs.put_async(store, key, b"")
+
+    list_objects = obs.list
+
+    def slow_list(*args, **kwargs):
+        async def pages():
+            async for page in list_objects(*args, **kwargs):
+                # latency of a page request
+                await asyncio.sleep(0.05)
+                yield page
+        return pages()
+
+    monkeypatch.setattr(obs, "list", slow_list)
+
+    async def list_all(shards):
+        started = time.monotonic()
+        listed = [object["path"] async for objects in list_sharded(store, "data", shards=shards, chunk_size=50) for object in objects]
+        return listed, time.monotonic() - started
+
+    sequential, sequential_time = await list_all(1)
+    sharded, sharded_time = await list_all(8)
+    assert sequential == sharded == keys
+    assert sharded_time < sequential_time / 2
@@ -0,0 +1,57 @@
+import asyncio
+
+from jupyter_drives.prefetch import Prefetcher
+
+ENTRIES = [
+    {"path": "dir/notebook.ipynb", "size": 100, "last_modified": "2024-01-01T00:00:00"},
+    {"path": "dir/notes.md", "size": 100, "last_modified": "2024-01-02T00:00:00"},
+    {"path": "dir/data.parquet", "size": 100, "last_modified": "2024-01-02T00:00:00"},
+    {"path": "dir/large.txt", "size": 10 ** 9, "last_modified": "2024-01-02T00:00:00"},
+    {"path": "dir/sub/nested.py", "size": 100, "last_modified": "2024-01-02T00:00:00"},
+]
+
+
+async def test_prefetch_after_listing():
+    fetched = []
+
+    async def fetch(drive_name, path):
+        fetched.append(path)
+        if path == "":
+            return {"data": [{"path": "dir", "size": 0, "last_modified": ""}], "etag": '"root"'}
+        return {"data": {"path": path}, "etag": f'"{path}"'}
+
+    prefetcher = Prefetcher(fetch, max_size=1000)
+    prefetcher.warm_up("drive")
+    await asyncio.sleep(0.01)
+    assert prefetcher.take("drive", "")["etag"] == '"root"'
+
+    prefetcher.after_listing("drive", "dir", ENTRIES)
+    await asyncio.sleep(0.01)
+    assert fetched == ["", "dir/notebook.ipynb", "dir/notes.md"]
+    assert prefetcher.take("drive", "dir/notes.md") == {"data": {"path": "dir/notes.md"}, "etag": '"dir/notes.md"'}
+    # served once
+    assert prefetcher.take("drive", "dir/notes.md") is None
+
+    prefetcher.forget("drive")
+    assert prefetcher.take("drive", "dir/notebook.ipynb") is None
+
+
+async def test_prefetch_cancelled_by_navigation():
+    started = []
+    cancelled = []
+
+    async def fetch(drive_name, path):
+        started.append(path)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(path)
+            raise
+
+    prefetcher = Prefetcher(fetch, max_size=1000, concurrency=1)
+    prefetcher.after_listing("drive", "dir", ENTRIES)
+    await asyncio.sleep(0.01)
+    prefetcher.after_listing("drive", "other", [])
+    await asyncio.sleep(0.01)
+    assert started == ["dir/notebook.ipynb"]
+    assert cancelled == ["dir/notebook.ipynb"]
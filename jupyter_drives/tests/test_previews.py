@@ -0,0 +1,171 @@
+import io
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+obstore = pytest.importorskip("obstore")
+
+import pyarrow.parquet as pq
+import tornado
+from traitlets.config import Config
+
+from jupyter_drives.manager import JupyterDrivesManager
+from jupyter_drives.previews import _RangesFile
+
+DRIVE = "drive"
+
+
+async def _manager(**config_values):
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    for name, value in config_values.items():
+        setattr(config.DrivesConfig, name, value)
+    manager = JupyterDrivesManager(config)
+    await manager.new_drive(DRIVE, "")
+    await manager.mount_drive(DRIVE, "memory")
+    return manager
+
+
+async def _save(manager, path, content):
+    async def parts():
+        yield content
+
+    await manager.save_raw_file(DRIVE, path, parts())
+
+
+def _table(rows):
+    return pa.table({
+        "id": list(range(rows)),
+        "name": [f"name-{i}" for i in range(rows)],
+        "value": [i / 2 for i in range(rows)],
+    })
+
+
+@pytest.fixture
+def range_reads(monkeypatch):
+    reads = []
+    get_range_async = obstore.get_range_async
+
+    async def record(store, path, start, end):
+        reads.append((start, end))
+        return await get_range_async(store, path, start=start, end=end)
+
+    monkeypatch.setattr(obstore, "get_range_async", record)
+    return reads
+
+
+def test_ranges_file():
+    file = _RangesFile(100, [(10, b"a" * 10), (20, b"b" * 10), (90, b"c" * 10)])
+    file.seek(15)
+    assert file.read(10) == b"a" * 5 + b"b" * 5
+    assert file.seek(-5, io.SEEK_END) == 95
+    assert file.read() == b"c" * 5
+    file.seek(25)
+    with pytest.raises(OSError):
+        file.read(10)
+
+
+async def test_parquet_preview(range_reads):
+    manager = await _manager()
+    sink = io.BytesIO()
+    pq.write_table(_table(100000), sink, row_group_size=10000)
+    content = sink.getvalue()
+    await _save(manager, "data/table.parquet", content)
+
+    result = (await manager.get_preview(DRIVE, "data/table.parquet", rows=3))["data"]
+    assert result["format"] == "parquet"
+    assert result["schema"] == [
+        {"name": "id", "type": "int64"},
+        {"name": "name", "type": "string"},
+        {"name": "value", "type": "double"},
+    ]
+    assert result["num_rows"] == 100000
+    assert result["columns"] == ["id", "name", "value"]
+    assert result["rows"] == [[0, "name-0", 0.0], [1, "name-1", 0.5], [2, "name-2", 1.0]]
+    # the footer, then the first row group
+    assert len(range_reads) == 2
+    assert range_reads[0][1] == len(content)
+    assert sum(end - start for start, end in range_reads) < len(content) / 5
+    await manager.close()
+
+
+async def test_parquet_preview_budget():
+    manager = await _manager(preview_max_size=600 * 1024)
+    sink = io.BytesIO()
+    pq.write_table(_table(100000), sink, row_group_size=50000, compression="none", use_dictionary=False)
+    await _save(manager, "table.parquet", sink.getvalue())
+
+    result = (await manager.get_preview(DRIVE, "table.parquet", rows=2))["data"]
+    # the other columns don't fit
+    assert result["columns"] == ["id"]
+    assert result["rows"] == [[0], [1]]
+    assert len(result["schema"]) == 3
+    await manager.close()
+
+
+async def test_csv_preview():
+    manager = await _manager(preview_head_size=1024)
+    lines = ["id,name"] + [f"{i},name-{i}" for i in range(1000)]
+    await _save(manager, "large.csv", "\n".join(lines).encode())
+    await _save(manager, "small.tsv", b"id\tname\n1\ta\n2\tb\n")
+
+    result = (await manager.get_preview(DRIVE, "large.csv", rows=2))["data"]
+    assert result["rows"] == [[0, "name-0"], [1, "name-1"]]
+    # only the head was read
+    assert result["num_rows"] is None
+
+    result = (await manager.get_preview(DRIVE, "small.tsv"))["data"]
+    assert result["schema"] == [{"name": "id", "type": "int64"}, {"name": "name", "type": "string"}]
+    assert result["num_rows"] == 2
+    await manager.close()
+
+
+async def test_arrow_preview():
+    manager = await _manager(preview_head_size=4096)
+    table = _table(10000)
+    sink = io.BytesIO()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=10):
+            writer.write_batch(batch)
+    await _save(manager, "table.arrow", sink.getvalue())
+
+    result = (await manager.get_preview(DRIVE, "table.arrow", rows=15))["data"]
+    assert [row[0] for row in result["rows"]] == list(range(15))
+    assert result["num_rows"] is None
+
+    # as an Arrow IPC stream
+    content = (await manager.get_preview(DRIVE, "table.arrow", rows=15, output_format="arrow"))["data"]
+    preview = pa.ipc.open_stream(content).read_all()
+    assert preview.equals(table.slice(0, 15))
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await manager.get_preview(DRIVE, "table.txt")
+    assert error.value.status_code == 400
+    await manager.close()
+
+
+async def test_preview_http_cache(tmp_path, range_reads):
+    from jupyter_drives.httpcache import HTTPCache
+
+    manager = await _manager()
+    sink = io.BytesIO()
+    pq.write_table(_table(100000), sink, row_group_size=10000)
+    await _save(manager, "table.parquet", sink.getvalue())
+    # as an HTTP drive with its cache enabled
+    cache = HTTPCache(str(tmp_path), 64 * 1024 * 1024)
+    manager._get_http_cache = lambda drive_name: cache
+    fetched = []
+    fetch = manager._fetch_http_file
+
+    async def record(drive_name, path, validators):
+        fetched.append(path)
+        return await fetch(drive_name, path, validators)
+
+    manager._fetch_http_file = record
+
+    result = (await manager.get_preview(DRIVE, "table.parquet", rows=2))["data"]
+    assert result["rows"] == [[0, "name-0", 0.0], [1, "name-1", 0.5]]
+    # only the footer and the first row group were read
+    assert fetched == []
+    assert len(range_reads) == 2
+    await manager.close()
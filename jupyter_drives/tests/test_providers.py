@@ -0,0 +1,48 @@
+import pytest
+
+obs = pytest.importorskip("obstore")
+
+from jupyter_drives.filesystems import ObstoreFileSystem
+from jupyter_drives.providers import MemoryDrives
+
+
+@pytest.fixture
+def memory_file_system():
+    drives = MemoryDrives()
+    drives.create("drive")
+    return ObstoreFileSystem(drives.get_store, drives.remove), drives
+
+
+async def test_memory_file_system_files(memory_file_system):
+    fs, _ = memory_file_system
+
+    await fs._pipe("drive/dir/file.txt", b"content")
+
+    assert await fs._exists("drive/dir/file.txt")
+    assert await fs._isdir("drive/dir")
+    assert not await fs._isdir("drive/dir/file.txt")
+    info = await fs._info("drive/dir/file.txt")
+    assert info["size"] == 7
+    assert info["type"] == "file"
+    assert await fs._cat_file("drive/dir/file.txt", start=1, end=4) == b"ont"
+
+
+async def test_memory_file_system_copy_move_remove(memory_file_system):
+    fs, drives = memory_file_system
+    drives.create("other")
+
+    await fs._pipe("drive/dir/a.txt", b"a")
+    await fs._pipe("drive/dir/b.txt", b"b")
+    await fs._copy("drive/dir", "drive/copy", recursive=True)
+    await fs._mv_file("drive/copy/a.txt", "other/a.txt")
+
+    assert await fs._cat_file("drive/copy/b.txt") == b"b"
+    assert await fs._cat_file("other/a.txt") == b"a"
+    assert not await fs._exists("drive/copy/a.txt")
+
+    await fs._rm("drive/dir", recursive=True)
+    assert not await fs._exists("drive/dir")
+    assert await fs._exists("drive/copy/b.txt")
+
+    await fs._rm("other", recursive=True)
+    assert [container.name for container in drives.list_containers()] == ["drive"]
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from jupyter_drives.singleflight import SingleFlight
+
+
+async def test_single_flight_coalesces_calls():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return {"data": "content"}
+
+    key = ("contents", "drive", "file.txt")
+    results = await asyncio.gather(*(single_flight.do(key, fetch) for _ in range(5)))
+    assert len(calls) == 1
+    assert all(result == {"data": "content"} for result in results)
+    assert len(single_flight) == 0
+
+    # calls are not cached once done
+    await single_flight.do(key, fetch)
+    assert len(calls) == 2
+
+
+async def test_single_flight_shares_errors():
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise FileNotFoundError("drive/missing.txt")
+
+    key = ("contents", "drive", "missing.txt")
+    results = await asyncio.gather(*(single_flight.do(key, fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, FileNotFoundError) for result in results)
+
+
+async def test_single_flight_cancelled_caller():
+    single_flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def fetch():
+        started.set()
+        await asyncio.sleep(0.01)
+        return "content"
+
+    key = ("contents", "drive", "file.txt")
+    first = asyncio.ensure_future(single_flight.do(key, fetch))
+    await started.wait()
+    second = asyncio.ensure_future(single_flight.do(key, fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second == "content"
+
+
+async def test_single_flight_forget():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        call = len(calls)
+        await asyncio.sleep(0.01)
+        return call
+
+    key = ("contents", "drive", "file.txt")
+    first = asyncio.ensure_future(single_flight.do(key, fetch))
+    await asyncio.sleep(0)
+    single_flight.forget(lambda key: key[1] == "drive")
+    second = asyncio.ensure_future(single_flight.do(key, fetch))
+    assert await first == 1
+    assert await second == 2
@@ -0,0 +1,117 @@
+import contextlib
+import hashlib
+import time
+
+import pytest
+
+from jupyter_drives import sync as sync_module
+from jupyter_drives.sync import SyncJob, SyncJobs, Synchronizer
+
+
+async def sync(store, local_root, direction="both", delete=False, state=None):
+    obs = pytest.importorskip("obstore")
+
+    async def list_objects():
+        yield await obs.list(store, "data").collect_async()
+
+    async def provider_call(operation, function):
+        return await function()
+
+    @contextlib.asynccontextmanager
+    async def slot():
+        yield
+
+    job = SyncJob("drive", "data", str(local_root), direction, delete)
+    await Synchronizer(job, str(local_root), store, list_objects, provider_call, slot, state if state is not None else {}).run()
+    assert job.failures == []
+    return job
+
+
+async def test_sync_both_directions(tmp_path):
+    obs = pytest.importorskip("obstore")
+
+    store = obs.store.MemoryStore()
+    await obs.put_async(store, "data/remote.txt", b"remote")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "local.txt").write_bytes(b"local")
+
+    state = {}
+    job = await sync(store, tmp_path, state=state)
+    assert (job.uploaded, job.downloaded) == (1, 1)
+    assert (tmp_path / "remote.txt").read_bytes() == b"remote"
+    assert bytes(await (await obs.get_async(store, "data/sub/local.txt")).bytes_async()) == b"local"
+
+    # unchanged trees are only listed
+    job = await sync(store, tmp_path, state=state)
+    assert (job.uploaded, job.downloaded, job.unchanged) == (0, 0, 2)
+
+
+async def test_sync_upload_deletes_extraneous_objects(tmp_path):
+    obs = pytest.importorskip("obstore")
+
+    store = obs.store.MemoryStore()
+    await obs.put_async(store, "data/extraneous.txt", b"extraneous")
+    (tmp_path / "file.txt").write_bytes(b"content")
+
+    job = await sync(store, tmp_path, direction="upload", delete=True)
+    assert (job.uploaded, job.deleted) == (1, 1)
+    listed = [object["path"] for object in await obs.list(store, "data").collect_async()]
+    assert listed == ["data/file.txt"]
+    assert not (tmp_path / "extraneous.txt").exists()
+
+
+async def test_sync_state_survives_restart(tmp_path, monkeypatch):
+    obs = pytest.importorskip("obstore")
+
+    store = obs.store.MemoryStore()
+    (tmp_path / "local").mkdir()
+    (tmp_path / "local" / "file.txt").write_bytes(b"content")
+    trees = (str(tmp_path / "local"), "drive", "data")
+
+    jobs = SyncJobs(state_directory=str(tmp_path / "state"))
+    await sync(store, tmp_path / "local", state=await jobs.load_state(*trees))
+    await jobs.save_state(*trees)
+
+    # a new server loads the state, the unchanged files aren't read
+    monkeypatch.setattr(sync_module, "_md5_file", None)
+    state = await SyncJobs(state_directory=str(tmp_path / "state")).load_state(*trees)
+    assert state == jobs.states[trees]
+    job = await sync(store, tmp_path / "local", state=state)
+    assert (job.uploaded, job.downloaded, job.unchanged) == (0, 0, 1)
+
+
+async def test_sync_compares_files_concurrently(tmp_path, monkeypatch):
+    obs = pytest.importorskip("obstore")
+
+    store = obs.store.MemoryStore()
+    for i in range(8):
+        await obs.put_async(store, f"data/file_{i}.txt", f"content {i}".encode())
+        (tmp_path / f"file_{i}.txt").write_bytes(f"content {i}".encode())
+
+    async def list_objects():
+        objects = await obs.list(store, "data").collect_async()
+        # with the MD5 entity tags of single-part S3 uploads
+        for object in objects:
+            content = bytes(await (await obs.get_async(store, object["path"])).bytes_async())
+            object["e_tag"] = f'"{hashlib.md5(content).hexdigest()}"'
+        yield objects
+
+    async def provider_call(operation, function):
+        return await function()
+
+    md5_file = sync_module._md5_file
+    hashing = []
+    concurrent = []
+
+    def slow_md5_file(path):
+        hashing.append(path)
+        concurrent.append(len(hashing))
+        time.sleep(0.05)
+        hashing.remove(path)
+        return md5_file(path)
+
+    monkeypatch.setattr(sync_module, "_md5_file", slow_md5_file)
+    job = SyncJob("drive", "data", str(tmp_path), "both", False)
+    await Synchronizer(job, str(tmp_path), store, list_objects, provider_call, contextlib.nullcontext, {}, concurrency=4).run()
+    assert job.unchanged == 8
+    assert 1 < max(concurrent) <= 4
@@ -0,0 +1,178 @@
+import io
+import struct
+
+import pytest
+
+PIL = pytest.importorskip("PIL.Image")
+
+from jupyter_drives.thumbnails import EXIF_READ_SIZE, ThumbnailCache, thumbnail, thumbnail_from_exif
+
+
+def _exif_jpeg(size=(2000, 1000), thumbnail_size=(320, 160), orientation=6):
+    """A large noisy JPEG image, embedding a thumbnail in its EXIF metadata."""
+    embedded = io.BytesIO()
+    PIL.new("RGB", thumbnail_size, "red").save(embedded, "JPEG")
+    embedded = embedded.getvalue()
+    # TIFF header, first directory with the orientation, second one with the thumbnail
+    first = 8
+    second = first + 2 + 12 + 4
+    data = second + 2 + 2 * 12 + 4
+    tiff = b"II*\0" + struct.pack("<I", first)
+    tiff += struct.pack("<HHHIHHI", 1, 0x0112, 3, 1, orientation, 0, second)
+    tiff += struct.pack("<HHHIIHHIII", 2, 0x0201, 4, 1, data, 0x0202, 4, 1, len(embedded), 0)
+    exif = b"Exif\0\0" + tiff + embedded
+
+    image = io.BytesIO()
+    PIL.effect_noise(size, 64).convert("RGB").save(image, "JPEG", quality=95)
+    image = image.getvalue()
+    return image[:2] + b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif + image[2:]
+
+
+def _open(content):
+    return PIL.open(io.BytesIO(content))
+
+
+def test_exif_thumbnail():
+    jpeg = _exif_jpeg()
+    assert len(jpeg) > EXIF_READ_SIZE
+
+    content_type, content = thumbnail_from_exif(jpeg[:EXIF_READ_SIZE], 128)
+    assert content_type == "image/jpeg"
+    image = _open(content)
+    # rotated as the image
+    assert image.size == (64, 128)
+    assert image.getpixel((32, 64))[0] > 200
+
+    # too small for the requested size
+    assert thumbnail_from_exif(jpeg[:EXIF_READ_SIZE], 512) is None
+    # without EXIF metadata
+    plain = io.BytesIO()
+    PIL.new("RGB", (100, 100)).save(plain, "JPEG")
+    assert thumbnail_from_exif(plain.getvalue(), 64) is None
+
+
+def test_thumbnail():
+    content_type, content = thumbnail(_exif_jpeg(), 300)
+    assert content_type == "image/jpeg"
+    assert _open(content).size == (150, 300)
+
+    # 16 bits images are stretched to their range
+    image = PIL.new("I;16", (400, 200))
+    image.putpixel((0, 0), 1000)
+    image.putpixel((1, 0), 3000)
+    tiff = io.BytesIO()
+    image.save(tiff, "TIFF")
+    content_type, content = thumbnail(tiff.getvalue(), 100)
+    assert content_type == "image/jpeg"
+    assert _open(content).size == (100, 50)
+    assert _open(content).mode == "L"
+
+    png = io.BytesIO()
+    PIL.new("RGBA", (50, 50), (0, 0, 0, 0)).save(png, "PNG")
+    content_type, content = thumbnail(png.getvalue(), 256)
+    assert content_type == "image/png"
+    # not upscaled
+    assert _open(content).size == (50, 50)
+
+
+def test_thumbnail_cache():
+    cache = ThumbnailCache(100)
+    cache.put("a", ("image/png", b"a" * 40))
+    cache.put("b", ("image/png", b"b" * 40))
+    assert cache.get("a") is not None
+    cache.put("c", ("image/png", b"c" * 40))
+    # the least recently used one is evicted
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size == 80
+    cache.put("d", ("image/png", b"d" * 200))
+    assert cache.get("d") is None
+    assert len(cache) == 2
+
+
+async def test_get_thumbnail():
+    pytest.importorskip("obstore")
+    from traitlets.config import Config
+    from jupyter_drives.manager import JupyterDrivesManager
+
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    manager = JupyterDrivesManager(config)
+    await manager.new_drive("drive", "")
+    await manager.mount_drive("drive", "memory")
+
+    async def parts(content):
+        yield content
+
+    await manager.save_raw_file("drive", "images/photo.jpg", parts(_exif_jpeg()))
+
+    generated = []
+    offload = manager._codec.offload
+
+    async def record(function, *args):
+        generated.append(function.__name__)
+        return await offload(function, *args)
+
+    manager._codec.offload = record
+
+    content_type, etag, content = await manager.get_thumbnail("drive", "images/photo.jpg", 128)
+    assert content_type == "image/jpeg"
+    assert _open(content).size == (64, 128)
+    # from the head of the file only
+    assert generated == ["thumbnail_from_exif"]
+
+    # cached
+    assert await manager.get_thumbnail("drive", "images/photo.jpg", 128) == (content_type, etag, content)
+    assert generated == ["thumbnail_from_exif"]
+    assert await manager.get_thumbnail("drive", "images/photo.jpg", 128, etag) == (None, etag, None)
+
+    # larger than the embedded thumbnail
+    content_type, _, content = await manager.get_thumbnail("drive", "images/photo.jpg", 512)
+    assert _open(content).size == (256, 512)
+    assert generated[1:] == ["thumbnail_from_exif", "thumbnail"]
+
+    # a changed image gets a new thumbnail
+    await manager.save_raw_file("drive", "images/photo.jpg", parts(_exif_jpeg(orientation=1)))
+    _, new_etag, content = await manager.get_thumbnail("drive", "images/photo.jpg", 128)
+    assert new_etag != etag
+    assert _open(content).size == (128, 64)
+    await manager.close()
+
+
+async def test_get_thumbnail_http_cache(tmp_path):
+    pytest.importorskip("obstore")
+    from traitlets.config import Config
+    from jupyter_drives.httpcache import HTTPCache
+    from jupyter_drives.manager import JupyterDrivesManager
+
+    config = Config()
+    config.DrivesConfig.provider = "memory"
+    manager = JupyterDrivesManager(config)
+    await manager.new_drive("drive", "")
+    await manager.mount_drive("drive", "memory")
+
+    async def parts(content):
+        yield content
+
+    await manager.save_raw_file("drive", "photo.jpg", parts(_exif_jpeg()))
+    # as an HTTP drive with its cache enabled
+    cache = HTTPCache(str(tmp_path), 16 * 1024 * 1024)
+    manager._get_http_cache = lambda drive_name: cache
+    fetched = []
+    fetch = manager._fetch_http_file
+
+    async def record(drive_name, path, validators):
+        fetched.append(path)
+        return await fetch(drive_name, path, validators)
+
+    manager._fetch_http_file = record
+
+    _, _, content = await manager.get_thumbnail("drive", "photo.jpg", 128)
+    assert _open(content).size == (64, 128)
+    # the embedded thumbnail was read without retrieving the whole image
+    assert fetched == []
+
+    _, _, content = await manager.get_thumbnail("drive", "photo.jpg", 512)
+    assert _open(content).size == (256, 512)
+    assert fetched == ["photo.jpg"]
+    await manager.close()
@@ -0,0 +1,59 @@
+from jupyter_drives.timing import RequestTimer, current_timer, span, timed_iter
+
+
+def test_server_timing_aggregates_spans():
+    timer = RequestTimer("GET ContentsJupyterDrivesHandler").activate()
+    try:
+        assert current_timer() is timer
+        with span("head"):
+            pass
+        with span("head"):
+            pass
+        with span("fix_dir"):
+            pass
+    finally:
+        timer.deactivate()
+
+    header = timer.server_timing()
+    assert header.startswith("head;dur=")
+    assert 'head;dur=' in header and 'desc="2 calls"' in header
+    assert "fix_dir;dur=" in header
+    assert "total;dur=" in header
+    assert current_timer() is None
+
+
+def test_span_without_timer():
+    with span("get"):
+        pass
+    assert current_timer() is None
+
+
+def test_span_hook_receives_request_and_spans():
+    received = []
+    timer = RequestTimer("GET ListJupyterDrivesHandler", lambda *args: received.append(args)).activate()
+    try:
+        with span("serialize"):
+            pass
+    finally:
+        timer.deactivate()
+    timer.emit({"http.status_code": 200})
+
+    assert [name for name, *_ in received] == ["GET ListJupyterDrivesHandler", "serialize"]
+    assert received[0][3] == {"http.status_code": 200}
+    assert received[1][3]["parent"] == "GET ListJupyterDrivesHandler"
+    assert all(start <= end for _, start, end, _ in received)
+
+
+async def test_timed_iter_records_single_span():
+    async def batches():
+        for i in range(3):
+            yield i
+
+    timer = RequestTimer("GET ContentsJupyterDrivesHandler").activate()
+    try:
+        items = [item async for item in timed_iter("list", batches())]
+    finally:
+        timer.deactivate()
+
+    assert items == [0, 1, 2]
+    assert [name for name, *_ in timer.spans] == ["list"]
@@ -0,0 +1,59 @@
+from jupyter_drives.usage import DiskUsage
+
+
+class Objects():
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.listed = []
+
+    async def list_all(self, path):
+        self.listed.append(("all", path))
+        prefix = path + '/' if path else ''
+        yield [{"path": key, "size": size} for key, size in sorted(self.sizes.items()) if key.startswith(prefix)]
+
+    async def list_directory(self, path):
+        self.listed.append(("directory", path))
+        prefix = path + '/' if path else ''
+        objects = [{"path": key, "size": size} for key, size in self.sizes.items() if key.startswith(prefix) and '/' not in key[len(prefix):]]
+        prefixes = {prefix + key[len(prefix):].split('/')[0] + '/' for key in self.sizes if key.startswith(prefix) and '/' in key[len(prefix):]}
+        return objects, sorted(prefixes)
+
+
+async def test_disk_usage():
+    objects = Objects({"a/1": 10, "a/b/2": 20, "a/b/3": 30, "c/4": 40, "5": 50})
+    usage = DiskUsage(objects.list_all, objects.list_directory)
+
+    result = await usage.get("")
+    assert (result["size"], result["count"]) == (150, 5)
+    assert result["files"] == {"size": 50, "count": 1}
+    assert [(child["path"], child["size"]) for child in result["children"]] == [("a", 60), ("c", 40)]
+
+    # answered from the tree
+    result = await usage.get("a/b")
+    assert (result["size"], result["count"]) == (50, 2)
+    assert objects.listed == [("all", "")]
+
+
+async def test_disk_usage_updates():
+    objects = Objects({"a/1": 10, "a/b/2": 20, "c/4": 40})
+    usage = DiskUsage(objects.list_all, objects.list_directory)
+    await usage.get("")
+
+    # a changed file relists its directory only
+    objects.sizes["a/1"] = 15
+    usage.changed("a/1")
+    assert (await usage.get(""))["size"] == 75
+    assert objects.listed[-1] == ("directory", "a")
+
+    # a new directory is listed alone
+    objects.sizes["a/d/e/5"] = 5
+    usage.changed("a/d/e/5")
+    assert (await usage.get("a"))["count"] == 3
+    assert objects.listed[-1] == ("all", "a/d")
+
+    # a deleted directory
+    del objects.sizes["a/b/2"]
+    usage.changed("a/b")
+    result = await usage.get("")
+    assert (result["size"], result["count"]) == (60, 3)
+    assert [child["path"] for child in (await usage.get("a"))["children"]] == ["a/d"]
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from jupyter_drives import writeback
+from jupyter_drives.writeback import WriteBackBuffer
+
+
+async def test_write_back_coalesces_saves():
+    uploads = []
+
+    async def upload(key, content):
+        uploads.append((key, content))
+
+    buffer = WriteBackBuffer(0.05, upload)
+    for version in range(5):
+        buffer.submit(("drive", "file.txt"), f"version {version}".encode())
+    assert ("drive", "file.txt") in buffer
+    assert uploads == []
+
+    await asyncio.sleep(0.1)
+    assert uploads == [(("drive", "file.txt"), b"version 4")]
+    assert len(buffer) == 0
+
+
+async def test_write_back_flush():
+    uploads = []
+
+    async def upload(key, content):
+        uploads.append(key)
+
+    buffer = WriteBackBuffer(60, upload)
+    buffer.submit(("drive", "dir/a.txt"), b"a")
+    buffer.submit(("drive", "b.txt"), b"b")
+
+    await buffer.flush(lambda key: key[1].startswith("dir/"))
+    assert uploads == [("drive", "dir/a.txt")]
+    assert ("drive", "b.txt") in buffer
+
+    await buffer.close()
+    assert uploads == [("drive", "dir/a.txt"), ("drive", "b.txt")]
+    assert len(buffer) == 0
+
+
+async def test_write_back_keeps_failed_uploads():
+    attempts = []
+
+    async def upload(key, content):
+        attempts.append(content)
+        if len(attempts) == 1:
+            raise ConnectionError("connection reset")
+
+    buffer = WriteBackBuffer(60, upload)
+    buffer.submit(("drive", "file.txt"), b"content")
+    with pytest.raises(ConnectionError):
+        await buffer.flush()
+    assert ("drive", "file.txt") in buffer
+
+    await buffer.flush()
+    assert attempts == [b"content", b"content"]
+    assert len(buffer) == 0
+
+
+async def test_write_back_retries_failed_uploads(monkeypatch):
+    monkeypatch.setattr(writeback, "RETRY_DELAY", 0.01)
+    attempts = []
+
+    async def upload(key, content):
+        attempts.append(content)
+        if len(attempts) < 3:
+            raise ConnectionError("connection reset")
+
+    buffer = WriteBackBuffer(0.01, upload)
+    buffer.submit(("drive", "file.txt"), b"content")
+    await asyncio.sleep(0.02)
+    assert buffer.failed(("drive", "file.txt"))
+
+    # retried in the background, after 0.01 then 0.02 seconds
+    await asyncio.sleep(0.2)
+    assert attempts == [b"content"] * 3
+    assert not buffer.failed(("drive", "file.txt"))
+    assert len(buffer) == 0
@@ -0,0 +1,206 @@
+"""
+Thumbnails and downscaled previews of the images of the drives.
+
+The content of an image is otherwise returned in full, base64 encoded, even when
+only a small rendering of it is displayed. Thumbnails are generated in the
+encoding pool, out of the event loop, from:
+
+- the thumbnail embedded in the EXIF metadata of a JPEG file (e.g. by cameras and
+  microscopes) when it is large enough, read with a single range read of the head
+  of the file;
+- otherwise the whole image, JPEG files being decoded at a reduced scale.
+
+The generated thumbnails are kept in a bounded cache keyed by the entity tag of
+the image, a changed image getting a new thumbnail.
+
+Pillow is required, it is installed with the ``thumbnails`` extra.
+"""
+import collections
+import functools
+import io
+import struct
+from typing import Hashable, Optional, Tuple
+
+# extensions of the images thumbnails are generated for
+THUMBNAIL_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.tif', '.tiff'}
+
+# extensions of the images whose EXIF metadata may embed a thumbnail
+EXIF_EXTENSIONS = {'.jpg', '.jpeg'}
+
+# bytes read from the head of a JPEG file for its embedded thumbnail, an EXIF segment has at most 64 KB
+EXIF_READ_SIZE = 64 * 1024
+
+# size of the thumbnails by default and at most, in pixels
+DEFAULT_THUMBNAIL_SIZE = 256
+MAX_THUMBNAIL_SIZE = 2048
+
+# quality of the JPEG thumbnails
+JPEG_QUALITY = 85
+
+@functools.lru_cache(maxsize=None)
+def _pillow():
+    try:
+        import PIL.Image
+    except ImportError:
+        return None
+    return PIL.Image
+
+def available() -> bool:
+    """Check whether thumbnails can be generated, Pillow being installed."""
+    return _pillow() is not None
+
+def _exif_thumbnail(head: bytes) -> Optional[Tuple[bytes, int]]:
+    """Find the thumbnail embedded in the EXIF segment at the head of a JPEG file, and the orientation of the image."""
+    if head[:2] != b"\xff\xd8":
+        return None
+    offset = 2
+    while offset + 4 <= len(head):
+        marker, length = struct.unpack(">HH", head[offset:offset + 4])
+        if marker == 0xffe1 and head[offset + 4:offset + 10] == b"Exif\0\0":
+            return _tiff_thumbnail(head[offset + 10:offset + 2 + length])
+        if marker & 0xff00 != 0xff00 or marker in (0xffda, 0xffd9):
+            # the image data starts, without EXIF segment
+            return None
+        offset += 2 + length
+    return None
+
+def _tiff_thumbnail(tiff: bytes) -> Optional[Tuple[bytes, int]]:
+    """Find the thumbnail of the second directory of EXIF metadata, and the orientation of the first."""
+    def directory(offset):
+        # the entries of the tags, followed by the offset of the next directory
+        (count,) = struct.unpack(order + "H", tiff[offset:offset + 2])
+        end = offset + 2 + 12 * count
+        tags = {}
+        for entry in range(offset + 2, end, 12):
+            tag, value_type = struct.unpack(order + "HH", tiff[entry:entry + 4])
+            # the values of SHORT tags are left-aligned in the value field
+            value_format = "H" if value_type == 3 else "I"
+            tags[tag] = struct.unpack(order + value_format, tiff[entry + 8:entry + 8 + struct.calcsize(value_format)])[0]
+        (next_offset,) = struct.unpack(order + "I", tiff[end:end + 4])
+        return tags, next_offset
+
+    try:
+        order = {b"II": "<", b"MM": ">"}[tiff[:2]]
+        (first,) = struct.unpack(order + "I", tiff[4:8])
+        tags, second = directory(first)
+        if second == 0:
+            return None
+        thumbnail_tags, _ = directory(second)
+        start, length = thumbnail_tags[0x0201], thumbnail_tags[0x0202]
+    except (KeyError, struct.error):
+        return None
+    thumbnail = tiff[start:start + length]
+    if length == 0 or len(thumbnail) != length:
+        # truncated
+        return None
+    return thumbnail, tags.get(0x0112, 1)
+
+def _orient(image, orientation: int):
+    """Rotate or flip an image as its EXIF orientation tells, as ImageOps.exif_transpose does."""
+    Transpose = _pillow().Transpose
+    method = {
+        2: Transpose.FLIP_LEFT_RIGHT,
+        3: Transpose.ROTATE_180,
+        4: Transpose.FLIP_TOP_BOTTOM,
+        5: Transpose.TRANSPOSE,
+        6: Transpose.ROTATE_270,
+        7: Transpose.TRANSVERSE,
+        8: Transpose.ROTATE_90,
+    }.get(orientation)
+    return image.transpose(method) if method is not None else image
+
+def _encode(image, size: int) -> Tuple[str, bytes]:
+    """Downscale an image and encode it, as PNG when it is transparent and JPEG otherwise."""
+    if image.mode in ("I", "I;16", "I;16B", "I;16L", "F"):
+        # e.g. 16 bits microscopy images, stretched to their range of values
+        image = image.convert("F")
+        low, high = image.getextrema()
+        scale = 255 / (high - low) if high > low else 1
+        image = image.point(lambda value: value * scale - low * scale).convert("L")
+    image.thumbnail((size, size))
+    output = io.BytesIO()
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        image.save(output, "PNG", optimize=True)
+        return "image/png", output.getvalue()
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image.save(output, "JPEG", quality=JPEG_QUALITY)
+    return "image/jpeg", output.getvalue()
+
+def thumbnail_from_exif(head: bytes, size: int) -> Optional[Tuple[str, bytes]]:
+    """Generate a thumbnail from the one embedded in the head of a JPEG file.
+
+    Args:
+        head: first bytes of the file
+        size: largest dimension of the thumbnail
+    Returns:
+        The content type and content of the thumbnail, None when the file doesn't
+        embed a thumbnail at least as large.
+    """
+    embedded = _exif_thumbnail(head)
+    if embedded is None:
+        return None
+    content, orientation = embedded
+    try:
+        image = _pillow().open(io.BytesIO(content))
+        image.load()
+    except Exception:
+        return None
+    if max(image.size) < size:
+        # upscaling would blur it
+        return None
+    return _encode(_orient(image, orientation), size)
+
+def thumbnail(content: bytes, size: int) -> Tuple[str, bytes]:
+    """Generate a thumbnail of an image.
+
+    Args:
+        content: content of the image file
+        size: largest dimension of the thumbnail
+    Returns:
+        The content type and content of the thumbnail.
+    """
+    from PIL import ImageOps
+
+    image = _pillow().open(io.BytesIO(content))
+    # JPEG images are decoded at the smallest scale above the size
+    image.draft("RGB", (size, size))
+    return _encode(ImageOps.exif_transpose(image), size)
+
+class ThumbnailCache():
+    """
+    Bounded cache of the generated thumbnails, the least recently used ones are evicted first.
+
+    Args:
+        max_size: size in bytes of the cached thumbnails
+    """
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._size = 0
+        self._thumbnails: collections.OrderedDict[Hashable, Tuple[str, bytes]] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._thumbnails)
+
+    @property
+    def size(self) -> int:
+        """Size in bytes of the cached thumbnails."""
+        return self._size
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, bytes]]:
+        thumbnail = self._thumbnails.get(key)
+        if thumbnail is not None:
+            self._thumbnails.move_to_end(key)
+        return thumbnail
+
+    def put(self, key: Hashable, thumbnail: Tuple[str, bytes]):
+        if len(thumbnail[1]) > self._max_size:
+            return
+        previous = self._thumbnails.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous[1])
+        self._thumbnails[key] = thumbnail
+        self._size += len(thumbnail[1])
+        while self._size > self._max_size:
+            _, evicted = self._thumbnails.popitem(last=False)
+            self._size -= len(evicted[1])
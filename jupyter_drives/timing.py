@@ -0,0 +1,154 @@
+"""
+Per-request timing breakdown of the drives handlers.
+
+A ``RequestTimer`` is bound to the current request by the handlers and the
+manager records spans on it through ``span`` and ``timed_iter``. The spans are
+returned to the client as ``Server-Timing`` headers and can be forwarded to a
+tracing backend through a span hook.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# timer of the request currently being handled
+_current_timer = contextvars.ContextVar("jupyter_drives_request_timer", default=None)
+
+class RequestTimer():
+    """
+    Collects the spans recorded while handling a request.
+
+    Args:
+        name: name of the request (e.g. ``GET ContentsJupyterDrivesHandler``)
+        span_hook: optional callable receiving each span as
+            ``span_hook(name, start_time_ns, end_time_ns, attributes)``
+    """
+    def __init__(self, name: str, span_hook: Optional[Callable] = None) -> None:
+        self.name = name
+        self.spans: List[Tuple[str, int, int, Dict[str, Any]]] = []
+        self._span_hook = span_hook
+        self._start_ns = time.time_ns()
+        self._start_counter = time.perf_counter_ns()
+        self._token = None
+
+    def activate(self):
+        """Bind the timer to the current context."""
+        self._token = _current_timer.set(self)
+        return self
+
+    def deactivate(self):
+        """Unbind the timer from the current context."""
+        if self._token is not None:
+            _current_timer.reset(self._token)
+            self._token = None
+
+    def record(self, name: str, start_ns: int, duration_ns: int, attributes: Optional[Dict[str, Any]] = None):
+        """Record a finished span.
+
+        Args:
+            name: name of the span
+            start_ns: start time of the span, in nanoseconds since the epoch
+            duration_ns: duration of the span in nanoseconds
+            attributes: additional attributes of the span
+        """
+        self.spans.append((name, start_ns, start_ns + duration_ns, attributes or {}))
+
+    def elapsed_ms(self) -> float:
+        """Time spent since the timer was created, in milliseconds."""
+        return (time.perf_counter_ns() - self._start_counter) / 1e6
+
+    def server_timing(self) -> str:
+        """Format the recorded spans as a ``Server-Timing`` header value.
+
+        Spans sharing the same name are aggregated, their count being reported
+        in the description of the metric.
+        """
+        totals = {}
+        for name, start_ns, end_ns, _ in self.spans:
+            duration, count = totals.get(name, (0, 0))
+            totals[name] = (duration + end_ns - start_ns, count + 1)
+
+        metrics = []
+        for name, (duration, count) in totals.items():
+            metric = f"{name};dur={duration / 1e6:.3f}"
+            if count > 1:
+                metric += f';desc="{count} calls"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={self.elapsed_ms():.3f}")
+        return ", ".join(metrics)
+
+    def emit(self, attributes: Optional[Dict[str, Any]] = None):
+        """Forward the request and its spans to the span hook, if any.
+
+        Args:
+            attributes: attributes of the request span (e.g. status code)
+        """
+        if self._span_hook is None:
+            return
+        end_ns = self._start_ns + time.perf_counter_ns() - self._start_counter
+        self._span_hook(self.name, self._start_ns, end_ns, attributes or {})
+        for name, start_ns, end_ns, span_attributes in self.spans:
+            self._span_hook(name, start_ns, end_ns, dict(span_attributes, parent=self.name))
+
+def current_timer() -> Optional[RequestTimer]:
+    """Get the timer of the request currently being handled."""
+    return _current_timer.get()
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block and record it on the current request timer.
+
+    Args:
+        name: name of the span (e.g. ``list``, ``get``, ``head``, ``fix_dir``)
+        attributes: additional attributes of the span
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start_ns = time.time_ns()
+    start_counter = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        timer.record(name, start_ns, time.perf_counter_ns() - start_counter, attributes)
+
+async def timed_iter(name: str, iterable: AsyncIterable, **attributes) -> AsyncIterator:
+    """Iterate over an async iterable, recording the time spent waiting for its items.
+
+    Only the time spent inside the iterable is recorded, the processing of the
+    items by the consumer is not included.
+
+    Args:
+        name: name of the span
+        iterable: async iterable to consume (e.g. an ``obs.list`` stream)
+        attributes: additional attributes of the span
+    """
+    timer = _current_timer.get()
+    iterator = iterable.__aiter__()
+    start_ns = time.time_ns()
+    duration_ns = 0
+    try:
+        while True:
+            start_counter = time.perf_counter_ns()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                duration_ns += time.perf_counter_ns() - start_counter
+            yield item
+    finally:
+        if timer is not None:
+            timer.record(name, start_ns, duration_ns, attributes)
+
+def opentelemetry_span_hook(name: str, start_time_ns: int, end_time_ns: int, attributes: Dict[str, Any]):
+    """Span hook exporting the spans through the OpenTelemetry API.
+
+    Can be set as ``c.DrivesConfig.span_hook``; requires ``opentelemetry-api``.
+    """
+    from opentelemetry import trace
+
+    tracer = trace.get_tracer("jupyter_drives")
+    otel_span = tracer.start_span(name, start_time=start_time_ns, attributes=attributes)
+    otel_span.end(end_time=end_time_ns)
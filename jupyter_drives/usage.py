@@ -0,0 +1,214 @@
+"""
+Disk usage of the directories of the drives.
+
+The usage of a directory (bytes and objects, in total and per child directory) is
+aggregated from a parallel listing of all the objects under it, into a tree of the
+directories under it which is kept. Further queries of the directory, or of any
+directory under it, are answered from the tree.
+
+The changes made through the manager update the trees incrementally when they are
+next queried: a changed file only relists the files directly in its directory, and
+a changed directory (e.g. deleted or extracted) only its own subtree; the totals of
+the ancestors are adjusted by the difference.
+"""
+import collections
+import posixpath
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+# directory trees kept per manager, the least recently queried ones are dropped
+USAGE_TREES = 32
+
+class _Node():
+    """Usage of a directory."""
+    __slots__ = ("size", "count", "files_size", "files_count", "children")
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.count = 0
+        self.files_size = 0
+        self.files_count = 0
+        self.children: Dict[str, _Node] = {}
+
+    def find(self, relative: str) -> Optional["_Node"]:
+        node = self
+        for name in filter(None, relative.split('/')):
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    def to_dict(self, path: str) -> dict:
+        prefix = path + '/' if path else ''
+        return {
+            "path": path,
+            "size": self.size,
+            "count": self.count,
+            "files": {"size": self.files_size, "count": self.files_count},
+            "children": sorted(
+                (
+                    {"name": name, "path": prefix + name, "size": child.size, "count": child.count}
+                    for name, child in self.children.items()
+                ),
+                key=lambda child: child["size"],
+                reverse=True,
+            ),
+        }
+
+def _relative(path: str, root: str) -> Optional[str]:
+    """Get a path relative to a directory, None if it is not under it."""
+    if root == '':
+        return path
+    if path == root:
+        return ''
+    if path.startswith(root + '/'):
+        return path[len(root) + 1:]
+    return None
+
+class DiskUsage():
+    """
+    Trees of the usage of the directories of a drive, updated after the changes.
+
+    Args:
+        list_all: callable returning an async iterator of the pages of all the objects
+            under a directory, with their ``path`` and ``size``
+        list_directory: coroutine function listing the objects directly in a directory
+            and the paths of its sub-directories, as ``(objects, prefixes)``
+        ignored: callable telling whether an object doesn't count as a file (e.g. a
+            marker of an empty directory)
+    """
+    def __init__(
+        self,
+        list_all: Callable[[str], AsyncIterator[List[dict]]],
+        list_directory: Callable[[str], Awaitable[tuple]],
+        ignored: Callable[[str], bool] = lambda path: False,
+    ) -> None:
+        self._list_all = list_all
+        self._list_directory = list_directory
+        self._ignored = ignored
+        self._trees: collections.OrderedDict[str, _Node] = collections.OrderedDict()
+        self._changes: Set[str] = set()
+
+    def changed(self, path: str):
+        """Record a change (write, rename or deletion) of a file or directory."""
+        self._changes.add(path.strip('/'))
+
+    async def get(self, path: str) -> dict:
+        """Get the usage of a directory and of its children."""
+        path = path.strip('/')
+        await self._apply_changes()
+        # the deepest trees first
+        for root in sorted(self._trees, key=len, reverse=True):
+            tree = self._trees[root]
+            relative = _relative(path, root)
+            if relative is not None:
+                node = tree.find(relative)
+                if node is not None or relative == '':
+                    self._trees.move_to_end(root)
+                    return node.to_dict(path)
+                # not a directory when the tree was built, e.g. created meanwhile
+                break
+
+        tree = await self._build(path)
+        # the trees under the new one are superseded
+        for root in [root for root in self._trees if _relative(root, path) is not None]:
+            del self._trees[root]
+        self._trees[path] = tree
+        while len(self._trees) > USAGE_TREES:
+            self._trees.popitem(last=False)
+        return tree.to_dict(path)
+
+    async def _build(self, path: str) -> _Node:
+        tree = _Node()
+        prefix = path + '/' if path else ''
+        async for objects in self._list_all(path):
+            for object in objects:
+                relative = object["path"][len(prefix):]
+                directories = relative.split('/')[:-1]
+                ignored = self._ignored(object["path"])
+                node = tree
+                for name in [None] + directories:
+                    if name is not None:
+                        node = node.children.setdefault(name, _Node())
+                    if not ignored:
+                        node.size += object["size"]
+                        node.count += 1
+                if not ignored:
+                    node.files_size += object["size"]
+                    node.files_count += 1
+        return tree
+
+    async def _apply_changes(self):
+        changes, self._changes = self._changes, set()
+        for path in sorted(changes):
+            for root in list(self._trees):
+                if root not in self._trees:
+                    # superseded meanwhile
+                    continue
+                relative = _relative(path, root)
+                if relative is None:
+                    if _relative(root, path) is not None:
+                        # the whole tree changed, e.g. deleted
+                        del self._trees[root]
+                    continue
+                await self._update(root, relative)
+
+    async def _update(self, root: str, relative: str):
+        tree = self._trees[root]
+        # ancestors of the changed path, from the root
+        ancestors = [tree]
+        names = [name for name in relative.split('/') if name]
+        for name in names:
+            child = ancestors[-1].children.get(name)
+            if child is None:
+                break
+            ancestors.append(child)
+        depth = len(ancestors) - 1
+        parent_path = posixpath.join(root, *names[:depth]) if names[:depth] else root
+
+        if depth == len(names):
+            # a known directory changed, rebuild it
+            if depth == 0:
+                self._trees[root] = await self._build(root)
+                return
+            node = await self._build(parent_path)
+            self._replace(ancestors[:-1], names[depth - 1], node)
+        elif depth == len(names) - 1:
+            # a file of a known directory changed, relist its files
+            await self._refresh_files(ancestors, parent_path)
+        else:
+            # a new directory, or a directory under a new one
+            name = names[depth]
+            node = await self._build(posixpath.join(parent_path, name) if parent_path else name)
+            self._replace(ancestors, name, node)
+
+    def _replace(self, ancestors: List[_Node], name: str, node: _Node):
+        """Replace the child of the deepest ancestor, adjusting the totals of all of them."""
+        parent = ancestors[-1]
+        previous = parent.children.get(name) or _Node()
+        if node.count or node.children:
+            parent.children[name] = node
+        else:
+            parent.children.pop(name, None)
+        for ancestor in ancestors:
+            ancestor.size += node.size - previous.size
+            ancestor.count += node.count - previous.count
+
+    async def _refresh_files(self, ancestors: List[_Node], path: str):
+        node = ancestors[-1]
+        objects, prefixes = await self._list_directory(path)
+        files = [object for object in objects if not self._ignored(object["path"])]
+        files_size = sum(object["size"] for object in files)
+        size_delta = files_size - node.files_size
+        count_delta = len(files) - node.files_count
+        node.files_size = files_size
+        node.files_count = len(files)
+        for ancestor in ancestors:
+            ancestor.size += size_delta
+            ancestor.count += count_delta
+
+        # sub-directories created or removed along
+        names = {prefix.rstrip('/').rsplit('/', 1)[-1] for prefix in prefixes}
+        for name in set(node.children) - names:
+            self._replace(ancestors, name, _Node())
+        for name in names - set(node.children):
+            self._replace(ancestors, name, await self._build(posixpath.join(path, name) if path else name))
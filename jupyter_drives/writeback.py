@@ -0,0 +1,145 @@
+"""
+Write-back buffer of the saved file contents.
+
+A save is acknowledged as soon as its content is buffered. The content is uploaded
+in the background once the coalescing window of its path is over; saves of the same
+path within the window replace the buffered content, so only the latest one is
+uploaded. Reads and writes of a path waiting for its upload flush it first, and
+everything buffered is flushed when the server shuts down.
+
+A failed upload is retried in the background with an exponential backoff, a few
+times, after which its content stays buffered for the next flush.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from .metrics import WRITE_BACK_COALESCED, WRITE_BACK_FAILURES
+
+# background attempts of an upload, before its content is left for the next flush
+UPLOAD_ATTEMPTS = 5
+
+# delay in seconds before the first retry of a failed upload, doubled at each retry
+RETRY_DELAY = 1.0
+
+class WriteBackBuffer():
+    """
+    Coalesces the contents saved to the same key and uploads the latest one.
+
+    Args:
+        delay: coalescing window in seconds, from the first buffered save of a key
+        upload: coroutine function uploading a content, called as ``upload(key, content)``
+        log: logger of the failed background uploads
+    """
+    def __init__(
+        self,
+        delay: float,
+        upload: Callable[[Hashable, bytes], Awaitable],
+        log: Optional[logging.Logger] = None,
+    ) -> None:
+        self._delay = delay
+        self._upload = upload
+        self._log = log or logging.getLogger(__name__)
+        self._pending: Dict[Hashable, bytes] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._wake_ups: Dict[Hashable, asyncio.Event] = {}
+        # consecutive failed uploads of each key
+        self._failures: Dict[Hashable, int] = {}
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(set(self._pending) | set(self._tasks))
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._pending or key in self._tasks
+
+    def failed(self, key: Hashable) -> bool:
+        """Whether the last upload of a key failed."""
+        return key in self._failures
+
+    def submit(self, key: Hashable, content: bytes):
+        """Buffer the content saved to a key, replacing the one waiting for its upload.
+
+        Args:
+            key: key of the content, its first item is the drive name (e.g.
+                ``(drive_name, path)``)
+            content: content to upload
+        """
+        if key in self._pending:
+            WRITE_BACK_COALESCED.labels(key[0]).inc()
+        self._pending[key] = content
+        if key not in self._tasks:
+            self._start(key)
+
+    def _start(self, key: Hashable, delay: Optional[float] = None):
+        self._wake_ups[key] = asyncio.Event()
+        task = asyncio.ensure_future(self._run(key, self._delay if delay is None else delay))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._forget_task(key, task))
+
+    def _forget_task(self, key: Hashable, task: asyncio.Future):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            del self._wake_ups[key]
+        if task.cancelled() or task.exception() is None:
+            return
+        failures = self._failures[key] = self._failures.get(key, 0) + 1
+        WRITE_BACK_FAILURES.labels(key[0]).inc()
+        if failures < UPLOAD_ATTEMPTS and not self._closed and key not in self._tasks:
+            delay = RETRY_DELAY * 2 ** (failures - 1)
+            self._log.warning(f"The upload of {key} failed, it is retried in {delay} seconds: {task.exception()}")
+            self._start(key, delay)
+        else:
+            self._log.error(f"The upload of {key} failed, it is retried by the next flush: {task.exception()}")
+
+    async def _run(self, key: Hashable, delay: float):
+        wake_up = self._wake_ups[key]
+        while key in self._pending:
+            try:
+                await asyncio.wait_for(wake_up.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            wake_up.clear()
+            delay = self._delay
+            content = self._pending.pop(key)
+            try:
+                await self._upload(key, content)
+            except BaseException:
+                # keep the content for the retry, unless a newer one was saved meanwhile
+                self._pending.setdefault(key, content)
+                raise
+            self._failures.pop(key, None)
+
+    async def flush(self, predicate: Optional[Callable[[Hashable], bool]] = None):
+        """Upload now the contents buffered for the keys matching ``predicate``.
+
+        Args:
+            predicate: keys to flush, all of them by default
+        Raises:
+            The error of a failed upload, its content stays buffered.
+        """
+        loop = asyncio.get_running_loop()
+        keys = [key for key in set(self._pending) | set(self._tasks) if predicate is None or predicate(key)]
+        for key in keys:
+            if key not in self._tasks or self._tasks[key].get_loop() is not loop:
+                # a failed upload, or an upload of a stopped event loop (e.g. at exit)
+                self._start(key)
+            self._wake_ups[key].set()
+        tasks = [self._tasks[key] for key in keys]
+        if not tasks:
+            return
+        results = await asyncio.gather(*(asyncio.shield(task) for task in tasks), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def close(self):
+        """Flush all the buffered contents, logging the failed uploads."""
+        self._closed = True
+        try:
+            await self.flush()
+        except Exception:
+            # logged by the tasks
+            pass
+        if self._pending:
+            self._log.error(f"The contents of {sorted(map(str, self._pending))} could not be uploaded.")
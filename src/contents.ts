@@ -7,6 +7,7 @@ import { Notification } from '@jupyterlab/apputils';
 import {
   extractCurrentDrive,
   formatPath,
+  IDirectoryUsage,
   IDriveInfo,
   IRegisteredFileTypes
 } from './token';
@@ -26,10 +27,22 @@ import {
   getDrivesList,
   excludeDrive,
   includeDrive,
-  addExternalDrive
+  addExternalDrive,
+  createCheckpoint,
+  listCheckpoints,
+  restoreCheckpoint,
+  deleteCheckpoint,
+  getArchiveUrl,
+  extractArchive,
+  getUsage
 } from './requests';
 import { DrivesResponseError } from './handler';
 
+/**
+ * Number of contents models kept for conditional requests.
+ */
+const CONTENTS_CACHE_SIZE = 100;
+
 export class Drive implements Contents.IDrive {
   /**
    * Construct a new drive object.
@@ -150,6 +163,27 @@ export class Drive implements Contents.IDrive {
     return this._fileChanged;
   }
 
+  /**
+   * A signal emitted with the partial listing of a directory while it is streamed.
+   */
+  get listingProgress(): ISignal<this, Drive.IListingProgress> {
+    return this._listingProgress;
+  }
+
+  /**
+   * Whether the listings of directories are streamed.
+   */
+  get streamListings(): boolean {
+    return this._streamListings;
+  }
+
+  /**
+   * Stream the listings of directories, emitting `listingProgress` as entries arrive.
+   */
+  set streamListings(stream: boolean) {
+    this._streamListings = stream;
+  }
+
   /**
    * Test whether the manager has been disposed.
    */
@@ -213,6 +247,54 @@ export class Drive implements Contents.IDrive {
     return link;
   }
 
+  /**
+   * Get the URL of a ZIP archive of a directory, streamed by the server.
+   *
+   * @param path - The path of the directory (a drive for the whole drive).
+   *
+   * @returns The URL of the archive.
+   */
+  getArchiveUrl(path: string): string {
+    const currentDrive = extractCurrentDrive(path, this._drivesList);
+    return getArchiveUrl(currentDrive.name, {
+      path: formatPath(path)
+    });
+  }
+
+  /**
+   * Get the disk usage of a directory.
+   *
+   * @param path - The path of the directory.
+   *
+   * @returns A promise which resolves with the usage of the directory.
+   */
+  async getUsage(path: string): Promise<IDirectoryUsage> {
+    const currentDrive = extractCurrentDrive(path, this._drivesList);
+    return getUsage(currentDrive.name, {
+      path: formatPath(path)
+    });
+  }
+
+  /**
+   * Upload an archive, extracted by the server into a directory.
+   *
+   * @param path - The path of the directory where the archive is extracted.
+   *
+   * @param file - The archive (ZIP or tar, possibly compressed).
+   *
+   * @returns A promise which resolves with the number of extracted files.
+   */
+  async extractArchive(path: string, file: File): Promise<number> {
+    const currentDrive = extractCurrentDrive(path, this._drivesList);
+    const count = await extractArchive(currentDrive.name, {
+      path: formatPath(path),
+      file
+    });
+    // the listing of the directory changed
+    this._contentsCache.delete(path);
+    return count;
+  }
+
   /**
    * Get a file or directory.
    *
@@ -253,11 +335,42 @@ export class Drive implements Contents.IDrive {
 
       try {
         const currentPath = formatPath(localPath);
+        const cached = this._contentsCache.get(localPath);
         const result = await getContents(currentDrive.name, {
           path: currentPath,
-          registeredFileTypes: this._registeredFileTypes
+          registeredFileTypes: this._registeredFileTypes,
+          etag: cached?.etag,
+          onFiles: this._streamListings
+            ? files =>
+                this._listingProgress.emit({
+                  path: localPath,
+                  model: {
+                    name: currentPath
+                      ? PathExt.basename(currentPath)
+                      : currentDrive.name,
+                    path: PathExt.join(
+                      currentDrive.name,
+                      currentPath ? currentPath + '/' : ''
+                    ),
+                    last_modified: '',
+                    created: '',
+                    content: files,
+                    format: 'json',
+                    mimetype: '',
+                    size: undefined,
+                    writable: true,
+                    type: 'directory'
+                  }
+                })
+            : undefined
         });
 
+        if (result.notModified && cached) {
+          // the contents did not change since the last request
+          this._cacheContents(localPath, cached.etag, cached.model);
+          return cached.model;
+        }
+
         data = {
           name: result.isDir
             ? currentPath
@@ -281,6 +394,10 @@ export class Drive implements Contents.IDrive {
           writable: true,
           type: result.isDir ? 'directory' : result.type!
         };
+
+        if (result.etag) {
+          this._cacheContents(localPath, result.etag, data);
+        }
       } catch (err) {
         error = (err as DrivesResponseError).message;
       }
@@ -1071,13 +1188,16 @@ export class Drive implements Contents.IDrive {
    *
    * @returns A promise which resolves with the new checkpoint model when the
    *   checkpoint is created.
+   *
+   * #### Notes
+   * On drives with object versioning the checkpoint is the current version of
+   * the file, otherwise the file is copied by the provider.
    */
-  createCheckpoint(path: string): Promise<Contents.ICheckpointModel> {
-    const emptyCheckpoint: Contents.ICheckpointModel = {
-      id: '',
-      last_modified: ''
-    };
-    return Promise.resolve(emptyCheckpoint);
+  async createCheckpoint(path: string): Promise<Contents.ICheckpointModel> {
+    const currentDrive = extractCurrentDrive(path, this._drivesList);
+    return await createCheckpoint(currentDrive.name, {
+      path: formatPath(path)
+    });
   }
 
   /**
@@ -1088,8 +1208,15 @@ export class Drive implements Contents.IDrive {
    * @returns A promise which resolves with a list of checkpoint models for
    *    the file.
    */
-  listCheckpoints(path: string): Promise<Contents.ICheckpointModel[]> {
-    return Promise.resolve([]);
+  async listCheckpoints(path: string): Promise<Contents.ICheckpointModel[]> {
+    if (path === '') {
+      // the list of drives
+      return [];
+    }
+    const currentDrive = extractCurrentDrive(path, this._drivesList);
+    return await listCheckpoints(currentDrive.name, {
+      path: formatPath(path)
+    });
   }
 
   /**
@@ -1101,8 +1228,12 @@ export class Drive implements Contents.IDrive {
    *
    * @returns A promise which resolves when the checkpoint is restored.
    */
-  restoreCheckpoint(path: string, checkpointID: string): Promise<void> {
-    return Promise.reject('Repository is read only');
+  async restoreCheckpoint(path: string, checkpointID: string): Promise<void> {
+    const currentDrive = extractCurrentDrive(path, this._drivesList);
+    await restoreCheckpoint(currentDrive.name, {
+      path: formatPath(path),
+      checkpointID
+    });
   }
 
   /**
@@ -1114,8 +1245,30 @@ export class Drive implements Contents.IDrive {
    *
    * @returns A promise which resolves when the checkpoint is deleted.
    */
-  deleteCheckpoint(path: string, checkpointID: string): Promise<void> {
-    return Promise.reject('Read only');
+  async deleteCheckpoint(path: string, checkpointID: string): Promise<void> {
+    const currentDrive = extractCurrentDrive(path, this._drivesList);
+    await deleteCheckpoint(currentDrive.name, {
+      path: formatPath(path),
+      checkpointID
+    });
+  }
+
+  /**
+   * Keep the model of contents for requests conditional on their entity tag.
+   *
+   * @param path - The path of the contents.
+   *
+   * @param etag - The entity tag of the contents.
+   *
+   * @param model - The contents model.
+   */
+  private _cacheContents(path: string, etag: string, model: Contents.IModel) {
+    this._contentsCache.delete(path);
+    this._contentsCache.set(path, { etag, model });
+    // evict the least recently retrieved contents
+    while (this._contentsCache.size > CONTENTS_CACHE_SIZE) {
+      this._contentsCache.delete(this._contentsCache.keys().next().value!);
+    }
   }
 
   /**
@@ -1160,9 +1313,15 @@ export class Drive implements Contents.IDrive {
   private _region: string = '';
   private _creationDate: string = '';
   private _fileChanged = new Signal<this, Contents.IChangedArgs>(this);
+  private _listingProgress = new Signal<this, Drive.IListingProgress>(this);
+  private _streamListings: boolean = false;
   private _isDisposed: boolean = false;
   private _disposed = new Signal<this, void>(this);
   private _registeredFileTypes: IRegisteredFileTypes = {};
+  private _contentsCache = new Map<
+    string,
+    { etag: string; model: Contents.IModel }
+  >();
 }
 
 export namespace Drive {
@@ -1193,4 +1352,19 @@ export namespace Drive {
      */
     apiEndpoint?: string;
   }
+
+  /**
+   * The partial listing of a directory being streamed.
+   */
+  export interface IListingProgress {
+    /**
+     * The path of the directory.
+     */
+    path: string;
+
+    /**
+     * The directory model, with the entries listed so far as content.
+     */
+    model: Contents.IModel;
+  }
 }
@@ -13,6 +13,11 @@ export const AUTH_ERROR_MESSAGES = [
   'Authentication error'
 ];
 
+/**
+ * Content type of the listings streamed as newline-delimited JSON.
+ */
+const NDJSON_CONTENT_TYPE = 'application/x-ndjson';
+
 /**
  * A wrapped error for a fetch response.
  */
@@ -46,6 +51,37 @@ export class DrivesResponseError extends ServerConnection.ResponseError {
   protected _json: ReadonlyJSONObject;
 }
 
+/**
+ * The reply of a conditional request to the API extension.
+ */
+export interface IConditionalResponse<T> {
+  /**
+   * The response body interpreted as JSON, `null` when not modified.
+   */
+  data: T | null;
+
+  /**
+   * The entity tag of the response.
+   */
+  etag: string | null;
+}
+
+/**
+ * Get the URL of an end point of the API extension, e.g. for downloads.
+ *
+ * @param endPoint API REST end point for the extension; default ''
+ * @param namespace API namespace;
+ * @returns The URL of the end point
+ */
+export function getAPIUrl(endPoint = '', namespace = 'jupyter-drives'): string {
+  const settings = ServerConnection.makeSettings();
+  return URLExt.join(
+    settings.baseUrl,
+    namespace, // API Namespace
+    endPoint
+  );
+}
+
 /**
  * Call the API extension
  *
@@ -63,17 +99,98 @@ export async function requestAPI<T>(
   body: Partial<ReadonlyJSONObject> | null = null,
   namespace = 'jupyter-drives'
 ): Promise<T> {
-  // Make request to Jupyter API
-  const settings = ServerConnection.makeSettings();
-  const requestUrl = URLExt.join(
-    settings.baseUrl,
-    namespace, // API Namespace
-    endPoint
+  const [, data] = await makeRequest(
+    endPoint,
+    {
+      method,
+      body: body ? JSON.stringify(body) : undefined
+    },
+    namespace
   );
+  return data;
+}
 
+/**
+ * Call the API extension with a PUT request sending raw binary content.
+ *
+ * @param endPoint API REST end point for the extension; default ''
+ * @param body Binary content to be passed as body (e.g. a file chosen by the user)
+ * @param query Query parameters of the request
+ * @param namespace API namespace;
+ * @returns The response body interpreted as JSON
+ *
+ * @throws {ServerConnection.NetworkError} If the request cannot be made
+ */
+export async function requestRawAPI<T>(
+  endPoint = '',
+  body: Uint8Array | Blob,
+  query: Record<string, string> = {},
+  namespace = 'jupyter-drives'
+): Promise<T> {
+  const [, data] = await makeRequest(
+    endPoint + URLExt.objectToQueryString(query),
+    {
+      method: 'PUT',
+      headers: { 'Content-Type': 'application/octet-stream' },
+      body
+    },
+    namespace
+  );
+  return data;
+}
+
+/**
+ * Call the API extension with a GET request conditional on the entity tag
+ * of the last response.
+ *
+ * @param endPoint API REST end point for the extension; default ''
+ * @param etag Entity tag of the last response, if any
+ * @param namespace API namespace;
+ * @returns The response body interpreted as JSON, `null` when not modified, and its entity tag
+ *
+ * @throws {ServerConnection.NetworkError} If the request cannot be made
+ */
+export async function requestConditionalAPI<T>(
+  endPoint = '',
+  etag: string | null = null,
+  namespace = 'jupyter-drives'
+): Promise<IConditionalResponse<T>> {
+  const headers: Record<string, string> = {};
+  if (etag) {
+    headers['If-None-Match'] = etag;
+  }
+  const [response, data] = await makeRequest(
+    endPoint,
+    { method: 'GET', headers },
+    namespace
+  );
+  return {
+    data: response.status === 304 ? null : data,
+    etag: response.headers.get('ETag')
+  };
+}
+
+/**
+ * Call the API extension with a GET request accepting a listing streamed as
+ * newline-delimited JSON.
+ *
+ * @param endPoint API REST end point for the extension; default ''
+ * @param onItems Callback called with the items of each chunk of the stream
+ * @param namespace API namespace;
+ * @returns The response body interpreted as JSON when it is not streamed, `null` otherwise
+ *
+ * @throws {ServerConnection.NetworkError} If the request cannot be made
+ */
+export async function requestStreamAPI<T>(
+  endPoint = '',
+  onItems: (items: T[]) => void,
+  namespace = 'jupyter-drives'
+): Promise<any | null> {
+  const settings = ServerConnection.makeSettings();
+  const requestUrl = URLExt.join(settings.baseUrl, namespace, endPoint);
   const init: RequestInit = {
-    method,
-    body: body ? JSON.stringify(body) : undefined
+    method: 'GET',
+    headers: { Accept: `${NDJSON_CONTENT_TYPE}, application/json` }
   };
 
   let response: Response;
@@ -83,6 +200,77 @@ export async function requestAPI<T>(
     throw new ServerConnection.NetworkError(error);
   }
 
+  const contentType = response.headers.get('Content-Type') ?? '';
+  if (
+    !response.ok ||
+    !response.body ||
+    !contentType.startsWith(NDJSON_CONTENT_TYPE)
+  ) {
+    return await readResponse(response);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+    const lines = buffer.split('\n');
+    // keep the last line until it is complete
+    buffer = done ? '' : lines.pop()!;
+
+    const items: T[] = [];
+    for (const line of lines) {
+      if (line.trim().length === 0) {
+        continue;
+      }
+      const item = JSON.parse(line);
+      if (item.error !== undefined) {
+        throw new DrivesResponseError(response, item.error);
+      }
+      items.push(item);
+    }
+    if (items.length > 0) {
+      onItems(items);
+    }
+    if (done) {
+      return null;
+    }
+  }
+}
+
+/**
+ * Make a request to the API extension.
+ *
+ * @returns The response and its body interpreted as JSON
+ */
+async function makeRequest(
+  endPoint: string,
+  init: RequestInit,
+  namespace = 'jupyter-drives'
+): Promise<[Response, any]> {
+  // Make request to Jupyter API
+  const settings = ServerConnection.makeSettings();
+  const requestUrl = getAPIUrl(endPoint, namespace);
+
+  let response: Response;
+  try {
+    response = await ServerConnection.makeRequest(requestUrl, init, settings);
+  } catch (error: any) {
+    throw new ServerConnection.NetworkError(error);
+  }
+
+  return [response, await readResponse(response)];
+}
+
+/**
+ * Read the body of a response of the API extension.
+ *
+ * @returns The response body interpreted as JSON
+ *
+ * @throws {DrivesResponseError} If the response is an error
+ */
+async function readResponse(response: Response): Promise<any> {
   let data: any = await response.text();
   let isJSON = false;
   if (data.length > 0) {
@@ -94,7 +282,7 @@ export async function requestAPI<T>(
     }
   }
 
-  if (!response.ok) {
+  if (!response.ok && response.status !== 304) {
     if (isJSON) {
       const { message, traceback, ...json } = data;
       throw new DrivesResponseError(
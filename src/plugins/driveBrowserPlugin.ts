@@ -32,6 +32,8 @@ import {
   notebookIcon,
   editIcon,
   copyIcon,
+  downloadIcon,
+  fileUploadIcon,
   pasteIcon
 } from '@jupyterlab/ui-components';
 import { PageConfig, PathExt } from '@jupyterlab/coreutils';
@@ -41,7 +43,7 @@ import { Widget } from '@lumino/widgets';
 import { driveBrowserIcon, removeIcon } from '../icons';
 import { Drive } from '../contents';
 import { getContents, mountDrive, setListingLimit } from '../requests';
-import { CommandIDs } from '../token';
+import { ARCHIVE_EXTENSIONS, CommandIDs } from '../token';
 import { DrivesResponseError } from '../handler';
 
 /**
@@ -191,6 +193,24 @@ export const driveFileBrowser: JupyterFrontEndPlugin<void> = {
 
     void Private.restoreBrowser(driveBrowser, commands, router, tree, labShell);
 
+    // Render the listing of the directory being opened while it is streamed
+    drive.listingProgress.connect((_, progress) => {
+      const model = driveBrowser.model;
+      //@ts-expect-error pending path is private
+      const pendingPath: string | null = model._pendingPath;
+      if (
+        pendingPath === null ||
+        pendingPath.replace(/\/$/, '') !==
+          `${drive.name}:${progress.path}`.replace(/\/$/, '')
+      ) {
+        return;
+      }
+      //@ts-expect-error handleContents is protected
+      model.handleContents(progress.model);
+      //@ts-expect-error refreshed signal is private
+      model._refreshed.emit(void 0);
+    });
+
     app.shell.add(driveBrowser, 'left', { rank: 102, type: 'File Browser' });
     if (restorer) {
       restorer.add(driveBrowser, 'drive-file-browser');
@@ -292,6 +312,7 @@ export const driveFileBrowser: JupyterFrontEndPlugin<void> = {
       const maxFilesListed = setting.get('maxFilesListed').composite as number;
       // Set new limit.
       setListingLimit(maxFilesListed);
+      drive.streamListings = setting.get('streamListings').composite as boolean;
     }
 
     // Wait for the application to be restored and
@@ -481,6 +502,19 @@ namespace Private {
     }
   }
 
+  /**
+   * Format a number of bytes for display.
+   */
+  export function formatSize(size: number): string {
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let unit = 0;
+    while (size >= 1024 && unit < units.length - 1) {
+      size /= 1024;
+      unit++;
+    }
+    return `${unit ? size.toFixed(1) : size} ${units[unit]}`;
+  }
+
   export function addCommands(
     app: JupyterFrontEnd,
     drive: Drive,
@@ -731,6 +765,152 @@ namespace Private {
       rank: 110
     });
 
+    app.commands.addCommand(CommandIDs.uploadArchive, {
+      isEnabled: () => {
+        return browser.model.path !== 's3:';
+      },
+      execute: () => {
+        const input = document.createElement('input');
+        input.type = 'file';
+        input.accept = Object.keys(ARCHIVE_EXTENSIONS).join(',');
+        input.onchange = async () => {
+          const file = input.files?.[0];
+          if (!file) {
+            return;
+          }
+          const localPath = app.serviceManager.contents.localPath(
+            browser.model.path
+          );
+          const id = Notification.emit(
+            `Extracting ${file.name}...`,
+            'in-progress',
+            { autoClose: false }
+          );
+          try {
+            const count = await drive.extractArchive(localPath, file);
+            Notification.update({
+              id,
+              message: `Extracted ${count} files from ${file.name}.`,
+              type: 'success',
+              autoClose: 5000
+            });
+          } catch (err) {
+            Notification.update({
+              id,
+              message: (err as DrivesResponseError).message,
+              type: 'error',
+              autoClose: 5000
+            });
+          }
+          await browser.model.refresh();
+        };
+        input.click();
+      },
+      label: 'Upload and Extract Archive',
+      icon: fileUploadIcon.bindprops({ stylesheet: 'menuItem' })
+    });
+
+    app.contextMenu.addItem({
+      command: CommandIDs.uploadArchive,
+      selector: '#drive-file-browser.jp-SidePanel .jp-DirListing-content',
+      rank: 56
+    });
+
+    app.commands.addCommand(CommandIDs.downloadArchive, {
+      isVisible: () => {
+        return (
+          !!tracker.currentWidget &&
+          Array.from(tracker.currentWidget.selectedItems()).some(
+            item => item.type === 'directory'
+          )
+        );
+      },
+      execute: () => {
+        const widget = tracker.currentWidget;
+        if (!widget) {
+          return;
+        }
+        for (const item of widget.selectedItems()) {
+          if (item.type !== 'directory') {
+            continue;
+          }
+          // the archive is streamed by the server as it is downloaded
+          const element = document.createElement('a');
+          element.href = drive.getArchiveUrl(
+            app.serviceManager.contents.localPath(item.path)
+          );
+          element.download = '';
+          document.body.appendChild(element);
+          element.click();
+          document.body.removeChild(element);
+        }
+      },
+      label: 'Download as ZIP',
+      icon: downloadIcon.bindprops({ stylesheet: 'menuItem' })
+    });
+
+    app.contextMenu.addItem({
+      command: CommandIDs.downloadArchive,
+      selector:
+        '#drive-file-browser.jp-SidePanel .jp-DirListing-content .jp-DirListing-item[data-isdir="true"]',
+      rank: 9
+    });
+
+    app.commands.addCommand(CommandIDs.showUsage, {
+      isVisible: () => {
+        return (
+          !!tracker.currentWidget &&
+          Array.from(tracker.currentWidget.selectedItems()).length === 1 &&
+          tracker.currentWidget.selectedItems().next()!.value.type ===
+            'directory'
+        );
+      },
+      execute: async () => {
+        const item = tracker.currentWidget?.selectedItems().next()!.value;
+        if (!item) {
+          return;
+        }
+        const usage = await drive.getUsage(
+          app.serviceManager.contents.localPath(item.path)
+        );
+        const body = document.createElement('div');
+        const total = document.createElement('p');
+        total.textContent = `${Private.formatSize(usage.size)} in ${
+          usage.count
+        } files`;
+        body.appendChild(total);
+        const children = document.createElement('ul');
+        for (const child of usage.children) {
+          const line = document.createElement('li');
+          line.textContent = `${child.name}/: ${Private.formatSize(
+            child.size
+          )} (${child.count} files)`;
+          children.appendChild(line);
+        }
+        if (usage.files.count) {
+          const line = document.createElement('li');
+          line.textContent = `Files: ${Private.formatSize(
+            usage.files.size
+          )} (${usage.files.count} files)`;
+          children.appendChild(line);
+        }
+        body.appendChild(children);
+        return showDialog({
+          title: `Size of ${item.name}`,
+          body: new Widget({ node: body }),
+          buttons: [Dialog.okButton()]
+        });
+      },
+      label: 'Show Size'
+    });
+
+    app.contextMenu.addItem({
+      command: CommandIDs.showUsage,
+      selector:
+        '#drive-file-browser.jp-SidePanel .jp-DirListing-content .jp-DirListing-item[data-isdir="true"]',
+      rank: 11
+    });
+
     app.commands.addCommand(CommandIDs.copyToFilebrowser, {
       isVisible: () => {
         // So long as this command only handles one file at time, don't show it
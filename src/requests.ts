@@ -1,12 +1,21 @@
 import { ReadonlyJSONObject } from '@lumino/coreutils';
 import { Contents } from '@jupyterlab/services';
-import { PathExt } from '@jupyterlab/coreutils';
+import { PathExt, URLExt } from '@jupyterlab/coreutils';
 
-import { requestAPI } from './handler';
 import {
+  getAPIUrl,
+  requestAPI,
+  requestConditionalAPI,
+  requestRawAPI,
+  requestStreamAPI
+} from './handler';
+import {
+  ARCHIVE_EXTENSIONS,
+  getArchiveFormat,
   getFileType,
   IRegisteredFileTypes,
   IContentsList,
+  IDirectoryUsage,
   IDriveInfo
 } from './token';
 
@@ -91,17 +100,56 @@ export async function mountDrive(
  * @param driveName
  * @param options.path The path of object to be retrived.
  * @param options.registeredFileTypes The list containing all registered file types.
+ * @param options.etag The entity tag of the contents retrieved last time, if any.
+ * @param options.onFiles Callback streaming the listing of a directory, called with the
+ * files listed so far as soon as each page of the listing is received.
  *
- * @returns A promise which resolves with the contents model.
+ * @returns A promise which resolves with the contents model, or flags that the
+ * contents did not change since they were retrieved with `options.etag`.
  */
 export async function getContents(
   driveName: string,
-  options: { path: string; registeredFileTypes: IRegisteredFileTypes }
+  options: {
+    path: string;
+    registeredFileTypes: IRegisteredFileTypes;
+    etag?: string | null;
+    onFiles?: (files: Contents.IModel[]) => void;
+  }
 ) {
-  const response = await requestAPI<any>(
-    'drives/' + driveName + '/' + options.path,
-    'GET'
-  );
+  let response: any;
+  let etag: string | null = null;
+
+  if (options.onFiles) {
+    const onFiles = options.onFiles;
+    const rows: any[] = [];
+    const streamedList: IContentsList = {};
+    const body = await requestStreamAPI<any>(
+      'drives/' + driveName + '/' + options.path,
+      entries => {
+        rows.push(...entries);
+        entries.forEach(row =>
+          addListedFile(streamedList, row, driveName, options)
+        );
+        onFiles(Object.values(streamedList));
+      }
+    );
+    // files are not streamed
+    response = body ?? { data: rows };
+  } else {
+    const conditionalResponse = await requestConditionalAPI<any>(
+      'drives/' + driveName + '/' + options.path,
+      options.etag
+    );
+    response = conditionalResponse.data;
+    etag = conditionalResponse.etag;
+
+    if (response === null) {
+      return {
+        notModified: true,
+        etag: etag
+      };
+    }
+  }
 
   // checking if we are dealing with a directory or a file
   const isDir: boolean = response.data.length !== undefined;
@@ -111,39 +159,14 @@ export async function getContents(
     if (isDir) {
       const fileList: IContentsList = {};
 
-      response.data.forEach((row: any) => {
-        // check if we are dealing with files inside a subfolder
-        if (row.path !== options.path && row.path !== options.path + '/') {
-          // extract object name from path
-          const fileName = row.path
-            .replace(options.path ? options.path + '/' : '', '')
-            .split('/')[0];
-
-          const [fileType, fileMimeType, fileFormat] = getFileType(
-            PathExt.extname(PathExt.basename(fileName)),
-            options.registeredFileTypes
-          );
-
-          fileList[fileName] = fileList[fileName] ?? {
-            name: fileName,
-            path: options.path
-              ? PathExt.join(driveName, options.path, fileName)
-              : PathExt.join(driveName, fileName),
-            last_modified: row.last_modified,
-            created: '',
-            content: !fileName.split('.')[1] ? [] : null,
-            format: fileFormat as Contents.FileFormat,
-            mimetype: fileMimeType,
-            size: row.size,
-            writable: true,
-            type: fileType
-          };
-        }
-      });
+      response.data.forEach((row: any) =>
+        addListedFile(fileList, row, driveName, options)
+      );
 
       return {
         isDir: isDir,
         response: response,
+        etag: etag,
         files: Object.values(fileList)
       };
     }
@@ -157,6 +180,7 @@ export async function getContents(
       return {
         isDir: isDir,
         response: response,
+        etag: etag,
         format: fileFormat as Contents.FileFormat,
         mimetype: fileMimeType,
         type: fileType
@@ -167,6 +191,66 @@ export async function getContents(
   return {};
 }
 
+/**
+ * Add an object of a listing to the list of files of a directory.
+ *
+ * @param fileList The list of files of the directory.
+ * @param row The listed object.
+ * @param driveName
+ * @param options.path The path of the directory.
+ * @param options.registeredFileTypes The list containing all registered file types.
+ */
+function addListedFile(
+  fileList: IContentsList,
+  row: any,
+  driveName: string,
+  options: { path: string; registeredFileTypes: IRegisteredFileTypes }
+) {
+  // check if we are dealing with files inside a subfolder
+  if (row.path !== options.path && row.path !== options.path + '/') {
+    // extract object name from path
+    const fileName = row.path
+      .replace(options.path ? options.path + '/' : '', '')
+      .split('/')[0];
+
+    const [fileType, fileMimeType, fileFormat] = getFileType(
+      PathExt.extname(PathExt.basename(fileName)),
+      options.registeredFileTypes
+    );
+
+    fileList[fileName] = fileList[fileName] ?? {
+      name: fileName,
+      path: options.path
+        ? PathExt.join(driveName, options.path, fileName)
+        : PathExt.join(driveName, fileName),
+      last_modified: row.last_modified,
+      created: '',
+      content: !fileName.split('.')[1] ? [] : null,
+      format: fileFormat as Contents.FileFormat,
+      mimetype: fileMimeType,
+      size: row.size,
+      writable: true,
+      type: fileType
+    };
+  }
+}
+
+/**
+ * Decode base64 content.
+ *
+ * @param content The base64 encoded content.
+ *
+ * @returns The decoded bytes.
+ */
+function base64ToBytes(content: string): Uint8Array {
+  const binary = atob(content);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes;
+}
+
 /**
  * Save an object.
  *
@@ -190,17 +274,31 @@ export async function saveObject(
     options.registeredFileTypes
   );
 
-  const response = await requestAPI<any>(
-    'drives/' + driveName + '/' + options.path,
-    'PUT',
-    {
-      content: options.param.content,
-      options_format: options.param.format,
-      content_format: fileFormat,
-      content_type: fileType,
-      options_chunk: options.param.chunk
-    }
-  );
+  // binary contents stored decoded are sent raw, instead of base64 in JSON
+  const isRaw =
+    options.param.format === 'base64' &&
+    (fileFormat === 'base64' ||
+      (fileFormat === 'text' && fileType !== 'PDF') ||
+      fileType === 'PDF' ||
+      fileType === 'notebook');
+
+  const response = isRaw
+    ? await requestRawAPI<any>(
+        'drives/' + driveName + '/' + options.path,
+        base64ToBytes(options.param.content),
+        options.param.chunk ? { chunk: String(options.param.chunk) } : {}
+      )
+    : await requestAPI<any>(
+        'drives/' + driveName + '/' + options.path,
+        'PUT',
+        {
+          content: options.param.content,
+          options_format: options.param.format,
+          content_format: fileFormat,
+          content_type: fileType,
+          options_chunk: options.param.chunk
+        }
+      );
 
   return {
     response: response,
@@ -539,6 +637,184 @@ export async function addExternalDrive(driveUrl: string, location: string) {
   });
 }
 
+/**
+ * Create a checkpoint of a file.
+ *
+ * @param driveName
+ * @param options.path The path of the file.
+ *
+ * @returns A promise which resolves with the checkpoint model.
+ */
+export async function createCheckpoint(
+  driveName: string,
+  options: {
+    path: string;
+  }
+): Promise<Contents.ICheckpointModel> {
+  const response = await requestAPI<any>(
+    'checkpoints/' + driveName + '/' + options.path,
+    'POST'
+  );
+  return response.data;
+}
+
+/**
+ * List the checkpoints of a file.
+ *
+ * @param driveName
+ * @param options.path The path of the file.
+ *
+ * @returns A promise which resolves with the checkpoint models, from the oldest to the latest.
+ */
+export async function listCheckpoints(
+  driveName: string,
+  options: {
+    path: string;
+  }
+): Promise<Contents.ICheckpointModel[]> {
+  const response = await requestAPI<any>(
+    'checkpoints/' + driveName + '/' + options.path,
+    'GET'
+  );
+  return response.data;
+}
+
+/**
+ * Restore a file to a checkpoint.
+ *
+ * @param driveName
+ * @param options.path The path of the file.
+ * @param options.checkpointID The ID of the checkpoint.
+ */
+export async function restoreCheckpoint(
+  driveName: string,
+  options: {
+    path: string;
+    checkpointID: string;
+  }
+) {
+  await requestAPI<any>(
+    'checkpoints/' + driveName + '/' + options.path,
+    'PATCH',
+    {
+      checkpoint_id: options.checkpointID
+    }
+  );
+}
+
+/**
+ * Delete a checkpoint of a file.
+ *
+ * @param driveName
+ * @param options.path The path of the file.
+ * @param options.checkpointID The ID of the checkpoint.
+ */
+export async function deleteCheckpoint(
+  driveName: string,
+  options: {
+    path: string;
+    checkpointID: string;
+  }
+) {
+  await requestAPI<any>(
+    'checkpoints/' +
+      driveName +
+      '/' +
+      options.path +
+      '?checkpoint_id=' +
+      encodeURIComponent(options.checkpointID),
+    'DELETE'
+  );
+}
+
+/**
+ * Upload an archive, extracted by the server into a directory while it is received.
+ *
+ * @param driveName
+ * @param options.path The path of the directory where the archive is extracted.
+ * @param options.file The archive (ZIP or tar, possibly compressed).
+ *
+ * @returns A promise which resolves with the number of extracted files.
+ */
+export async function extractArchive(
+  driveName: string,
+  options: {
+    path: string;
+    file: File;
+  }
+): Promise<number> {
+  const archiveFormat = getArchiveFormat(options.file.name);
+  if (!archiveFormat) {
+    const extensions = Object.keys(ARCHIVE_EXTENSIONS).join(', ');
+    throw new Error(
+      `${options.file.name} is not a ZIP or tar archive (${extensions}).`
+    );
+  }
+  const response = await requestRawAPI<any>(
+    'drives/' + driveName + '/' + options.path,
+    options.file,
+    { extract: archiveFormat }
+  );
+  return response.data.count;
+}
+
+/**
+ * Get the disk usage of a directory, in total and per child directory.
+ *
+ * @param driveName
+ * @param options.path The path of the directory (empty for the whole drive).
+ *
+ * @returns A promise which resolves with the usage of the directory.
+ */
+export async function getUsage(
+  driveName: string,
+  options: {
+    path: string;
+  }
+): Promise<IDirectoryUsage> {
+  const response = await requestAPI<any>(
+    'usage/' + driveName + '/' + options.path,
+    'GET'
+  );
+  return response.data;
+}
+
+/**
+ * Get the URL of the ZIP archive of a directory, streamed by the server.
+ *
+ * @param driveName
+ * @param options.path The path of the directory (empty for the whole drive).
+ *
+ * @returns The URL of the archive.
+ */
+export function getArchiveUrl(
+  driveName: string,
+  options: {
+    path: string;
+  }
+): string {
+  const url = new URL(
+    getAPIUrl(
+      URLExt.encodeParts(
+        URLExt.join('archives', driveName, options.path)
+      )
+    ),
+    window.location.href
+  );
+  // as for the downloads of JupyterLab, in case the server checks it
+  let cookie = '';
+  try {
+    cookie = document.cookie;
+  } catch (err) {
+    // e.g. in a sandboxed iframe
+  }
+  const xsrfTokens = cookie.match('\\b_xsrf=([^;]*)\\b');
+  if (xsrfTokens) {
+    url.searchParams.append('_xsrf', xsrfTokens[1]);
+  }
+  return url.toString();
+}
+
 namespace Private {
   /**
    * Helping function for renaming files inside
@@ -21,6 +21,35 @@ export namespace CommandIDs {
   export const includeDrive = 'drives:include-drive';
   export const copyToFilebrowser = 'drives:copy-to-filebrowser';
   export const pasteToFilebrowser = 'drives:paste-to-filebrowser';
+  export const downloadArchive = 'drives:download-archive';
+  export const uploadArchive = 'drives:upload-archive';
+  export const showUsage = 'drives:show-usage';
+}
+
+/**
+ * Extensions of the archives extracted by the server, with their format.
+ */
+export const ARCHIVE_EXTENSIONS: { [extension: string]: string } = {
+  '.zip': 'zip',
+  '.tar': 'tar',
+  '.tar.gz': 'tar',
+  '.tgz': 'tar',
+  '.tar.bz2': 'tar',
+  '.tbz2': 'tar',
+  '.tar.xz': 'tar',
+  '.txz': 'tar'
+};
+
+/**
+ * Helping function to get the format of an archive from its file name.
+ * @param name file name of the archive
+ * @returns the format of the archive (zip or tar), or null if not an archive
+ */
+export function getArchiveFormat(name: string): string | null {
+  const extension = Object.keys(ARCHIVE_EXTENSIONS).find(extension =>
+    name.toLowerCase().endsWith(extension)
+  );
+  return extension ? ARCHIVE_EXTENSIONS[extension] : null;
 }
 
 /**
@@ -56,6 +85,17 @@ export interface IContentsList {
   [fileName: string]: Contents.IModel;
 }
 
+/**
+ * Disk usage of a directory, in total and per child directory.
+ */
+export interface IDirectoryUsage {
+  path: string;
+  size: number;
+  count: number;
+  files: { size: number; count: number };
+  children: { name: string; path: string; size: number; count: number }[];
+}
+
 /**
  * An interface that stores the registered file type, mimetype and format for each file extension.
  */